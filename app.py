@@ -4,6 +4,11 @@ from db import Database
 from routes.student_routes import student_bp
 from routes.learning_route import learning_bp
 from routes.submission_routes import submission_bp
+from routes.metrics_routes import metrics_bp
+from routes.problem_routes import problem_bp
+from models.problem_catalog import ProblemCatalog
+from models.problem_similarity import ProblemSimilarity
+from services.notification_hub import NotificationHub
 from utils.skill_loader import SkillLoader
 
 app = Flask(__name__)
@@ -26,6 +31,8 @@ def get_skills():
 app.register_blueprint(student_bp)
 app.register_blueprint(learning_bp)
 app.register_blueprint(submission_bp)
+app.register_blueprint(metrics_bp)
+app.register_blueprint(problem_bp)
 
 @app.errorhandler(404)
 def not_found(error):
@@ -43,6 +50,10 @@ def initialize_app():
         Database.initialize()
         SkillLoader.load_skills()
         print(f"✓ Loaded {len(SkillLoader.get_skill_ids())} skills")
+        print(f"✓ Loaded {ProblemCatalog.load()} problems into the catalog")
+        print(f"✓ Loaded {ProblemSimilarity.load()} problems into the similarity index")
+        # Watch completions before the first long-poll / SSE request registers
+        NotificationHub.start()
     except Exception as e:
         print(f"✗ Initialization failed: {e}")
         raise
@@ -0,0 +1,156 @@
+"""
+KFFSequencer benchmark - candidate selection and top-k energy scoring.
+
+Builds synthetic problem banks in the in-memory ProblemCatalog (no MongoDB
+needed) and times, per sequencing decision:
+
+- select: difficulty-window candidate lookup (searchsorted per skill)
+- score:  vectorized energy + top-k over the candidates
+- loop:   the previous per-candidate Python loop, for reference
+
+    python benchmarks/sequencer_benchmark.py --sizes 10000 100000 --output report.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from models.problem_catalog import ProblemCatalog
+from services.kff_sequencer import KFFSequencer
+from utils.skill_ontology import SkillOntology
+
+
+def make_bank(size, rng):
+    """Synthetic problems with 1-3 ontology skills each and uniform difficulty."""
+    skills = SkillOntology.get_skill_ids()
+    bank = []
+    for index in range(size):
+        problem_skills = rng.sample(skills, rng.randint(1, 3))
+        bank.append({
+            '_id': f"prob_{index + 1}",
+            'title': f"Problem {index + 1}",
+            'difficulty': round(rng.random(), 3),
+            'primary_skill': problem_skills[0],
+            'skills': problem_skills
+        })
+    return bank, skills
+
+
+def loop_scores(sequencer, entries, target, recent_skills, failed_skills):
+    """The original scalar scoring loop (minimum only)."""
+    best, lowest = None, float('inf')
+    for prob in entries:
+        difficulty = prob.get('difficulty', 0.5)
+        primary_skill = prob.get('primary_skill')
+        stagnation = 1.0 if primary_skill in recent_skills else 0.0
+        redemption = -0.4 if primary_skill in failed_skills and primary_skill not in recent_skills else 0.0
+        energy = sequencer.alpha * (difficulty - target) ** 2 + sequencer.beta * stagnation + redemption
+        if energy < lowest:
+            lowest, best = energy, prob
+    return best
+
+
+def summarize(samples_us):
+    """p50/p99/mean in microseconds."""
+    array = np.asarray(samples_us)
+    return {
+        'p50_us': round(float(np.percentile(array, 50)), 2),
+        'p99_us': round(float(np.percentile(array, 99)), 2),
+        'mean_us': round(float(array.mean()), 2)
+    }
+
+
+def bench_size(size, args, rng):
+    """Time selection and scoring for one bank size."""
+    bank, skills = make_bank(size, rng)
+    ProblemCatalog.load_documents(bank)
+    catalog = ProblemCatalog.snapshot()
+    sequencer = KFFSequencer()
+    
+    select_us, score_us, loop_us, candidate_counts = [], [], [], []
+    
+    for _ in range(args.decisions):
+        weak = rng.sample(skills, args.weak_skills)
+        recent = rng.sample(skills, 2)
+        failed = rng.sample(skills, 5)
+        target = rng.random()
+        current = bank[rng.randrange(size)]['_id']
+        
+        started = time.perf_counter()
+        positions = ProblemCatalog.get_candidate_indices(catalog, weak, current, target)
+        selected = time.perf_counter()
+        energies = sequencer.score_candidates(catalog, positions, target, recent, failed)
+        sequencer.top_k(energies, args.k, positions)
+        scored = time.perf_counter()
+        
+        select_us.append((selected - started) * 1e6)
+        score_us.append((scored - selected) * 1e6)
+        candidate_counts.append(int(positions.size))
+        
+        if args.with_loop:
+            entries = [catalog.entries[i] for i in positions]
+            started = time.perf_counter()
+            loop_scores(sequencer, entries, target, recent, failed)
+            loop_us.append((time.perf_counter() - started) * 1e6)
+    
+    result = {
+        'problems': size,
+        'mean_candidates': round(float(np.mean(candidate_counts)), 1),
+        'select': summarize(select_us),
+        'score_top_k': summarize(score_us)
+    }
+    if loop_us:
+        result['python_loop'] = summarize(loop_us)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark KFFSequencer candidate scoring")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--weak-skills', type=int, default=3)
+    parser.add_argument('--decisions', type=int, default=500)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--with-loop', action='store_true',
+                        help="Also time the scalar Python scoring loop")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='sequencer_benchmark_report.json')
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    results = []
+    for size in args.sizes:
+        result = bench_size(size, args, rng)
+        results.append(result)
+        print(f"{size:>7} problems: {result['mean_candidates']:>8} candidates, "
+              f"select p50 {result['select']['p50_us']}us, "
+              f"score+top{args.k} p50 {result['score_top_k']['p50_us']}us "
+              f"(p99 {result['score_top_k']['p99_us']}us)"
+              + (f", loop p50 {result['python_loop']['p50_us']}us" if 'python_loop' in result else ""))
+    
+    report = {
+        'benchmark': 'kff_sequencer',
+        'started_at': datetime.utcnow().isoformat(),
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'cpu_count': os.cpu_count()
+        },
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"Report: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""
+Learning Worker benchmark - throughput, completion lag and Mongo ops/event.
+
+Seeds synthetic students through StudentModel, injects learning events at a
+configurable rate and skew (Zipf: a few hot students, a long tail) through
+the /learn route, /learn/batch or direct inserts, runs K LearningWorkers
+and writes a JSON report for regression tracking.
+
+Runs against a real mongod in its own database (dropped first):
+
+    python benchmarks/worker_benchmark.py --students 1000 --events 20000 \\
+        --rate 2000 --skew 1.1 --workers 2 --threads 4 --output report.json
+
+Workers run as threads of this process, so the GIL caps CPU-bound
+throughput; compare reports produced with the same settings.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pymongo
+from pymongo import monitoring
+
+from config import Config
+
+# Threads whose commands are not charged to ingestion or the workers
+MONITOR_THREAD = 'bench-monitor'
+INGEST_THREAD = 'bench-ingest'
+
+ERROR_TYPES = ['off_by_one', 'boundary', 'logic', 'timeout', 'syntax']
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts Mongo commands per phase (ingest / worker) and command name."""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.enabled = False
+        self.by_phase = Counter()
+        self.by_command = Counter()
+    
+    def started(self, event):
+        if not self.enabled:
+            return
+        thread = threading.current_thread().name
+        if thread == MONITOR_THREAD:
+            return
+        phase = 'ingest' if thread == INGEST_THREAD else 'worker'
+        with self.lock:
+            self.by_phase[phase] += 1
+            self.by_command[f"{phase}:{event.command_name}"] += 1
+    
+    def succeeded(self, event):
+        pass
+    
+    def failed(self, event):
+        pass
+
+
+def zipf_cum_weights(count, skew):
+    """Cumulative weights for picking student i with probability ~ 1/(i+1)^skew."""
+    weights = 1.0 / np.arange(1, count + 1) ** skew
+    return np.cumsum(weights / weights.sum()).tolist()
+
+
+def make_payloads(args, student_ids, skill_ids):
+    """Generate the learning event payloads up front (not timed)."""
+    rng = random.Random(args.seed)
+    cum_weights = zipf_cum_weights(len(student_ids), args.skew)
+    run_id = f"{int(time.time())}"
+    
+    payloads = []
+    for index in range(args.events):
+        correct = rng.random() < 0.6
+        payloads.append({
+            'submission_id': f"bench_{run_id}_{index}",
+            'student_id': rng.choices(student_ids, cum_weights=cum_weights)[0],
+            'problem_id': f"bench_problem_{rng.randrange(200)}",
+            'result': {
+                'correct': correct,
+                'attempts': rng.randint(1, 3),
+                'solve_time': round(rng.uniform(10, 300), 1)
+            },
+            'diagnosis': {
+                'skills': rng.sample(skill_ids, rng.randint(1, 2)),
+                'error_type': 'none' if correct else rng.choice(ERROR_TYPES)
+            }
+        })
+    return payloads
+
+
+def inject(args, payloads, db, client, stats):
+    """Send payloads at args.rate events/sec (0 = as fast as possible)."""
+    from routes.learning_route import _build_event_doc
+    
+    started = time.monotonic()
+    step = args.ingest_batch if args.ingest in ('batch', 'direct') else 1
+    
+    for start in range(0, len(payloads), step):
+        chunk = payloads[start:start + step]
+        
+        if args.ingest == 'route':
+            client.post('/learn', json=chunk[0])
+        elif args.ingest == 'batch':
+            client.post('/learn/batch', json=chunk)
+        else:
+            now = datetime.utcnow()
+            db.learning_events.insert_many(
+                [_build_event_doc(payload, now) for payload in chunk], ordered=False
+            )
+        
+        if args.rate > 0:
+            # Pace against the schedule rather than sleeping per event
+            due = started + (start + len(chunk)) / args.rate
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+    
+    stats['ingest_seconds'] = time.monotonic() - started
+
+
+def monitor(db, total, stop, stats, interval=0.25):
+    """Sample queue depth until every event is completed or dead-lettered."""
+    max_depth = 0
+    samples = []
+    started = time.monotonic()
+    
+    while not stop.is_set():
+        completed = db.learning_events.count_documents({'completed': True})
+        dead = db.learning_events_dead.count_documents({})
+        depth = db.learning_events.count_documents({'completed': False})
+        max_depth = max(max_depth, depth)
+        samples.append([round(time.monotonic() - started, 2), depth, completed])
+        if completed + dead >= total:
+            break
+        time.sleep(interval)
+    
+    stats['max_queue_depth'] = max_depth
+    stats['queue_samples'] = samples
+
+
+def percentiles(values):
+    """p50/p90/p99/max/mean of a list of milliseconds."""
+    if not values:
+        return {}
+    array = np.asarray(values)
+    return {
+        'p50': round(float(np.percentile(array, 50)), 2),
+        'p90': round(float(np.percentile(array, 90)), 2),
+        'p99': round(float(np.percentile(array, 99)), 2),
+        'max': round(float(array.max()), 2),
+        'mean': round(float(array.mean()), 2)
+    }
+
+
+def run_benchmark(args):
+    """Seed, inject, process and collect the report."""
+    counter = CommandCounter()
+    monitoring.register(counter)
+    
+    Config.DB_NAME = args.db_name
+    from db import Database
+    from models.student_model import StudentModel
+    from utils.sharding import SHARDING_CONFIG_ID
+    from utils.skill_loader import SkillLoader
+    from workers.learning_worker import LearningWorker
+    from app import app
+    
+    Database.initialize()
+    db = Database.get_db()
+    
+    # Start from an empty benchmark database
+    Database._client.drop_database(args.db_name)
+    Database._create_indexes()
+    
+    print(f"Seeding {args.students} students...")
+    student_ids = [f"bench_s{i}" for i in range(args.students)]
+    StudentModel.create_students(student_ids)
+    skill_ids = sorted(SkillLoader.get_skill_ids())
+    payloads = make_payloads(args, student_ids, skill_ids)
+    
+    if args.sharded and args.workers > 1:
+        db.worker_config.insert_one({
+            '_id': SHARDING_CONFIG_ID, 'shard_count': args.workers,
+            'paused': False, 'generation': 1
+        })
+    
+    workers = [
+        LearningWorker(
+            poll_interval=args.poll_interval,
+            use_change_stream=not args.no_change_stream,
+            num_threads=args.threads,
+            claim_batch_size=args.claim_batch,
+            shard_index=index if args.sharded else 0,
+            shard_count=args.workers if args.sharded else 1
+        )
+        for index in range(args.workers)
+    ]
+    
+    stats = {}
+    stop = threading.Event()
+    worker_output = io.StringIO()
+    
+    print(f"Injecting {args.events} events ({args.ingest}, "
+          f"rate={args.rate or 'max'}/s, skew={args.skew}) into {args.workers} worker(s)...")
+    
+    counter.enabled = True
+    started = time.monotonic()
+    
+    with contextlib.redirect_stdout(worker_output if not args.verbose else sys.stdout):
+        worker_threads = [
+            threading.Thread(target=worker.run, name=f"bench-worker-{index}", daemon=True)
+            for index, worker in enumerate(workers)
+        ]
+        for thread in worker_threads:
+            thread.start()
+        
+        monitor_thread = threading.Thread(
+            target=monitor, args=(db, args.events, stop, stats), name=MONITOR_THREAD
+        )
+        monitor_thread.start()
+        
+        inject_thread = threading.Thread(
+            target=inject, args=(args, payloads, db, app.test_client(), stats),
+            name=INGEST_THREAD
+        )
+        inject_thread.start()
+        inject_thread.join()
+        
+        monitor_thread.join(timeout=args.timeout)
+        timed_out = monitor_thread.is_alive()
+        stop.set()
+        monitor_thread.join()
+        
+        elapsed = time.monotonic() - started
+        counter.enabled = False
+        
+        for worker in workers:
+            worker.stop()
+        for thread in worker_threads:
+            thread.join(timeout=args.poll_interval + 5)
+    
+    # End-to-end lag: ingestion timestamp -> completed_at
+    latencies = [
+        (event['completed_at'] - event['timestamp']).total_seconds() * 1000
+        for event in db.learning_events.find(
+            {'completed': True}, {'timestamp': 1, 'completed_at': 1}
+        )
+    ]
+    completed = len(latencies)
+    dead = db.learning_events_dead.count_documents({})
+    
+    ops_total = counter.by_phase['ingest'] + counter.by_phase['worker']
+    per_event = lambda ops: round(ops / completed, 3) if completed else None
+    
+    return {
+        'benchmark': 'learning_worker',
+        'started_at': datetime.utcnow().isoformat(),
+        'config': {
+            key: value for key, value in vars(args).items() if key != 'output'
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'pymongo': pymongo.version,
+            'mongodb': Database._client.server_info().get('version'),
+            'cpu_count': os.cpu_count()
+        },
+        'results': {
+            'events_completed': completed,
+            'events_dead_lettered': dead,
+            'timed_out': timed_out,
+            'elapsed_seconds': round(elapsed, 3),
+            'ingest_seconds': round(stats.get('ingest_seconds', 0.0), 3),
+            'throughput_eps': round(completed / elapsed, 2) if elapsed else None,
+            'latency_ms': percentiles(latencies),
+            'max_queue_depth': stats.get('max_queue_depth'),
+            'ops': {
+                'total': ops_total,
+                'per_event': per_event(ops_total),
+                'ingest_per_event': per_event(counter.by_phase['ingest']),
+                'worker_per_event': per_event(counter.by_phase['worker']),
+                'by_command': dict(counter.by_command.most_common())
+            },
+            'queue_samples': stats.get('queue_samples', [])
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LearningWorker throughput and lag")
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--events', type=int, default=10000)
+    parser.add_argument('--rate', type=float, default=0,
+                        help="Injected events/sec (0 = as fast as possible)")
+    parser.add_argument('--skew', type=float, default=1.0,
+                        help="Zipf exponent over students (0 = uniform)")
+    parser.add_argument('--ingest', choices=['route', 'batch', 'direct'], default='route')
+    parser.add_argument('--ingest-batch', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=Config.WORKER_THREADS)
+    parser.add_argument('--claim-batch', type=int, default=Config.WORKER_CLAIM_BATCH)
+    parser.add_argument('--sharded', action='store_true',
+                        help="Give each worker its own shard instead of competing")
+    parser.add_argument('--poll-interval', type=float, default=Config.WORKER_POLL_INTERVAL)
+    parser.add_argument('--no-change-stream', action='store_true')
+    parser.add_argument('--db-name', default=f"{Config.DB_NAME}_benchmark")
+    parser.add_argument('--timeout', type=float, default=600,
+                        help="Seconds to wait for completion after injection")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='worker_benchmark_report.json')
+    parser.add_argument('--verbose', action='store_true', help="Show worker output")
+    args = parser.parse_args()
+    
+    if args.db_name == Config.DB_NAME:
+        parser.error("--db-name must differ from the application database (it is dropped)")
+    
+    report = run_benchmark(args)
+    
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    
+    results = report['results']
+    print("=" * 60)
+    print(f"Completed:   {results['events_completed']} events "
+          f"({results['events_dead_lettered']} dead-lettered)")
+    print(f"Throughput:  {results['throughput_eps']} events/sec")
+    print(f"Latency ms:  {results['latency_ms']}")
+    print(f"Ops/event:   {results['ops']['per_event']} "
+          f"(worker {results['ops']['worker_per_event']})")
+    print(f"Report:      {args.output}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,3 +14,33 @@ class Config:
     ERROR_PENALTY = float(os.getenv('ERROR_PENALTY', '0.12'))
     MIN_MASTERY = float(os.getenv('MIN_MASTERY', '0.05'))
     MAX_MASTERY = float(os.getenv('MAX_MASTERY', '0.95'))
+    MASTERY_CACHE_SIZE = int(os.getenv('MASTERY_CACHE_SIZE', '10000'))
+    MASTERY_CACHE_TTL = float(os.getenv('MASTERY_CACHE_TTL', '1.0'))
+    BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', '10000'))
+    WORKER_POLL_INTERVAL = float(os.getenv('WORKER_POLL_INTERVAL', '1.0'))
+    WORKER_MIN_POLL_INTERVAL = float(os.getenv('WORKER_MIN_POLL_INTERVAL', '0.05'))
+    WORKER_USE_CHANGE_STREAM = os.getenv('WORKER_USE_CHANGE_STREAM', 'true').lower() == 'true'
+    WORKER_THREADS = int(os.getenv('WORKER_THREADS', '4'))
+    WORKER_CLAIM_BATCH = int(os.getenv('WORKER_CLAIM_BATCH', '20'))
+    WORKER_LEASE_SECONDS = float(os.getenv('WORKER_LEASE_SECONDS', '60'))
+    WORKER_MAX_ATTEMPTS = int(os.getenv('WORKER_MAX_ATTEMPTS', '5'))
+    WORKER_RETRY_BASE_SECONDS = float(os.getenv('WORKER_RETRY_BASE_SECONDS', '2'))
+    WORKER_RETRY_MAX_SECONDS = float(os.getenv('WORKER_RETRY_MAX_SECONDS', '300'))
+    LEARNER_STATE_HISTORY_TTL_DAYS = float(os.getenv('LEARNER_STATE_HISTORY_TTL_DAYS', '30'))
+    NOTIFY_POLL_INTERVAL = float(os.getenv('NOTIFY_POLL_INTERVAL', '0.25'))
+    NOTIFY_QUEUE_SIZE = int(os.getenv('NOTIFY_QUEUE_SIZE', '100'))
+    NOTIFY_POLL_OVERLAP = float(os.getenv('NOTIFY_POLL_OVERLAP', '30'))
+    EVENT_WAIT_MAX_TIMEOUT = float(os.getenv('EVENT_WAIT_MAX_TIMEOUT', '30'))
+    SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+    SHARD_BUCKETS = int(os.getenv('SHARD_BUCKETS', '1024'))
+    WORKER_SHARD_INDEX = int(os.getenv('WORKER_SHARD_INDEX', '0'))
+    WORKER_SHARD_COUNT = int(os.getenv('WORKER_SHARD_COUNT', '1'))
+    CATALOG_CHECK_INTERVAL = float(os.getenv('CATALOG_CHECK_INTERVAL', '5'))
+    RECOMMENDATIONS_MAX_K = int(os.getenv('RECOMMENDATIONS_MAX_K', '20'))
+    RECOMMENDATION_PRECOMPUTE = os.getenv('RECOMMENDATION_PRECOMPUTE', 'true').lower() == 'true'
+    RECOMMENDATION_CACHE_K = int(os.getenv('RECOMMENDATION_CACHE_K', '5'))
+    RECOMMENDATION_TTL_SECONDS = float(os.getenv('RECOMMENDATION_TTL_SECONDS', '300'))
+    CALIBRATION_MIN_ATTEMPTS = int(os.getenv('CALIBRATION_MIN_ATTEMPTS', '30'))
+    CALIBRATION_PRIOR_SD = float(os.getenv('CALIBRATION_PRIOR_SD', '0.5'))
+    SIMILARITY_INDEX_PATH = os.getenv('SIMILARITY_INDEX_PATH', 'problem_similarity.json')
+    SIMILAR_PROBLEMS_K = int(os.getenv('SIMILAR_PROBLEMS_K', '10'))
@@ -1,6 +1,6 @@
 """Database connection module."""
 from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from pymongo.errors import ConnectionFailure, OperationFailure, ServerSelectionTimeoutError
 from config import Config
 
 class Database:
@@ -31,8 +31,50 @@ class Database:
         """Create necessary indexes for performance."""
         cls._db.students.create_index('student_id', unique=True)
         cls._db.student_skills.create_index([('student_id', 1), ('skill_id', 1)], unique=True)
+        # Covers batch state reads (no document fetch)
+        cls._db.student_skills.create_index([
+            ('student_id', 1), ('skill_id', 1), ('mastery', 1), ('last_updated', 1)
+        ])
         cls._db.skill_history.create_index([('student_id', 1), ('timestamp', -1)])
         cls._db.performance_history.create_index([('student_id', 1), ('timestamp', -1)])
+        cls._db.sequence_logs.create_index([('student_id', 1), ('timestamp', -1)])
+        cls._create_learning_event_indexes()
+        cls._create_learner_state_indexes()
+    
+    @classmethod
+    def _create_learning_event_indexes(cls):
+        """Create learning_events indexes shared by ingestion and the worker."""
+        # Unique index on submission_id (idempotency, duplicate detection)
+        cls._db.learning_events.create_index('submission_id', unique=True)
+        # Per-student claiming in timestamp order (_id breaks ties within a batch)
+        cls._db.learning_events.create_index([
+            ('student_id', 1), ('processing.bkt', 1), ('timestamp', 1), ('_id', 1)
+        ])
+        # Sharded workers: pending students of the buckets they own
+        cls._db.learning_events.create_index([
+            ('student_shard', 1), ('processing.bkt', 1), ('student_id', 1), ('timestamp', 1)
+        ])
+        # Lease reaping
+        cls._db.learning_events.create_index([
+            ('processing.bkt', 1), ('processing.lease_expires_at', 1)
+        ])
+    
+    @classmethod
+    def _create_learner_state_indexes(cls):
+        """Create learner_state (one document per student) and history indexes."""
+        try:
+            cls._db.learner_state.create_index('student_id', unique=True)
+        except OperationFailure as e:
+            # Legacy append-only documents hold duplicate student_ids
+            print(f"⚠ learner_state unique index not created ({e}). "
+                  "Run utils/compact_learner_state.py to collapse old documents.")
+        
+        cls._db.learner_state_history.create_index([('student_id', 1), ('updated_at', -1)])
+        if Config.LEARNER_STATE_HISTORY_TTL_DAYS > 0:
+            cls._db.learner_state_history.create_index(
+                'updated_at',
+                expireAfterSeconds=int(Config.LEARNER_STATE_HISTORY_TTL_DAYS * 86400)
+            )
     
     @classmethod
     def get_db(cls):
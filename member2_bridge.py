@@ -3,27 +3,25 @@ Bridge: Member 3 Error Analysis → Member 2 Learner State
 Converts Member 3's output to Member 2's /learn endpoint format
 """
 
+import json
+import queue
+import random
 import sys
+import threading
+import time
 sys.path.append('../member2_work')
 
 from error_mining_interface import analyze_learner_submission
 from error_taxonomy import DSASubskill
 import requests
+from requests.adapters import HTTPAdapter
+from utils.skill_ontology import SkillOntology
 
-# Member 2 skill mapping
+# Member 2 skill mapping, derived from skill_ontology.json
 SKILL_MAP = {
-    DSASubskill.ARRAY_TRAVERSAL: "arrays",
-    DSASubskill.ARRAY_MANIPULATION: "arrays",
-    DSASubskill.SEARCHING: "binary_search",
-    DSASubskill.TWO_POINTER: "two_pointers",
-    DSASubskill.HASH_TABLE: "hashmaps",
-    DSASubskill.RECURSION: "recursion",
-    DSASubskill.STACK_OPS: "stack_queue",
-    DSASubskill.QUEUE_OPS: "stack_queue",
-    DSASubskill.SLIDING_WINDOW: "sliding_window",
-    DSASubskill.DYNAMIC_PROGRAMMING: "dynamic_programming",
-    DSASubskill.GRAPH_TRAVERSAL: "graphs",
-    DSASubskill.GRAPH_ALGORITHMS: "graphs",
+    subskill: SkillOntology.primary(subskill.value)
+    for subskill in DSASubskill
+    if SkillOntology.primary(subskill.value) is not None
 }
 
 def convert_to_member2_format(submission_id: str, student_id: str, problem_id: str,
@@ -37,11 +35,9 @@ def convert_to_member2_format(submission_id: str, student_id: str, problem_id: s
     analysis = analyze_learner_submission(code, test_results, problem_skills)
     
     # Map skills to Member 2 format
-    mapped_skills = list(set(
-        SKILL_MAP.get(skill, skill.value) 
-        for skill in problem_skills 
-        if skill in SKILL_MAP
-    ))
+    mapped_skills = SkillOntology.normalize(
+        getattr(skill, 'value', skill) for skill in problem_skills
+    )
     
     # Determine error type
     error_type = "none"
@@ -64,11 +60,216 @@ def convert_to_member2_format(submission_id: str, student_id: str, problem_id: s
         }
     }
 
-def send_to_member2(member2_url: str, payload: dict) -> dict:
+def _new_session(pool_size: int = 10) -> requests.Session:
+    """Create a keep-alive session with a bounded connection pool"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+# Shared keep-alive session for the one-shot helpers below
+_session = _new_session()
+
+def send_to_member2(member2_url: str, payload: dict, timeout: float = 10.0) -> dict:
     """Send to Member 2 backend"""
-    response = requests.post(f"{member2_url}/learn", json=payload)
+    response = _session.post(f"{member2_url}/learn", json=payload, timeout=timeout)
+    return response.json()
+
+def send_batch_to_member2(member2_url: str, payloads: list, timeout: float = 30.0) -> dict:
+    """
+    Send many payloads to Member 2 in one request (POST /learn/batch)
+    
+    Returns: dict with per-event results ("accepted" | "duplicate" | "invalid")
+    """
+    body = "".join(json.dumps(payload) + "\n" for payload in payloads)
+    response = _session.post(
+        f"{member2_url}/learn/batch",
+        data=body.encode("utf-8"),
+        headers={"Content-Type": "application/x-ndjson"},
+        timeout=timeout
+    )
     return response.json()
 
+
+class Member2Client:
+    """
+    Buffered, batching client for Member 2's /learn/batch endpoint
+    
+    Payloads from convert_to_member2_format are queued with submit() and
+    posted by a background thread once batch_size payloads are waiting or
+    flush_interval seconds have passed, over one pooled keep-alive
+    session. The queue is bounded: submit() blocks (or gives up after its
+    timeout) when max_pending payloads are waiting. Failed posts are
+    retried with exponential back-off and jitter; since /learn/batch is
+    idempotent on submission_id, a retried batch is never double counted.
+    
+    Usage:
+        with Member2Client("http://127.0.0.1:5000") as client:
+            client.submit(payload)
+    """
+    
+    def __init__(self, member2_url: str, batch_size: int = 100, flush_interval: float = 0.5,
+                 max_pending: int = 10000, max_retries: int = 3, retry_base: float = 0.2,
+                 timeout: float = 10.0, pool_size: int = 4):
+        self.member2_url = member2_url.rstrip("/")
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.timeout = timeout
+        
+        self._session = _new_session(pool_size)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "rejected": 0,   # submit() timed out on a full queue
+            "sent": 0,       # accepted or duplicate at Member 2
+            "invalid": 0,    # rejected by Member 2 validation
+            "failed": 0,     # dropped after max_retries
+            "batches": 0,
+            "retries": 0,
+            "latency_total": 0.0,
+            "latency_max": 0.0
+        }
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name="member2-client", daemon=True)
+        self._thread.start()
+    
+    def submit(self, payload: dict, block: bool = True, timeout: float = None) -> bool:
+        """
+        Queue a payload for the next batch
+        
+        Returns: True if queued, False if the queue stayed full for timeout seconds
+        """
+        if self._closed.is_set():
+            raise RuntimeError("Member2Client is closed")
+        
+        try:
+            self._queue.put(payload, block=block, timeout=timeout)
+        except queue.Full:
+            self._count("rejected")
+            return False
+        
+        self._count("submitted")
+        return True
+    
+    def send(self, payload: dict) -> dict:
+        """Send one payload immediately (POST /learn) over the pooled session"""
+        return self._session.post(
+            f"{self.member2_url}/learn", json=payload, timeout=self.timeout
+        ).json()
+    
+    def flush(self):
+        """Block until every queued payload has been sent or dropped"""
+        self._queue.join()
+    
+    def close(self):
+        """Flush outstanding payloads, stop the flush thread and close the session"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._thread.join()
+        self._session.close()
+    
+    def stats(self) -> dict:
+        """Counters plus mean/max batch latency in seconds"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["pending"] = self._queue.qsize()
+        stats["latency_avg"] = (
+            stats["latency_total"] / stats["batches"] if stats["batches"] else 0.0
+        )
+        return stats
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def _count(self, key: str, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+    
+    def _flush_loop(self):
+        """Collect payloads into size- or time-bounded batches and post them"""
+        while True:
+            batch = []
+            deadline = None
+            
+            while len(batch) < self.batch_size:
+                if deadline is None:
+                    wait = self.flush_interval
+                else:
+                    wait = deadline - time.monotonic()
+                    if wait <= 0:
+                        break
+                try:
+                    batch.append(self._queue.get(timeout=wait))
+                except queue.Empty:
+                    if batch or self._closed.is_set():
+                        break
+                    continue
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            
+            if batch:
+                try:
+                    self._post_batch(batch)
+                except Exception as e:
+                    # Never let one batch kill the thread; flush() would block forever
+                    print(f"Member2Client: dropping batch of {len(batch)}: {e}")
+                    self._count("failed", len(batch))
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+            elif self._closed.is_set():
+                return
+    
+    def _post_batch(self, batch: list):
+        """Post one batch, retrying transport errors and 5xx with jittered back-off"""
+        body = "".join(json.dumps(payload) + "\n" for payload in batch).encode("utf-8")
+        
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            try:
+                response = self._session.post(
+                    f"{self.member2_url}/learn/batch",
+                    data=body,
+                    headers={"Content-Type": "application/x-ndjson"},
+                    timeout=self.timeout
+                )
+                if response.status_code < 500:
+                    response.raise_for_status()
+                    result = response.json()
+                    latency = time.monotonic() - started
+                    with self._stats_lock:
+                        self._stats["sent"] += result.get("accepted", 0) + result.get("duplicate", 0)
+                        self._stats["invalid"] += result.get("invalid", 0)
+                        self._stats["batches"] += 1
+                        self._stats["latency_total"] += latency
+                        self._stats["latency_max"] = max(self._stats["latency_max"], latency)
+                    return
+                error = f"HTTP {response.status_code}"
+            except requests.HTTPError as e:
+                # 4xx: the batch itself is malformed, retrying will not help
+                print(f"Member2Client: batch of {len(batch)} rejected: {e}")
+                break
+            except (requests.RequestException, ValueError) as e:
+                # Transport errors, timeouts, redirect loops, truncated bodies, bad JSON
+                error = str(e)
+            
+            if attempt < self.max_retries:
+                self._count("retries")
+                time.sleep(self.retry_base * 2 ** attempt * random.uniform(0.5, 1.0))
+        else:
+            print(f"Member2Client: dropping batch of {len(batch)} after "
+                  f"{self.max_retries + 1} attempts: {error}")
+        
+        self._count("failed", len(batch))
+
 # Example usage
 if __name__ == "__main__":
     code = """
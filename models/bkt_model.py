@@ -1,13 +1,27 @@
 """Bayesian Knowledge Tracing model for probabilistic mastery updates."""
 import json
 import os
+from datetime import datetime
+from error_taxonomy import ERROR_PATTERNS, ErrorCategory
+
+# Error types that carry no evidence weight and are not counted as unresolved
+NEUTRAL_ERROR_TYPES = {'none', 'incorrect'}
+
+# Upper bound on memoized free-text error types
+MAX_RESOLVED_ERROR_TYPES = 1024
+
+SECONDS_PER_DAY = 86400.0
 
 class BKTModel:
     """Bayesian Knowledge Tracing implementation."""
     
     _params = None
     _prerequisites = None
+    _forgetting = None
     _error_weights = None
+    _error_weight_table = None
+    _resolved_error_types = {}
+    _unresolved_error_types = {}
     
     @classmethod
     def load_params(cls):
@@ -17,11 +31,57 @@ class BKTModel:
             with open(params_path, 'r') as f:
                 data = json.load(f)
                 cls._params = {k: v for k, v in data.items() 
-                              if k not in ['error_type_weights', 'skill_prerequisites']}
+                              if k not in ['error_type_weights', 'skill_prerequisites',
+                                           'forgetting']}
                 cls._error_weights = data.get('error_type_weights', {})
                 cls._prerequisites = data.get('skill_prerequisites', {})
+                cls._forgetting = data.get('forgetting', {})
+                cls._error_weight_table = cls._build_error_weight_table()
         return cls._params
     
+    @classmethod
+    def _build_error_weight_table(cls):
+        """
+        Precompute evidence weights for every known error type.
+        
+        Covers the configured weight keys, every ErrorCategory value and
+        every ERROR_PATTERNS ID (resolved through its category), so the
+        identifiers produced by Member 3 never need a substring scan.
+        
+        Returns:
+            dict: Lowercased error type -> weight
+        """
+        table = {key.lower(): weight for key, weight in cls._error_weights.items()}
+        
+        for category in ErrorCategory:
+            if category.value not in table:
+                weight = cls._match_error_weight(category.value)
+                table[category.value] = weight if weight is not None else 1.0
+        
+        for error_id, pattern in ERROR_PATTERNS.items():
+            table[error_id.lower()] = table[pattern.category.value]
+        
+        for error_type in NEUTRAL_ERROR_TYPES:
+            table.setdefault(error_type, 1.0)
+        
+        return table
+    
+    @classmethod
+    def _match_error_weight(cls, error_lower):
+        """
+        Resolve a free-text error type by partial match against weight keys.
+        
+        Args:
+            error_lower: Lowercased error type
+            
+        Returns:
+            float or None: Matched weight, None if nothing matched
+        """
+        for key, weight in cls._error_weights.items():
+            if key in error_lower or error_lower in key:
+                return weight
+        return None
+    
     @classmethod
     def get_skill_params(cls, skill_id):
         """
@@ -100,19 +160,52 @@ class BKTModel:
         Returns:
             float: Weight multiplier (default 1.0)
         """
-        if cls._error_weights is None:
+        if cls._error_weight_table is None:
             cls.load_params()
         
         if not error_type:
             return 1.0
         
-        # Match error type (case-insensitive, partial match)
         error_lower = error_type.lower()
-        for key, weight in cls._error_weights.items():
-            if key in error_lower or error_lower in key:
-                return weight
+        weight = cls._error_weight_table.get(error_lower)
+        if weight is None:
+            weight = cls._resolved_error_types.get(error_lower)
+        if weight is not None:
+            return weight
+        
+        if error_lower in cls._unresolved_error_types:
+            cls._unresolved_error_types[error_lower] += 1
+            return 1.0
+        
+        # Free-text error type: partial match once, then memoize
+        weight = cls._match_error_weight(error_lower)
+        if weight is None:
+            if len(cls._unresolved_error_types) < MAX_RESOLVED_ERROR_TYPES:
+                cls._unresolved_error_types[error_lower] = 1
+            return 1.0
+        
+        if len(cls._resolved_error_types) < MAX_RESOLVED_ERROR_TYPES:
+            cls._resolved_error_types[error_lower] = weight
+        return weight
+    
+    @classmethod
+    def get_error_weight_diagnostics(cls):
+        """
+        Report how incoming error types resolve to evidence weights.
+        
+        Returns:
+            dict: {weights: {error_type: weight},
+                   resolved: {free-text error_type: weight},
+                   unresolved: {error_type: times defaulted to 1.0}}
+        """
+        if cls._error_weight_table is None:
+            cls.load_params()
         
-        return 1.0
+        return {
+            'weights': dict(cls._error_weight_table),
+            'resolved': dict(cls._resolved_error_types),
+            'unresolved': dict(cls._unresolved_error_types)
+        }
     
     @classmethod
     def compute_confidence(cls, attempts, solve_time):
@@ -205,6 +298,114 @@ class BKTModel:
         
         return min(boost, 0.05)  # Max boost of 0.05
     
+    @classmethod
+    def get_forgetting_floor(cls):
+        """Get the mastery level that forgetting decays toward."""
+        if cls._forgetting is None:
+            cls.load_params()
+        return cls._forgetting.get('floor', 0.2)
+    
+    @classmethod
+    def get_half_life_seconds(cls, skill_id):
+        """
+        Get the forgetting half-life for a skill.
+        
+        Args:
+            skill_id: Skill identifier
+            
+        Returns:
+            float: Half-life in seconds, or None if forgetting is disabled
+        """
+        if cls._forgetting is None:
+            cls.load_params()
+        
+        half_lives = cls._forgetting.get('half_life_days', {})
+        days = half_lives.get(skill_id, half_lives.get('default'))
+        if not days:
+            return None
+        return days * SECONDS_PER_DAY
+    
+    @classmethod
+    def apply_forgetting(cls, mastery, last_updated, skill_id, now=None):
+        """
+        Compute effective mastery after time-based forgetting.
+        
+        Evaluated lazily at read time; the decayed value is only persisted
+        when the skill is next updated.
+        
+        Formula: effective = floor + (mastery - floor) * 0.5^(elapsed / half_life)
+        
+        Args:
+            mastery: Stored mastery value
+            last_updated: Datetime of the last stored update
+            skill_id: Skill identifier
+            now: Evaluation time (defaults to utcnow)
+            
+        Returns:
+            float: Effective mastery (never below the stored value if it is
+                   already under the floor)
+        """
+        floor = cls.get_forgetting_floor()
+        half_life = cls.get_half_life_seconds(skill_id)
+        if half_life is None or last_updated is None or mastery <= floor:
+            return mastery
+        
+        elapsed = ((now or datetime.utcnow()) - last_updated).total_seconds()
+        if elapsed <= 0:
+            return mastery
+        
+        return floor + (mastery - floor) * 0.5 ** (elapsed / half_life)
+    
+    @classmethod
+    def forgetting_expression(cls, now, skill_ids):
+        """
+        Build a MongoDB aggregation expression for effective mastery.
+        
+        Mirrors apply_forgetting so reads can rank skills on the server.
+        
+        Args:
+            now: Evaluation time
+            skill_ids: Skill identifiers that may appear in the documents
+            
+        Returns:
+            dict: Aggregation expression over $mastery, $last_updated, $skill_id
+        """
+        floor = cls.get_forgetting_floor()
+        default_half_life = cls.get_half_life_seconds('default')
+        branches = []
+        for skill_id in skill_ids:
+            half_life = cls.get_half_life_seconds(skill_id)
+            if half_life != default_half_life:
+                branches.append({
+                    'case': {'$eq': ['$skill_id', skill_id]},
+                    'then': (half_life or 0) * 1000.0
+                })
+        half_life_ms = (
+            {'$switch': {'branches': branches, 'default': (default_half_life or 0) * 1000.0}}
+            if branches else (default_half_life or 0) * 1000.0
+        )
+        
+        elapsed_ms = {'$max': [0, {'$subtract': [now, {'$ifNull': ['$last_updated', now]}]}]}
+        
+        return {
+            '$let': {
+                'vars': {'half_life_ms': half_life_ms},
+                'in': {
+                    '$cond': [
+                        {'$or': [
+                            {'$lte': ['$mastery', floor]},
+                            {'$lte': ['$$half_life_ms', 0]}
+                        ]},
+                        '$mastery',
+                        {'$add': [floor, {'$multiply': [
+                            {'$subtract': ['$mastery', floor]},
+                            {'$pow': [0.5, {'$divide': [elapsed_ms, '$$half_life_ms']}]}
+                        ]}]}
+                    ]
+                }
+            }
+        }
+    
     @classmethod
     def clamp_mastery(cls, mastery):
         """
@@ -0,0 +1,32 @@
+"""Learning event queue model shared by the API and the learning worker."""
+from datetime import datetime
+from db import Database
+
+class LearningEventModel:
+    """Read-side queries over learning_events."""
+    
+    @staticmethod
+    def get_queue_metrics():
+        """
+        Get learning event queue metrics.
+        
+        Returns:
+            dict: {queue_depth, backing_off, in_flight, expired_leases,
+                   dead_letter}
+        """
+        db = Database.get_db()
+        now = datetime.utcnow()
+        
+        return {
+            'queue_depth': db.learning_events.count_documents({'processing.bkt': False}),
+            'backing_off': db.learning_events.count_documents({
+                'processing.bkt': False,
+                'processing.next_attempt_at': {'$gt': now}
+            }),
+            'in_flight': db.learning_events.count_documents({'processing.bkt': 'processing'}),
+            'expired_leases': db.learning_events.count_documents({
+                'processing.bkt': 'processing',
+                'processing.lease_expires_at': {'$lt': now}
+            }),
+            'dead_letter': db.learning_events_dead.estimated_document_count()
+        }
@@ -0,0 +1,286 @@
+"""In-process problem catalog for fast candidate selection."""
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from pymongo import ReturnDocument
+from config import Config
+from db import Database
+from utils.skill_ontology import SkillOntology
+
+# catalog_meta document whose version is bumped on every reseed or calibration
+CATALOG_META_ID = 'problems'
+
+# Compact metadata kept per problem (no description / test_cases)
+CATALOG_FIELDS = ('title', 'difficulty', 'primary_skill', 'skills', 'skill_ids', 'primary_skill_id')
+
+# Difficulty assumed by the sequencer when a problem has none
+DEFAULT_DIFFICULTY = 0.5
+
+class CatalogSnapshot:
+    """
+    Immutable arrays for one catalog version.
+    
+    Problems are addressed by their position in bank order. Skills are
+    the interned SkillOntology IDs: each problem has a uint64 skill
+    bitmask and an integer primary skill, so weak-skill matching and
+    stagnation / redemption checks are array operations. Positions are
+    also kept sorted by difficulty so a difficulty window is two
+    searchsorted calls.
+    
+    Calibrated difficulties (problem_calibration, written by
+    utils/calibrate_difficulty.py) replace the authored ones; the entry
+    keeps the authored value as authored_difficulty.
+    """
+    
+    def __init__(self, docs, version, calibrated=None):
+        self.version = version
+        self.entries = []
+        self.index_of = {}
+        
+        difficulties = []
+        primary_codes = []
+        masks = []
+        
+        for order, doc in enumerate(docs):
+            problem_id = str(doc['_id'])
+            entry = {'_id': problem_id, **{k: doc[k] for k in CATALOG_FIELDS if k in doc}}
+            if 'skill_ids' not in entry:
+                # Seeded before the ontology: normalize at load time
+                entry.update(SkillOntology.problem_skills(doc))
+            if calibrated and problem_id in calibrated:
+                entry['authored_difficulty'] = entry.get('difficulty')
+                entry['difficulty'] = calibrated[problem_id]
+            self.entries.append(entry)
+            self.index_of[problem_id] = order
+            
+            difficulty = entry.get('difficulty')
+            has_difficulty = isinstance(difficulty, (int, float))
+            difficulties.append(difficulty if has_difficulty else np.nan)
+            
+            primary_code = SkillOntology.index_of(entry.get('primary_skill_id'))
+            primary_codes.append(primary_code if primary_code is not None else -1)
+            masks.append(SkillOntology.to_mask(entry['skill_ids']))
+        
+        self.difficulty = np.asarray(difficulties, dtype=np.float64)
+        self.primary_code = np.asarray(primary_codes, dtype=np.int64)
+        self.skill_mask = np.asarray(masks, dtype=np.uint64)
+        
+        # Difficulty used for scoring: missing -> DEFAULT_DIFFICULTY
+        self.score_difficulty = np.where(
+            np.isnan(self.difficulty), DEFAULT_DIFFICULTY, self.difficulty
+        )
+        
+        self.by_difficulty = self._sorted_window([
+            (d, order) for order, d in enumerate(difficulties) if not np.isnan(d)
+        ])
+        # Skill masks in difficulty order: a window's masks are a contiguous slice
+        self.mask_by_difficulty = self.skill_mask[self.by_difficulty[1]]
+    
+    @staticmethod
+    def _sorted_window(rows):
+        """(sorted difficulties, bank positions) arrays for window lookups."""
+        rows = sorted(rows)
+        return (
+            np.asarray([r[0] for r in rows], dtype=np.float64),
+            np.asarray([r[1] for r in rows], dtype=np.int64)
+        )
+    
+    def skill_table(self, skills):
+        """
+        Boolean lookup table indexed by primary-skill code.
+        
+        table[primary_code] tells whether a problem's primary skill is in
+        skills (labels from any vocabulary); the extra last slot is
+        indexed by -1 (no tracked primary skill).
+        """
+        table = np.zeros(len(SkillOntology.get_skill_ids()) + 1, dtype=bool)
+        table[SkillOntology.indices(skills)] = True
+        return table
+
+
+class ProblemCatalog:
+    """
+    Read-mostly index of the problem bank held in memory.
+    
+    Entries hold compact metadata only; callers fetch the full document
+    for the problem they pick. The catalog reloads when
+    catalog_meta.version changes, checked at most every
+    CATALOG_CHECK_INTERVAL seconds.
+    """
+    
+    _lock = threading.Lock()
+    _snapshot = None
+    _checked_at = 0.0
+    
+    @classmethod
+    def load(cls):
+        """
+        (Re)build the catalog from the problems collection.
+        
+        Returns:
+            int: Number of problems loaded
+        """
+        db = Database.get_db()
+        version = cls._read_version(db)
+        projection = {field: 1 for field in CATALOG_FIELDS}
+        calibrated = {
+            str(doc['_id']): doc['difficulty']
+            for doc in db.problem_calibration.find({}, {'difficulty': 1})
+        }
+        return cls.load_documents(db.problems.find({}, projection), version, calibrated)
+    
+    @classmethod
+    def load_documents(cls, docs, version=0, calibrated=None):
+        """
+        Build the catalog from problem documents (used by load and benchmarks).
+        
+        Args:
+            docs: Iterable of problem documents in bank order
+            version: Catalog version the documents belong to
+            calibrated: Optional {problem_id: calibrated difficulty}
+            
+        Returns:
+            int: Number of problems loaded
+        """
+        snapshot = CatalogSnapshot(docs, version, calibrated)
+        with cls._lock:
+            cls._snapshot = snapshot
+            cls._checked_at = time.monotonic()
+        return len(snapshot.entries)
+    
+    @classmethod
+    def _read_version(cls, db):
+        """Read the catalog version (0 before the first versioned seed)."""
+        meta = db.catalog_meta.find_one({'_id': CATALOG_META_ID}, {'version': 1})
+        return meta.get('version', 0) if meta else 0
+    
+    @classmethod
+    def snapshot(cls):
+        """
+        Get the current catalog, loading on first use and reloading when
+        the catalog version changed.
+        
+        Returns:
+            CatalogSnapshot: Arrays for the current version
+        """
+        if cls._snapshot is None:
+            cls.load()
+        elif time.monotonic() - cls._checked_at >= Config.CATALOG_CHECK_INTERVAL:
+            version = cls._read_version(Database.get_db())
+            cls._checked_at = time.monotonic()
+            if version != cls._snapshot.version:
+                print(f"Problem catalog version {cls._snapshot.version} -> {version}; reloading")
+                cls.load()
+        return cls._snapshot
+    
+    @staticmethod
+    def bump_version(db=None):
+        """
+        Mark the problem bank as changed so every process reloads.
+        
+        Args:
+            db: Database handle (defaults to Database.get_db())
+            
+        Returns:
+            int: New catalog version
+        """
+        db = db if db is not None else Database.get_db()
+        meta = db.catalog_meta.find_one_and_update(
+            {'_id': CATALOG_META_ID},
+            {'$inc': {'version': 1}, '$set': {'updated_at': datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return meta['version']
+    
+    @classmethod
+    def get_entry(cls, problem_id):
+        """
+        Get a problem's compact catalog entry.
+        
+        Args:
+            problem_id: Problem identifier
+            
+        Returns:
+            dict: {_id, title, difficulty, primary_skill, skills} or None
+        """
+        snapshot = cls.snapshot()
+        order = snapshot.index_of.get(str(problem_id))
+        return dict(snapshot.entries[order]) if order is not None else None
+    
+    @classmethod
+    def get_candidate_indices(cls, snapshot, weak_skills, current_problem_id, target_challenge,
+                              margin=0.2):
+        """
+        Select candidate bank positions for the sequencer.
+        
+        Same tiers as the original Mongo queries: weak-skill problems in
+        the difficulty window, else all weak-skill problems, else any
+        problem in the window. Weak skills are matched against the
+        problem skill bitmasks, so problem tags and BKT skill IDs agree.
+        
+        Args:
+            snapshot: CatalogSnapshot to select from
+            weak_skills: Skills to target (any SkillOntology vocabulary)
+            current_problem_id: Problem to exclude
+            target_challenge: Centre of the difficulty window
+            margin: Half-width of the difficulty window
+            
+        Returns:
+            numpy.ndarray: Bank positions (unordered; sort for bank order)
+        """
+        low = max(0.0, target_challenge - margin)
+        high = min(1.0, target_challenge + margin)
+        exclude = snapshot.index_of.get(str(current_problem_id), -1)
+        weak_mask = np.uint64(SkillOntology.to_mask(weak_skills))
+        
+        difficulties, by_difficulty = snapshot.by_difficulty
+        start = np.searchsorted(difficulties, low, side='left')
+        end = np.searchsorted(difficulties, high, side='right')
+        
+        def finish(positions):
+            return positions[positions != exclude]
+        
+        candidates = np.empty(0, dtype=np.int64)
+        if weak_mask:
+            matches = (snapshot.mask_by_difficulty[start:end] & weak_mask) != 0
+            candidates = finish(by_difficulty[start:end][matches])
+            if not candidates.size:
+                candidates = finish(np.flatnonzero(snapshot.skill_mask & weak_mask))
+        if not candidates.size:
+            candidates = finish(by_difficulty[start:end])
+        return candidates
+    
+    @classmethod
+    def get_candidates(cls, weak_skills, current_problem_id, target_challenge, margin=0.2):
+        """
+        Select candidate problems for the sequencer.
+        
+        Args:
+            weak_skills: Skills to target
+            current_problem_id: Problem to exclude
+            target_challenge: Centre of the difficulty window
+            margin: Half-width of the difficulty window
+            
+        Returns:
+            list: Compact catalog entries in bank order
+        """
+        snapshot = cls.snapshot()
+        positions = cls.get_candidate_indices(
+            snapshot, weak_skills, current_problem_id, target_challenge, margin
+        )
+        return [dict(snapshot.entries[i]) for i in np.sort(positions)]
+    
+    @classmethod
+    def stats(cls):
+        """Catalog size, skill count and version."""
+        snapshot = cls._snapshot
+        if snapshot is None:
+            return {'problems': 0, 'skills': 0, 'version': None}
+        present = int(np.bitwise_or.reduce(snapshot.skill_mask)) if snapshot.skill_mask.size else 0
+        return {
+            'problems': len(snapshot.entries),
+            'skills': bin(present).count('1'),
+            'version': snapshot.version
+        }
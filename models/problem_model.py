@@ -1,4 +1,10 @@
 from db import Database
+from models.problem_catalog import ProblemCatalog
+
+# Read models: each path fetches only the fields it uses
+STATEMENT_FIELDS = ('title', 'difficulty', 'primary_skill', 'skills', 'description', 'constraints',
+                    'input_format', 'output_format')
+JUDGE_FIELDS = ('test_cases', 'primary_skill', 'skills', 'skill_ids')
 
 class ProblemModel:
     @staticmethod
@@ -6,40 +12,41 @@ class ProblemModel:
                                margin: float = 0.2):
         """
         Fetches only problems matching the student's weak skills and within the target difficulty range.
-        """
-        db = Database.get_db()
-
-        query = {
-            "_id": {"$ne": str(current_problem_id)},
-            "skills": {"$in": weak_skills},
-            "difficulty": {
-                "$gte": max(0.0, target_challenge - margin),
-                "$lte": min(1.0, target_challenge + margin)
-            }
-        }
 
-        candidates = list(db.problems.find(query))
+        Served from the in-memory ProblemCatalog; entries carry compact metadata
+        only, use get_statement for the chosen problem's text.
+        """
+        return ProblemCatalog.get_candidates(weak_skills, current_problem_id, target_challenge, margin)
 
-        if not candidates:
-            fallback_query = {
-                "_id": {"$ne": str(current_problem_id)},
-                "skills": {"$in": weak_skills}
-            }
-            candidates = list(db.problems.find(fallback_query))
+    @staticmethod
+    def get_catalog_view(problem_id):
+        """
+        Sequencing view: {_id, title, difficulty, primary_skill, skills, skill_ids,
+        primary_skill_id} from the in-memory catalog, or None.
+        """
+        return ProblemCatalog.get_entry(problem_id)
 
-        if not candidates:
-            final_query = {
-                "_id": {"$ne": str(current_problem_id)},
-                "difficulty": {
-                    "$gte": max(0.0, target_challenge - margin),
-                    "$lte": min(1.0, target_challenge + margin)
-                }
-            }
-            candidates = list(db.problems.find(final_query))
+    @staticmethod
+    def get_statement(problem_id):
+        """
+        Client view: the problem text and metadata without test cases, or None.
+        """
+        db = Database.get_db()
+        problem = db.problems.find_one({"_id": str(problem_id)}, {field: 1 for field in STATEMENT_FIELDS})
+        if problem:
+            problem['_id'] = str(problem['_id'])
+        return problem
 
-        return candidates
+    @staticmethod
+    def get_judge_view(problem_id):
+        """
+        Judge view: test cases plus the skills needed to score the attempt, or None.
+        """
+        db = Database.get_db()
+        return db.problems.find_one({"_id": str(problem_id)}, {field: 1 for field in JUDGE_FIELDS})
 
     @staticmethod
     def get_problem_by_id(problem_id):
+        """Full problem document, including hidden test cases (never send to clients)."""
         db = Database.get_db()
-        return db.problems.find_one({"_id": str(problem_id)})
\ No newline at end of file
+        return db.problems.find_one({"_id": str(problem_id)})
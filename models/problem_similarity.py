@@ -0,0 +1,164 @@
+"""Similar-problem index: TF-IDF nearest neighbours over problem statements."""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from config import Config
+
+class ProblemSimilarity:
+    """
+    Precomputed nearest-neighbour table of the problem bank.
+    
+    Built at seed time (utils/seed_problems.py) from TF-IDF vectors of
+    each problem's title, description and skills, and stored as JSON at
+    SIMILARITY_INDEX_PATH: {problem_id: [[neighbour_id, cosine], ...]},
+    most similar first, SIMILAR_PROBLEMS_K per problem. Lookups are a
+    dict access and a slice; the file is reloaded when it changes,
+    checked at most every CATALOG_CHECK_INTERVAL seconds.
+    
+    The file is the only copy of the index, so SIMILARITY_INDEX_PATH must
+    be on storage shared by the seeder and every API process; a process
+    that cannot see it serves no similar problems.
+    """
+    
+    _lock = threading.Lock()
+    _neighbours = None
+    _mtime = None
+    _checked_at = 0.0
+    
+    @staticmethod
+    def index_path():
+        """SIMILARITY_INDEX_PATH; relative paths are resolved from the project root."""
+        path = Config.SIMILARITY_INDEX_PATH
+        if os.path.isabs(path):
+            return path
+        return os.path.join(os.path.dirname(__file__), '..', path)
+    
+    @staticmethod
+    def document_text(problem):
+        """
+        Text indexed for a problem.
+        
+        Skill IDs are added as single skill_<id> tokens so problems sharing
+        a canonical skill match even when their authored labels differ.
+        """
+        parts = [str(problem.get('title') or ''), str(problem.get('description') or '')]
+        labels = [problem.get('primary_skill')] + list(problem.get('skills') or [])
+        parts.extend(str(label) for label in labels if label is not None)
+        parts.extend(f"skill_{skill_id}" for skill_id in problem.get('skill_ids') or [])
+        return '\n'.join(parts)
+    
+    @staticmethod
+    def build(problems, k=None):
+        """
+        Compute the nearest-neighbour table.
+        
+        Args:
+            problems: Iterable of problem documents with _id, title,
+                description, primary_skill, skills and skill_ids
+            k: Neighbours kept per problem (default SIMILAR_PROBLEMS_K)
+            
+        Returns:
+            dict: {problem_id: [[neighbour_id, cosine similarity], ...]}
+        """
+        # scikit-learn is only needed where the index is built (seed time)
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.neighbors import NearestNeighbors
+        
+        k = k or Config.SIMILAR_PROBLEMS_K
+        problem_ids = []
+        texts = []
+        for problem in problems:
+            problem_ids.append(str(problem['_id']))
+            texts.append(ProblemSimilarity.document_text(problem))
+        
+        if len(problem_ids) < 2:
+            return {problem_id: [] for problem_id in problem_ids}
+        
+        vectors = TfidfVectorizer(stop_words='english', sublinear_tf=True).fit_transform(texts)
+        # Brute-force cosine search works directly on the sparse vectors
+        nearest = NearestNeighbors(n_neighbors=min(k + 1, len(problem_ids)),
+                                   metric='cosine', algorithm='brute').fit(vectors)
+        distances, indices = nearest.kneighbors(vectors)
+        
+        table = {}
+        for row, (row_distances, row_indices) in enumerate(zip(distances, indices)):
+            table[problem_ids[row]] = [
+                [problem_ids[col], round(1.0 - float(distance), 4)]
+                for distance, col in zip(row_distances, row_indices)
+                if col != row and distance < 1.0
+            ][:k]
+        return table
+    
+    @classmethod
+    def save(cls, table, version=None):
+        """
+        Write the table to SIMILARITY_INDEX_PATH atomically.
+        
+        Args:
+            table: Output of build
+            version: Catalog version the table was built from
+        """
+        path = cls.index_path()
+        data = {
+            'version': version,
+            'built_at': datetime.utcnow().isoformat(),
+            'problems': table
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def load(cls):
+        """
+        (Re)load the table from SIMILARITY_INDEX_PATH.
+        
+        Returns:
+            int: Number of problems in the table (0 if there is no index yet)
+        """
+        path = cls.index_path()
+        try:
+            mtime = os.stat(path).st_mtime
+            with open(path, 'r', encoding='utf-8') as f:
+                neighbours = json.load(f)['problems']
+        except FileNotFoundError:
+            mtime, neighbours = None, {}
+        
+        with cls._lock:
+            cls._neighbours = neighbours
+            cls._mtime = mtime
+            cls._checked_at = time.monotonic()
+        return len(neighbours)
+    
+    @classmethod
+    def _table(cls):
+        """Current table, reloading when the file changed."""
+        if cls._neighbours is None:
+            cls.load()
+        elif time.monotonic() - cls._checked_at >= Config.CATALOG_CHECK_INTERVAL:
+            try:
+                mtime = os.stat(cls.index_path()).st_mtime
+            except FileNotFoundError:
+                mtime = None
+            cls._checked_at = time.monotonic()
+            if mtime != cls._mtime:
+                cls.load()
+        return cls._neighbours
+    
+    @classmethod
+    def get_similar(cls, problem_id, k=None):
+        """
+        Get the problems most similar to one problem.
+        
+        Args:
+            problem_id: Problem identifier
+            k: Maximum number of neighbours (default all stored)
+            
+        Returns:
+            list: [neighbour_id, cosine similarity] pairs, most similar first
+        """
+        neighbours = cls._table().get(str(problem_id), [])
+        return neighbours[:k] if k else list(neighbours)
@@ -1,10 +1,20 @@
 from db import Database
 from datetime import datetime
+from models.problem_catalog import ProblemCatalog
+
+# Logs read per sequencing decision; covers recent results (5) and skills (2)
+SEQUENCING_WINDOW = 50
+
+# session_state ring sizes: recent decisions (momentum, stagnation) and failures (redemption)
+SESSION_RECENT_SIZE = 5
+SESSION_FAILED_SIZE = 10
+MOMENTUM_DECAY = 0.75
 
 
 class SequenceLogModel:
     @staticmethod
-    def log_decision(student_id, prev_problem_id, next_problem_id, mastery, momentum, target_challenge, was_correct):
+    def log_decision(student_id, prev_problem_id, next_problem_id, mastery, momentum, target_challenge, was_correct,
+                     next_primary_skill=None):
         db = Database.get_db()
         log_entry = {
             "student_id": student_id,
@@ -18,8 +28,206 @@ class SequenceLogModel:
             },
             "timestamp": datetime.utcnow()
         }
+        # Denormalized so reads don't need a problems lookup per log
+        if next_primary_skill is not None:
+            log_entry["next_primary_skill"] = next_primary_skill
         db.sequence_logs.insert_one(log_entry)
 
+        SequenceLogModel.update_session_state(student_id, next_problem_id, next_primary_skill,
+                                              was_correct, log_entry["timestamp"])
+
+    @staticmethod
+    def update_session_state(student_id, problem_id, primary_skill, was_correct, timestamp):
+        """
+        Push one decision into the student's session_state rings atomically.
+
+        A single pipeline update prepends to the fixed-length rings and
+        recomputes momentum server-side with the same weighting as
+        KFFSequencer.calculate_momentum, so concurrent decisions never lose
+        an entry or leave momentum stale.
+
+        When the update creates the document, a student with earlier
+        sequence_logs gets rings rebuilt from them (see seed_session_state).
+        """
+        db = Database.get_db()
+        entry = {"problem_id": problem_id, "primary_skill": primary_skill, "correct": was_correct}
+
+        recent = {"$slice": [
+            {"$concatArrays": [[{"$literal": entry}], {"$ifNull": ["$recent", []]}]},
+            SESSION_RECENT_SIZE
+        ]}
+        failed = {"$ifNull": ["$failed", []]}
+        if was_correct is False:
+            failed = {"$slice": [
+                {"$concatArrays": [[{"$literal": entry}], failed]},
+                SESSION_FAILED_SIZE
+            ]}
+
+        result = db.session_state.update_one(
+            {"_id": student_id},
+            [
+                {"$set": {"recent": recent, "failed": failed, "updated_at": timestamp}},
+                {"$set": {"momentum": SequenceLogModel.momentum_expression("$recent")}}
+            ],
+            upsert=True
+        )
+        if result.upserted_id is not None:
+            SequenceLogModel.seed_session_state(student_id, timestamp)
+
+    @staticmethod
+    def session_rings(student_id):
+        """
+        Build the session_state rings from a student's sequence_logs.
+
+        Returns:
+            tuple: (recent, failed) ring entries, newest first
+        """
+        db = Database.get_db()
+
+        def ring(query, size):
+            logs = db.sequence_logs.find(query).sort("timestamp", -1).limit(size)
+            return [
+                {
+                    "problem_id": log.get("next_problem_id"),
+                    "primary_skill": SequenceLogModel._primary_skill(log),
+                    "correct": log.get("was_correct", False)
+                }
+                for log in logs
+            ]
+
+        return (
+            ring({"student_id": student_id}, SESSION_RECENT_SIZE),
+            ring({"student_id": student_id, "was_correct": False}, SESSION_FAILED_SIZE)
+        )
+
+    @staticmethod
+    def seed_session_state(student_id, timestamp):
+        """
+        Rebuild a just-created session_state document from the student's logs.
+
+        Students with sequence_logs from before session_state existed would
+        otherwise start from empty rings and lose their momentum and recent
+        failures. The logs already include the decision that created the
+        document. Nothing is written if another decision has been pushed
+        since (updated_at no longer matches).
+        """
+        recent, failed = SequenceLogModel.session_rings(student_id)
+        if len(recent) <= 1:
+            return  # No earlier logs: the created document is already complete
+
+        Database.get_db().session_state.update_one(
+            {"_id": student_id, "updated_at": timestamp},
+            [
+                {"$set": {"recent": {"$literal": recent}, "failed": {"$literal": failed}}},
+                {"$set": {"momentum": SequenceLogModel.momentum_expression("$recent")}}
+            ]
+        )
+
+    @staticmethod
+    def momentum_expression(recent_field):
+        """
+        Mongo expression for KFFSequencer.calculate_momentum over a newest-first ring.
+
+        Oldest entry gets weight 1, each newer one MOMENTUM_DECAY times the
+        previous; the weighted sum is divided by the ring size and clamped.
+        """
+        weighted = {"$reduce": {
+            "input": {"$reverseArray": recent_field},
+            "initialValue": {"sum": 0.0, "weight": 1.0},
+            "in": {
+                "sum": {"$add": ["$$value.sum", {"$multiply": [
+                    "$$value.weight", {"$cond": ["$$this.correct", 1.0, -1.0]}
+                ]}]},
+                "weight": {"$multiply": ["$$value.weight", MOMENTUM_DECAY]}
+            }
+        }}
+        size = {"$size": recent_field}
+        return {"$cond": [
+            {"$eq": [size, 0]},
+            0.0,
+            {"$max": [-1.0, {"$min": [1.0, {"$divide": [
+                {"$let": {"vars": {"weighted": weighted}, "in": "$$weighted.sum"}}, size
+            ]}]}]}
+        ]}
+
+    @staticmethod
+    def get_session_state(student_id):
+        """
+        Read the sequencer inputs from the student's session_state document.
+
+        Falls back to get_sequencing_context (sequence_logs) for students whose
+        state has not been built yet; see utils/rebuild_session_state.py.
+
+        Returns:
+            dict: {current_problem_id, recent_results, recent_skills, failed_skills,
+                   momentum}
+                  (momentum is None when derived from logs)
+        """
+        db = Database.get_db()
+        state = db.session_state.find_one({"_id": student_id})
+
+        if state is None:
+            context = SequenceLogModel.get_sequencing_context(student_id)
+            context["momentum"] = None
+            return context
+
+        recent = state.get("recent", [])
+        return {
+            "current_problem_id": recent[0].get("problem_id") if recent else None,
+            "recent_results": [{"correct": item.get("correct", False)} for item in recent],
+            "recent_skills": [item["primary_skill"] for item in recent[:2]
+                              if item.get("primary_skill") is not None],
+            "failed_skills": [item["primary_skill"] for item in state.get("failed", [])
+                              if item.get("primary_skill") is not None],
+            "momentum": state.get("momentum")
+        }
+
+    @staticmethod
+    def _primary_skill(log):
+        """Primary skill of a log's next problem; older logs fall back to the catalog."""
+        if "next_primary_skill" in log:
+            return log["next_primary_skill"]
+        entry = ProblemCatalog.get_entry(log.get("next_problem_id"))
+        return entry.get("primary_skill") if entry else None
+
+    @staticmethod
+    def get_sequencing_context(student_id, results_limit=5, skills_limit=2, failed_limit=10):
+        """
+        Everything KFFSequencer needs from the logs, from one query.
+
+        Reads the last SEQUENCING_WINDOW logs once and derives the same values
+        as get_recent_results, get_recent_skills and get_recently_failed_skills.
+        Only when the window is full and holds fewer than failed_limit failures
+        are older failures fetched with a second query.
+
+        Returns:
+            dict: {current_problem_id, recent_results, recent_skills, failed_skills}
+        """
+        db = Database.get_db()
+        window = max(SEQUENCING_WINDOW, results_limit, skills_limit)
+        logs = list(db.sequence_logs.find({"student_id": student_id})
+                    .sort("timestamp", -1)
+                    .limit(window))
+
+        failed_logs = [log for log in logs if log.get("was_correct") is False][:failed_limit]
+        if len(logs) == window and len(failed_logs) < failed_limit:
+            failed_logs += list(db.sequence_logs.find({
+                "student_id": student_id,
+                "was_correct": False,
+                "timestamp": {"$lt": logs[-1]["timestamp"]}
+            }).sort("timestamp", -1).limit(failed_limit - len(failed_logs)))
+
+        def skills_of(rows):
+            skills = (SequenceLogModel._primary_skill(log) for log in rows)
+            return [skill for skill in skills if skill is not None]
+
+        return {
+            "current_problem_id": logs[0].get("next_problem_id") if logs else None,
+            "recent_results": [{"correct": log.get("was_correct", False)} for log in logs[:results_limit]],
+            "recent_skills": skills_of(logs[:skills_limit]),
+            "failed_skills": skills_of(failed_logs)
+        }
+
     @staticmethod
     def get_recently_failed_skills(student_id, limit=10):
         db = Database.get_db()
@@ -29,9 +237,9 @@ class SequenceLogModel:
                     .limit(limit))
         failed_skills = []
         for log in logs:
-            prob = db.problems.find_one({"_id": log.get("next_problem_id")})
-            if prob and 'primary_skill' in prob:
-                failed_skills.append(prob['primary_skill'])
+            skill = SequenceLogModel._primary_skill(log)
+            if skill is not None:
+                failed_skills.append(skill)
         return failed_skills
 
     @staticmethod
@@ -50,7 +258,7 @@ class SequenceLogModel:
                     .limit(limit))
         recent_skills = []
         for log in logs:
-            prob = db.problems.find_one({"_id": log.get("next_problem_id")})
-            if prob and 'primary_skill' in prob:
-                recent_skills.append(prob['primary_skill'])
-        return recent_skills
\ No newline at end of file
+            skill = SequenceLogModel._primary_skill(log)
+            if skill is not None:
+                recent_skills.append(skill)
+        return recent_skills
@@ -1,11 +1,31 @@
 """Student model for database operations."""
+import time
 from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from config import Config
 from db import Database
+from models.bkt_model import BKTModel
+from utils.lru_cache import LRUCache
 from utils.skill_loader import SkillLoader
 
+# MongoDB duplicate key error code
+DUPLICATE_KEY_ERROR = 11000
+
 class StudentModel:
     """Handles student data operations."""
     
+    # student_id -> {'version', 'skills': {skill_id: (mastery, last_updated)},
+    #                'validated_at'}
+    _cache = LRUCache(Config.MASTERY_CACHE_SIZE)
+    _cache_stats = {
+        'revalidations': 0,
+        'invalidations': 0,
+        'write_throughs': 0,
+        'served_age_total': 0.0,
+        'served_age_max': 0.0
+    }
+    
     @staticmethod
     def create_student(student_id):
         """
@@ -27,7 +47,8 @@ class StudentModel:
         
         student_doc = {
             'student_id': student_id,
-            'created_at': datetime.utcnow()
+            'created_at': datetime.utcnow(),
+            'state_version': 0
         }
         db.students.insert_one(student_doc)
         
@@ -43,9 +64,90 @@ class StudentModel:
             for skill in skills
         ]
         db.student_skills.insert_many(skill_docs)
+        StudentModel.invalidate_cache(student_id)
         
         return student_doc
     
+    @staticmethod
+    def create_students(student_ids, chunk_size=1000):
+        """
+        Create many students and initialize their skills in bulk.
+        
+        Uses unordered insert_many calls and relies on the unique
+        student_id index to detect students that already exist, so each
+        chunk costs two round trips regardless of its size.
+        
+        Args:
+            student_ids: Iterable of unique student identifiers
+            chunk_size: Number of students per bulk insert
+            
+        Returns:
+            dict: student_id -> "created" | "existing", in input order
+        """
+        db = Database.get_db()
+        skills = SkillLoader.load_skills()
+        statuses = {}
+        
+        ordered_ids = list(dict.fromkeys(student_ids))
+        for start in range(0, len(ordered_ids), chunk_size):
+            chunk = ordered_ids[start:start + chunk_size]
+            now = datetime.utcnow()
+            student_docs = [
+                {'student_id': student_id, 'created_at': now, 'state_version': 0}
+                for student_id in chunk
+            ]
+            
+            existing = StudentModel._insert_ignoring_duplicates(db.students, student_docs)
+            created = [sid for index, sid in enumerate(chunk) if index not in existing]
+            
+            skill_docs = [
+                {
+                    'student_id': student_id,
+                    'skill_id': skill['id'],
+                    'mastery': 0.2,
+                    'last_updated': now,
+                    'attempt_count': 0
+                }
+                for student_id in created
+                for skill in skills
+            ]
+            StudentModel._insert_ignoring_duplicates(db.student_skills, skill_docs)
+            
+            for index, student_id in enumerate(chunk):
+                statuses[student_id] = 'existing' if index in existing else 'created'
+                if index not in existing:
+                    StudentModel.invalidate_cache(student_id)
+        
+        return statuses
+    
+    @staticmethod
+    def _insert_ignoring_duplicates(collection, docs):
+        """
+        Insert documents unordered, tolerating duplicate key errors.
+        
+        Args:
+            collection: Target collection
+            docs: Documents to insert
+            
+        Returns:
+            set: Indexes into docs that were rejected as duplicates
+            
+        Raises:
+            BulkWriteError: If any write failed for another reason
+        """
+        if not docs:
+            return set()
+        
+        try:
+            collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            if any(err['code'] != DUPLICATE_KEY_ERROR for err in errors):
+                raise
+            return {err['index'] for err in errors}
+        
+        return set()
+    
     @staticmethod
     def get_student(student_id):
         """
@@ -65,20 +167,32 @@ class StudentModel:
         """
         Get all skills for a student.
         
+        Masteries are effective values with time-based forgetting applied
+        from each skill's last_updated (see BKTModel.apply_forgetting).
+        Served from the in-process mastery cache when the entry is within
+        MASTERY_CACHE_TTL or its state_version still matches the student
+        document; otherwise reloaded from student_skills.
+        
         Args:
             student_id: Student identifier
             
         Returns:
-            dict: Mapping of skill_id to mastery value
+            dict: Mapping of skill_id to effective mastery value
         """
-        db = Database.get_db()
-        skills = db.student_skills.find({'student_id': student_id})
-        return {skill['skill_id']: skill['mastery'] for skill in skills}
+        stored = StudentModel._get_cached_skills(student_id)
+        if stored is None:
+            stored = StudentModel._load_stored_skills(student_id)
+        
+        return StudentModel._effective_masteries(stored)
     
     @staticmethod
     def get_weakest_skills(student_id, limit=3):
         """
-        Get weakest skills for a student.
+        Get weakest skills for a student by effective mastery.
+        
+        On a cache miss the ranking is done on the server: the
+        (student_id, skill_id) index selects the student's skills and an
+        aggregation stage derives the decayed mastery to sort on.
         
         Args:
             student_id: Student identifier
@@ -87,12 +201,239 @@ class StudentModel:
         Returns:
             list: List of dicts with skill_id and mastery
         """
+        stored = StudentModel._get_cached_skills(student_id)
+        if stored is not None:
+            masteries = StudentModel._effective_masteries(stored)
+            ranked = sorted(masteries.items(), key=lambda item: item[1])[:limit]
+            return [
+                {'skill_id': skill_id, 'mastery': mastery}
+                for skill_id, mastery in ranked
+            ]
+        
         db = Database.get_db()
-        skills = db.student_skills.find(
-            {'student_id': student_id}
-        ).sort('mastery', 1).limit(limit)
+        effective = BKTModel.forgetting_expression(
+            datetime.utcnow(), SkillLoader.get_skill_ids()
+        )
+        skills = db.student_skills.aggregate([
+            {'$match': {'student_id': student_id}},
+            {'$project': {'_id': 0, 'skill_id': 1, 'mastery': effective}},
+            {'$sort': {'mastery': 1}},
+            {'$limit': limit}
+        ])
         
         return [
             {'skill_id': skill['skill_id'], 'mastery': skill['mastery']}
             for skill in skills
         ]
+    
+    @staticmethod
+    def iter_students_skills(student_ids):
+        """
+        Stream effective masteries for many students from one query.
+        
+        Issues a single $in query whose projection is covered by the
+        (student_id, skill_id, mastery, last_updated) index and groups
+        the index-ordered rows per student, so only one student's skills
+        are held in memory at a time.
+        
+        Args:
+            student_ids: List of student identifiers
+            
+        Yields:
+            tuple: (student_id, {skill_id: effective mastery})
+        """
+        db = Database.get_db()
+        cursor = db.student_skills.find(
+            {'student_id': {'$in': list(student_ids)}},
+            {'_id': 0, 'student_id': 1, 'skill_id': 1, 'mastery': 1, 'last_updated': 1}
+        ).sort([('student_id', 1), ('skill_id', 1)])
+        
+        current_id = None
+        stored = {}
+        for row in cursor:
+            if row['student_id'] != current_id:
+                if stored:
+                    yield current_id, StudentModel._effective_masteries(stored)
+                current_id = row['student_id']
+                stored = {}
+            stored[row['skill_id']] = (row['mastery'], row.get('last_updated'))
+        
+        if stored:
+            yield current_id, StudentModel._effective_masteries(stored)
+    
+    @staticmethod
+    def get_state_version(student_id):
+        """
+        Get the mastery state version counter of a student.
+        
+        Args:
+            student_id: Student identifier
+            
+        Returns:
+            int: Current version, or None if the student does not exist
+        """
+        db = Database.get_db()
+        student = db.students.find_one(
+            {'student_id': student_id},
+            {'_id': 0, 'state_version': 1}
+        )
+        if student is None:
+            return None
+        return student.get('state_version', 0)
+    
+    @staticmethod
+    def apply_mastery_update(student_id, updated_masteries, timestamp):
+        """
+        Bump the state version after a mastery write and update the cache.
+        
+        Must be called after the student_skills writes have completed. The
+        cached vector is patched in place only when no other writer bumped
+        the version in between; otherwise the entry is dropped.
+        
+        Args:
+            student_id: Student identifier
+            updated_masteries: Dict of skill_id -> new stored mastery
+            timestamp: last_updated written with the new masteries
+            
+        Returns:
+            int: New state version
+        """
+        db = Database.get_db()
+        student = db.students.find_one_and_update(
+            {'student_id': student_id},
+            {'$inc': {'state_version': 1}},
+            projection={'_id': 0, 'state_version': 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if student is None:
+            StudentModel.invalidate_cache(student_id)
+            return None
+        
+        version = student['state_version']
+        cache = StudentModel._cache
+        with cache.lock:
+            entry = cache.pop(student_id)
+            if entry is not None and entry['version'] == version - 1:
+                entry['skills'].update({
+                    skill_id: (mastery, timestamp)
+                    for skill_id, mastery in updated_masteries.items()
+                })
+                entry['version'] = version
+                entry['validated_at'] = time.monotonic()
+                cache.put(student_id, entry)
+                StudentModel._cache_stats['write_throughs'] += 1
+            elif entry is not None:
+                StudentModel._cache_stats['invalidations'] += 1
+        
+        return version
+    
+    @staticmethod
+    def invalidate_cache(student_id):
+        """Drop a student's cached mastery vector."""
+        StudentModel._cache.pop(student_id)
+    
+    @staticmethod
+    def get_cache_stats():
+        """
+        Get mastery cache metrics.
+        
+        Returns:
+            dict: LRU counters plus revalidations, invalidations,
+                  write_throughs and staleness of served entries in seconds
+        """
+        stats = StudentModel._cache.stats()
+        extra = dict(StudentModel._cache_stats)
+        hits = stats['hits']
+        stats.update({
+            'revalidations': extra['revalidations'],
+            'invalidations': extra['invalidations'],
+            'write_throughs': extra['write_throughs'],
+            'staleness_avg_seconds': extra['served_age_total'] / hits if hits else 0.0,
+            'staleness_max_seconds': extra['served_age_max'],
+            'ttl_seconds': Config.MASTERY_CACHE_TTL
+        })
+        return stats
+    
+    @staticmethod
+    def _load_stored_skills(student_id):
+        """
+        Load stored masteries from the database and cache them.
+        
+        Args:
+            student_id: Student identifier
+            
+        Returns:
+            dict: skill_id -> (stored mastery, last_updated)
+        """
+        db = Database.get_db()
+        # Read the version before the skills so a concurrent write can only
+        # make the cached vector newer than its version, never older.
+        version = StudentModel.get_state_version(student_id)
+        skills = db.student_skills.find(
+            {'student_id': student_id},
+            {'_id': 0, 'skill_id': 1, 'mastery': 1, 'last_updated': 1}
+        )
+        stored = {
+            skill['skill_id']: (skill['mastery'], skill.get('last_updated'))
+            for skill in skills
+        }
+        
+        if stored and version is not None:
+            StudentModel._cache.put(student_id, {
+                'version': version,
+                'skills': dict(stored),
+                'validated_at': time.monotonic()
+            })
+        
+        return stored
+    
+    @staticmethod
+    def _effective_masteries(stored):
+        """Apply forgetting to stored (mastery, last_updated) pairs."""
+        now = datetime.utcnow()
+        return {
+            skill_id: BKTModel.apply_forgetting(mastery, last_updated, skill_id, now)
+            for skill_id, (mastery, last_updated) in stored.items()
+        }
+    
+    @staticmethod
+    def _get_cached_skills(student_id):
+        """
+        Look up a fresh cached mastery vector.
+        
+        Entries older than MASTERY_CACHE_TTL are revalidated against the
+        student's state_version, which every mastery write increments, so
+        writes from other processes invalidate this process's entry.
+        
+        Args:
+            student_id: Student identifier
+            
+        Returns:
+            dict: Copy of skill_id -> (mastery, last_updated), or None on a miss
+        """
+        cache = StudentModel._cache
+        stats = StudentModel._cache_stats
+        # Counted once the entry is known to be fresh
+        entry = cache.get(student_id, count=False)
+        if entry is None:
+            cache.record(hit=False)
+            return None
+        
+        age = time.monotonic() - entry['validated_at']
+        if age > Config.MASTERY_CACHE_TTL:
+            version = StudentModel.get_state_version(student_id)
+            with cache.lock:
+                if version != entry['version']:
+                    cache.pop(student_id)
+                    stats['invalidations'] += 1
+                    cache.record(hit=False)
+                    return None
+                entry['validated_at'] = time.monotonic()
+                stats['revalidations'] += 1
+            age = 0.0
+        
+        with cache.lock:
+            cache.record(hit=True)
+            stats['served_age_total'] += age
+            stats['served_age_max'] = max(stats['served_age_max'], age)
+            return dict(entry['skills'])
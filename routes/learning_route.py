@@ -2,22 +2,143 @@
 Learning Route - Concurrency-safe asynchronous event ingestion.
 
 POST /learn - Idempotent event ingestion with submission_id
+POST /learn/batch - Idempotent batched ingestion (JSON array or NDJSON)
 GET /state/<student_id> - Returns computed learner state
 GET /event/<event_id> - Returns event completion status
+GET /event/<event_id>/wait - Long-polls until the event completes
 """
 
 from flask import Blueprint, request, jsonify
 from datetime import datetime
+from config import Config
 from db import Database
-from pymongo.errors import DuplicateKeyError
+from services.notification_hub import NotificationHub
+from utils.ndjson import read_request_items
+from utils.sharding import student_shard
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+# MongoDB duplicate key error code
+DUPLICATE_KEY_ERROR = 11000
 
 learning_bp = Blueprint('learning', __name__)
 
+def _validate_event(data):
+    """
+    Validate a learning event payload.
+    
+    Args:
+        data: Decoded event JSON
+        
+    Returns:
+        str: Error message, or None if the event is valid
+    """
+    if not data or not isinstance(data, dict):
+        return 'Request body is required'
+    
+    # Validate submission_id (required for idempotency)
+    if 'submission_id' not in data:
+        return 'submission_id is required'
+    
+    if not isinstance(data['submission_id'], str) or not data['submission_id']:
+        return 'submission_id must be a non-empty string'
+    
+    # Validate required fields
+    required_fields = ['student_id', 'problem_id', 'result', 'diagnosis']
+    missing = [f for f in required_fields if f not in data]
+    if missing:
+        return f'Missing required fields: {missing}'
+    
+    # Validate result structure
+    result = data['result']
+    if not isinstance(result, dict):
+        return 'result must be an object'
+    result_fields = ['correct', 'attempts', 'solve_time']
+    missing_result = [f for f in result_fields if f not in result]
+    if missing_result:
+        return f'Missing result fields: {missing_result}'
+    
+    # Validate diagnosis structure
+    diagnosis = data['diagnosis']
+    if not isinstance(diagnosis, dict) or 'skills' not in diagnosis:
+        return 'Missing diagnosis.skills'
+    
+    if not isinstance(diagnosis['skills'], list) or not diagnosis['skills']:
+        return 'diagnosis.skills must be a non-empty list'
+    
+    # Validate data types
+    if not isinstance(result['correct'], bool):
+        return 'result.correct must be boolean'
+    
+    if not isinstance(result['attempts'], int) or result['attempts'] < 1:
+        return 'result.attempts must be positive integer'
+    
+    if not isinstance(result['solve_time'], (int, float)) or result['solve_time'] < 0:
+        return 'result.solve_time must be non-negative number'
+    
+    return None
+
+
+def _build_event_doc(data, timestamp):
+    """
+    Build the learning_events document for a validated payload.
+    
+    Args:
+        data: Validated event JSON
+        timestamp: Ingestion time
+        
+    Returns:
+        dict: Event document
+    """
+    return {
+        'submission_id': data['submission_id'],
+        'student_id': data['student_id'],
+        'student_shard': student_shard(data['student_id']),
+        'problem_id': data['problem_id'],
+        'timestamp': timestamp,
+        'result': data['result'],
+        'diagnosis': data['diagnosis'],
+        'processing': {
+            'bkt': False,
+            'learner_state': False
+        },
+        'completed': False
+    }
+
+
+def _dead_letter_response(event_id, event):
+    """
+    Response body for a dead-lettered event.
+    
+    Args:
+        event_id: Event id as a string
+        event: Tombstone in learning_events, or the learning_events_dead copy
+            of an event dead-lettered before tombstones were kept
+        
+    Returns:
+        dict: {event_id, completed, dead_lettered, error, student_id}
+    """
+    return {
+        'event_id': event_id,
+        'completed': False,
+        'dead_lettered': True,
+        'error': event.get('processing', {}).get('last_error'),
+        'student_id': event['student_id']
+    }
+
+
+def _is_dead(event):
+    """Check whether a learning_events document is a dead-letter tombstone."""
+    return event.get('processing', {}).get('bkt') == 'dead'
+
+
 @learning_bp.route('/learn', methods=['POST'])
 def ingest_learning_event():
     """
     Ingest a learning event with idempotency protection.
     
+    The event is inserted directly; the unique submission_id index
+    detects duplicates, so new events cost a single round trip.
+    
     Request JSON:
         {
             "submission_id": "unique_submission_id",  # REQUIRED for idempotency
@@ -41,73 +162,13 @@ def ingest_learning_event():
     """
     try:
         data = request.get_json()
-        if not data:
-            return jsonify({'error': 'Request body is required'}), 400
-        
-        # Validate submission_id (required for idempotency)
-        if 'submission_id' not in data:
-            return jsonify({'error': 'submission_id is required'}), 400
-        
-        if not isinstance(data['submission_id'], str) or not data['submission_id']:
-            return jsonify({'error': 'submission_id must be a non-empty string'}), 400
-        
-        # Validate required fields
-        required_fields = ['student_id', 'problem_id', 'result', 'diagnosis']
-        missing = [f for f in required_fields if f not in data]
-        if missing:
-            return jsonify({'error': f'Missing required fields: {missing}'}), 400
-        
-        # Validate result structure
-        result = data['result']
-        result_fields = ['correct', 'attempts', 'solve_time']
-        missing_result = [f for f in result_fields if f not in result]
-        if missing_result:
-            return jsonify({'error': f'Missing result fields: {missing_result}'}), 400
-        
-        # Validate diagnosis structure
-        diagnosis = data['diagnosis']
-        if 'skills' not in diagnosis:
-            return jsonify({'error': 'Missing diagnosis.skills'}), 400
-        
-        if not isinstance(diagnosis['skills'], list) or not diagnosis['skills']:
-            return jsonify({'error': 'diagnosis.skills must be a non-empty list'}), 400
-        
-        # Validate data types
-        if not isinstance(result['correct'], bool):
-            return jsonify({'error': 'result.correct must be boolean'}), 400
         
-        if not isinstance(result['attempts'], int) or result['attempts'] < 1:
-            return jsonify({'error': 'result.attempts must be positive integer'}), 400
-        
-        if not isinstance(result['solve_time'], (int, float)) or result['solve_time'] < 0:
-            return jsonify({'error': 'result.solve_time must be non-negative number'}), 400
+        error = _validate_event(data)
+        if error:
+            return jsonify({'error': error}), 400
         
         db = Database.get_db()
-        
-        # Check if submission_id already exists (idempotency)
-        existing_event = db.learning_events.find_one({'submission_id': data['submission_id']})
-        
-        if existing_event:
-            # Return existing event_id (idempotent)
-            return jsonify({
-                'status': 'accepted',
-                'event_id': str(existing_event['_id'])
-            }), 200
-        
-        # Store new event
-        event_doc = {
-            'submission_id': data['submission_id'],
-            'student_id': data['student_id'],
-            'problem_id': data['problem_id'],
-            'timestamp': datetime.utcnow(),
-            'result': result,
-            'diagnosis': diagnosis,
-            'processing': {
-                'bkt': False,
-                'learner_state': False
-            },
-            'completed': False
-        }
+        event_doc = _build_event_doc(data, datetime.utcnow())
         
         try:
             insert_result = db.learning_events.insert_one(event_doc)
@@ -118,8 +179,10 @@ def ingest_learning_event():
             }), 202
             
         except DuplicateKeyError:
-            # Race condition: another request inserted same submission_id
-            existing_event = db.learning_events.find_one({'submission_id': data['submission_id']})
+            # submission_id already ingested: return existing event_id (idempotent)
+            existing_event = db.learning_events.find_one(
+                {'submission_id': data['submission_id']}, {'_id': 1}
+            )
             return jsonify({
                 'status': 'accepted',
                 'event_id': str(existing_event['_id'])
@@ -129,12 +192,108 @@ def ingest_learning_event():
         return jsonify({'error': f'Internal error: {str(e)}'}), 500
 
 
+@learning_bp.route('/learn/batch', methods=['POST'])
+def ingest_learning_events_batch():
+    """
+    Ingest many learning events with one unordered insert.
+    
+    Accepts a JSON array of events, {"events": [...]}, or an NDJSON
+    stream (Content-Type: application/x-ndjson) with one event per line.
+    Each event is validated like POST /learn. Duplicates are detected by
+    the unique submission_id index and resolved with one lookup.
+    
+    Response JSON:
+        {
+            "results": [
+                {"index": 0, "status": "accepted", "event_id": "..."},
+                {"index": 1, "status": "duplicate", "event_id": "..."},
+                {"index": 2, "status": "invalid", "error": "..."}
+            ],
+            "accepted": 1, "duplicate": 1, "invalid": 1
+        }
+    
+    Status Codes:
+        200 - Processed (check per-event status)
+        400 - Malformed body or too many events
+        500 - Internal error
+    """
+    try:
+        from bson import ObjectId
+        
+        try:
+            items = read_request_items(request, 'events', Config.BULK_MAX_ITEMS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        results = [None] * len(items)
+        docs = []
+        doc_indexes = []
+        timestamp = datetime.utcnow()
+        
+        for index, data in enumerate(items):
+            error = _validate_event(data)
+            if error:
+                results[index] = {'index': index, 'status': 'invalid', 'error': error}
+            else:
+                doc = _build_event_doc(data, timestamp)
+                # Events share the timestamp; ascending _ids keep request order
+                # for the worker's (timestamp, _id) claim order
+                doc['_id'] = ObjectId()
+                docs.append(doc)
+                doc_indexes.append(index)
+        
+        duplicates = set()
+        if docs:
+            db = Database.get_db()
+            try:
+                db.learning_events.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                errors = e.details.get('writeErrors', [])
+                if any(error['code'] != DUPLICATE_KEY_ERROR for error in errors):
+                    raise
+                duplicates = {error['index'] for error in errors}
+            
+            existing = {}
+            if duplicates:
+                existing = {
+                    event['submission_id']: event['_id']
+                    for event in db.learning_events.find(
+                        {'submission_id': {'$in': [docs[i]['submission_id'] for i in duplicates]}},
+                        {'submission_id': 1}
+                    )
+                }
+            
+            for position, (index, doc) in enumerate(zip(doc_indexes, docs)):
+                if position in duplicates:
+                    results[index] = {
+                        'index': index,
+                        'status': 'duplicate',
+                        'event_id': str(existing[doc['submission_id']])
+                    }
+                else:
+                    results[index] = {
+                        'index': index,
+                        'status': 'accepted',
+                        'event_id': str(doc['_id'])
+                    }
+        
+        counts = {'accepted': 0, 'duplicate': 0, 'invalid': 0}
+        for result in results:
+            counts[result['status']] += 1
+        
+        return jsonify({'results': results, **counts}), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal error: {str(e)}'}), 500
+
+
 @learning_bp.route('/event/<event_id>', methods=['GET'])
 def get_event_status(event_id):
     """
     Get event completion status.
     
     Frontend polls this to check if event processing is complete.
+    Prefer GET /event/<event_id>/wait, which blocks until completion.
     
     Response JSON:
         {
@@ -143,6 +302,9 @@ def get_event_status(event_id):
             "student_id": "s1"
         }
     
+    Dead-lettered events additionally carry "dead_lettered": true and
+    the last processing error.
+    
     Status Codes:
         200 - Success
         404 - Event not found
@@ -162,8 +324,15 @@ def get_event_status(event_id):
         event = db.learning_events.find_one({'_id': obj_id})
         
         if not event:
+            # Dead-lettered before tombstones were kept in learning_events
+            dead_event = db.learning_events_dead.find_one({'_id': obj_id})
+            if dead_event:
+                return jsonify(_dead_letter_response(event_id, dead_event)), 200
             return jsonify({'error': f'Event {event_id} not found'}), 404
         
+        if _is_dead(event):
+            return jsonify(_dead_letter_response(event_id, event)), 200
+        
         return jsonify({
             'event_id': event_id,
             'completed': event.get('completed', False),
@@ -174,6 +343,93 @@ def get_event_status(event_id):
         return jsonify({'error': f'Internal error: {str(e)}'}), 500
 
 
+@learning_bp.route('/event/<event_id>/wait', methods=['GET'])
+def wait_for_event(event_id):
+    """
+    Long-poll until an event completes or the timeout elapses.
+    
+    The request registers with the in-process notification hub before
+    reading the event, so it is woken as soon as the worker marks the
+    event complete and costs at most two reads of learning_events.
+    
+    Query Parameters:
+        timeout: Seconds to wait (default and maximum EVENT_WAIT_MAX_TIMEOUT)
+    
+    Response JSON:
+        {
+            "event_id": "507f1f77bcf86cd799439011",
+            "completed": true,
+            "student_id": "s1",
+            "learner_state": {...}  # Only when completed
+        }
+    
+    Status Codes:
+        200 - Completed or timed out (check "completed")
+        400 - Invalid event_id or timeout
+        404 - Event not found
+        500 - Internal error
+    """
+    try:
+        from bson import ObjectId
+        
+        try:
+            obj_id = ObjectId(event_id)
+        except:
+            return jsonify({'error': 'Invalid event_id format'}), 400
+        
+        try:
+            timeout = float(request.args.get('timeout', Config.EVENT_WAIT_MAX_TIMEOUT))
+        except ValueError:
+            return jsonify({'error': 'timeout must be a number of seconds'}), 400
+        timeout = min(max(timeout, 0.0), Config.EVENT_WAIT_MAX_TIMEOUT)
+        
+        db = Database.get_db()
+        projection = {
+            'student_id': 1, 'completed': 1,
+            'processing.bkt': 1, 'processing.last_error': 1
+        }
+        
+        waiter = NotificationHub.register_event(event_id)
+        try:
+            event = db.learning_events.find_one({'_id': obj_id}, projection)
+            
+            if not event:
+                dead_event = db.learning_events_dead.find_one({'_id': obj_id})
+                if dead_event:
+                    return jsonify(_dead_letter_response(event_id, dead_event)), 200
+                return jsonify({'error': f'Event {event_id} not found'}), 404
+            
+            if not event.get('completed', False) and not _is_dead(event):
+                # Re-read even on timeout: a completion may have been missed
+                waiter.wait(timeout)
+                event = db.learning_events.find_one({'_id': obj_id}, projection) or event
+        finally:
+            NotificationHub.unregister_event(event_id, waiter)
+        
+        if _is_dead(event):
+            return jsonify(_dead_letter_response(event_id, event)), 200
+        
+        response = {
+            'event_id': event_id,
+            'completed': event.get('completed', False),
+            'student_id': event['student_id']
+        }
+        
+        if response['completed']:
+            state = db.learner_state.find_one(
+                {'student_id': event['student_id']}, {'_id': 0}, sort=[('updated_at', -1)]
+            )
+            if state:
+                if 'updated_at' in state:
+                    state['updated_at'] = state['updated_at'].isoformat()
+                response['learner_state'] = state
+        
+        return jsonify(response), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal error: {str(e)}'}), 500
+
+
 @learning_bp.route('/state/<student_id>', methods=['GET'])
 def get_learner_state(student_id):
     """
@@ -195,9 +451,9 @@ def get_learner_state(student_id):
     try:
         db = Database.get_db()
         
+        # Newest first: legacy duplicates may remain until compact_learner_state runs
         state = db.learner_state.find_one(
-            {'student_id': student_id},
-            sort=[('updated_at', -1)]
+            {'student_id': student_id}, {'_id': 0}, sort=[('updated_at', -1)]
         )
         
         if not state:
@@ -206,8 +462,6 @@ def get_learner_state(student_id):
                         'Events may still be processing.'
             }), 404
         
-        state.pop('_id', None)
-        
         if 'updated_at' in state:
             state['updated_at'] = state['updated_at'].isoformat()
         
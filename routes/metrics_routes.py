@@ -0,0 +1,52 @@
+"""Diagnostics and metrics API routes."""
+from flask import Blueprint, jsonify
+from models.bkt_model import BKTModel
+from models.learning_event_model import LearningEventModel
+from models.student_model import StudentModel
+
+metrics_bp = Blueprint('metrics', __name__, url_prefix='/metrics')
+
+@metrics_bp.route('/error-weights', methods=['GET'])
+def get_error_weights():
+    """
+    Get the resolved error-type weight table.
+    
+    Lists which incoming error types fell through to the default
+    weight of 1.0, with how many times each was seen by this process.
+    
+    Returns:
+        JSON: {weights, resolved, unresolved}
+    """
+    try:
+        return jsonify(BKTModel.get_error_weight_diagnostics()), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal error: {str(e)}'}), 500
+
+@metrics_bp.route('/mastery-cache', methods=['GET'])
+def get_mastery_cache_metrics():
+    """
+    Get in-process learner mastery cache metrics.
+    
+    Returns:
+        JSON: Size, hit ratio, revalidations, invalidations and staleness
+    """
+    try:
+        return jsonify(StudentModel.get_cache_stats()), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal error: {str(e)}'}), 500
+
+@metrics_bp.route('/queue', methods=['GET'])
+def get_queue_metrics():
+    """
+    Get learning event queue metrics.
+    
+    Returns:
+        JSON: {queue_depth, backing_off, in_flight, expired_leases, dead_letter}
+    """
+    try:
+        return jsonify(LearningEventModel.get_queue_metrics()), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal error: {str(e)}'}), 500
@@ -0,0 +1,56 @@
+"""Problem API routes."""
+from flask import Blueprint, request, jsonify
+from config import Config
+from models.problem_model import ProblemModel
+from models.problem_similarity import ProblemSimilarity
+
+problem_bp = Blueprint('problems', __name__, url_prefix='/problems')
+
+@problem_bp.route('/<problem_id>/similar', methods=['GET'])
+def get_similar_problems(problem_id):
+    """
+    Get the problems most similar to a problem.
+    
+    Served from the precomputed TF-IDF neighbour table built at seed
+    time; nothing is computed per request.
+    
+    Query Parameters:
+        k: Number of problems (default min(5, SIMILAR_PROBLEMS_K),
+           max SIMILAR_PROBLEMS_K)
+    
+    Returns:
+        JSON: {
+            "problem_id",
+            "similar": [{"problem_id", "title", "difficulty", "primary_skill",
+                         "skills", "similarity"}]
+        }
+    """
+    try:
+        try:
+            k = int(request.args.get('k', min(5, Config.SIMILAR_PROBLEMS_K)))
+        except ValueError:
+            return jsonify({'error': 'k must be an integer'}), 400
+        
+        if not 1 <= k <= Config.SIMILAR_PROBLEMS_K:
+            return jsonify({
+                'error': f'k must be between 1 and {Config.SIMILAR_PROBLEMS_K}'
+            }), 400
+        
+        if ProblemModel.get_catalog_view(problem_id) is None:
+            return jsonify({'error': f'Problem {problem_id} not found'}), 404
+        
+        similar = []
+        for neighbour_id, similarity in ProblemSimilarity.get_similar(problem_id, k):
+            neighbour = ProblemModel.get_catalog_view(neighbour_id)
+            if neighbour is None:
+                continue  # Deleted since the index was built
+            similar.append({
+                'problem_id': neighbour['_id'],
+                **{key: value for key, value in neighbour.items() if key != '_id'},
+                'similarity': similarity
+            })
+        
+        return jsonify({'problem_id': str(problem_id), 'similar': similar}), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal error: {str(e)}'}), 500
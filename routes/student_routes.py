@@ -1,7 +1,22 @@
 """Student API routes."""
-from flask import Blueprint, request, jsonify
+import json
+import queue
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from config import Config
+from db import Database
 from models.student_model import StudentModel
+from services.learning_service import LearningService
 from services.mastery_service import MasteryService
+from services.notification_hub import NotificationHub
+from services.recommendation_service import RecommendationService
+from services.kff_sequencer import KFFSequencer
+from models.sequence_log_model import SequenceLogModel
+from utils.ndjson import NDJSON_MIMETYPE, read_request_items, to_ndjson_line
+
+# Optional per-student fields for POST /students/state:batch
+BATCH_STATE_FIELDS = {'weak_skills', 'learning_state', 'average'}
+
+SSE_MIMETYPE = 'text/event-stream'
 
 student_bp = Blueprint('students', __name__, url_prefix='/students')
 
@@ -43,6 +58,115 @@ def create_student():
     except Exception as e:
         return jsonify({'error': f'Internal error: {str(e)}'}), 500
 
+@student_bp.route('/bulk-create', methods=['POST'])
+def bulk_create_students():
+    """
+    Create many students at once for cohort onboarding.
+    
+    Accepts a JSON array of IDs, {"student_ids": [...]}, or an NDJSON
+    stream (Content-Type: application/x-ndjson) with one ID or
+    {"student_id": ...} object per line.
+    
+    Returns:
+        JSON: {
+            "results": [{"student_id", "status": "created" | "existing" | "invalid"}],
+            "created": int, "existing": int, "invalid": int
+        }
+    """
+    try:
+        try:
+            items = read_request_items(request, 'student_ids', Config.BULK_MAX_ITEMS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        student_ids = [
+            item.get('student_id') if isinstance(item, dict) else item
+            for item in items
+        ]
+        valid_ids = [sid for sid in student_ids if sid and isinstance(sid, str)]
+        
+        statuses = StudentModel.create_students(valid_ids)
+        
+        results = []
+        counts = {'created': 0, 'existing': 0, 'invalid': 0}
+        seen = set()
+        for student_id in student_ids:
+            if not isinstance(student_id, str) or student_id not in statuses:
+                status = 'invalid'
+            elif student_id in seen:
+                status = 'existing'
+            else:
+                status = statuses[student_id]
+                seen.add(student_id)
+            counts[status] += 1
+            results.append({'student_id': student_id, 'status': status})
+        
+        return jsonify({'results': results, **counts}), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal error: {str(e)}'}), 500
+
+@student_bp.route('/state:batch', methods=['POST'])
+def get_students_state_batch():
+    """
+    Get mastery state for many students in one request.
+    
+    Request JSON:
+        {
+            "student_ids": ["s1", "s2"],
+            "fields": ["weak_skills", "learning_state", "average"]  (optional)
+        }
+    
+    A bare JSON array or NDJSON stream of IDs is also accepted, with
+    fields passed as ?fields=weak_skills,average.
+    
+    Returns:
+        NDJSON stream, one line per student:
+            {"student_id": "s1", "mastery": {...}, ...optional fields}
+            {"student_id": "s9", "error": "not found"}
+    """
+    try:
+        try:
+            student_ids = read_request_items(request, 'student_ids', Config.BULK_MAX_ITEMS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if not all(isinstance(sid, str) and sid for sid in student_ids):
+            return jsonify({'error': 'student_ids must be non-empty strings'}), 400
+        
+        body = request.get_json(silent=True) if request.mimetype != NDJSON_MIMETYPE else None
+        fields = body.get('fields') if isinstance(body, dict) else None
+        if fields is None:
+            fields = [f for f in request.args.get('fields', '').split(',') if f]
+        
+        if not isinstance(fields, list):
+            return jsonify({'error': 'fields must be a list'}), 400
+        
+        unknown = set(fields) - BATCH_STATE_FIELDS
+        if unknown:
+            return jsonify({'error': f'Unknown fields: {sorted(unknown)}'}), 400
+        
+        requested = list(dict.fromkeys(student_ids))
+        
+        def generate():
+            found = set()
+            for student_id, masteries in StudentModel.iter_students_skills(requested):
+                found.add(student_id)
+                line = {'student_id': student_id, 'mastery': masteries}
+                if fields:
+                    summary = LearningService.summarize_masteries(masteries)
+                    line.update({field: summary[field] for field in fields})
+                yield to_ndjson_line(line)
+            
+            for student_id in requested:
+                if student_id not in found:
+                    yield to_ndjson_line({'student_id': student_id, 'error': 'not found'})
+        
+        return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal error: {str(e)}'}), 500
+
 @student_bp.route('/<student_id>/state', methods=['GET'])
 def get_student_state(student_id):
     """
@@ -52,13 +176,11 @@ def get_student_state(student_id):
         JSON: Dictionary mapping skill_id to mastery value
     """
     try:
-        student = StudentModel.get_student(student_id)
+        skills = StudentModel.get_student_skills(student_id)
         
-        if not student:
+        if not skills and not StudentModel.get_student(student_id):
             return jsonify({'error': f'Student {student_id} not found'}), 404
         
-        skills = StudentModel.get_student_skills(student_id)
-        
         return jsonify({
             'student_id': student_id,
             'mastery': skills
@@ -140,13 +262,11 @@ def get_weak_skills(student_id):
         JSON: List of weakest skills with mastery values
     """
     try:
-        student = StudentModel.get_student(student_id)
+        weak_skills = StudentModel.get_weakest_skills(student_id, limit=3)
         
-        if not student:
+        if not weak_skills and not StudentModel.get_student(student_id):
             return jsonify({'error': f'Student {student_id} not found'}), 404
         
-        weak_skills = StudentModel.get_weakest_skills(student_id, limit=3)
-        
         return jsonify({
             'student_id': student_id,
             'weak_skills': weak_skills
@@ -154,3 +274,165 @@ def get_weak_skills(student_id):
         
     except Exception as e:
         return jsonify({'error': f'Internal error: {str(e)}'}), 500
+
+@student_bp.route('/<student_id>/recommendations', methods=['GET'])
+def get_recommendations(student_id):
+    """
+    Get the k best next problems for a student, for frontend prefetching.
+    
+    Problems are ranked by KFFSequencer flow-divergence energy (lowest
+    first) from the student's current masteries and session state.
+    
+    Query Parameters:
+        k: Number of problems (default 5, max RECOMMENDATIONS_MAX_K)
+    
+    Returns:
+        JSON: {
+            "student_id", "flow_metrics",
+            "recommendations": [{"problem_id", "title", "difficulty",
+                                 "primary_skill", "skills", "energy"}]
+        }
+    """
+    try:
+        try:
+            k = int(request.args.get('k', 5))
+        except ValueError:
+            return jsonify({'error': 'k must be an integer'}), 400
+        
+        if not 1 <= k <= Config.RECOMMENDATIONS_MAX_K:
+            return jsonify({
+                'error': f'k must be between 1 and {Config.RECOMMENDATIONS_MAX_K}'
+            }), 400
+        
+        all_masteries = StudentModel.get_student_skills(student_id)
+        if not all_masteries and not StudentModel.get_student(student_id):
+            return jsonify({'error': f'Student {student_id} not found'}), 404
+        
+        summary = LearningService.summarize_masteries(all_masteries)
+        session = SequenceLogModel.get_session_state(student_id)
+        
+        recommendations, flow_metrics = KFFSequencer().get_recommendations(
+            student_id=student_id,
+            current_problem_id=session['current_problem_id'],
+            weak_skills=summary['weak_skills'],
+            bkt_mastery=summary['average'],
+            k=k
+        )
+        
+        return jsonify({
+            'student_id': student_id,
+            'flow_metrics': flow_metrics,
+            'recommendations': [
+                {
+                    'problem_id': item['problem']['_id'],
+                    **{key: value for key, value in item['problem'].items() if key != '_id'},
+                    'energy': item['energy']
+                }
+                for item in recommendations
+            ]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal error: {str(e)}'}), 500
+
+@student_bp.route('/<student_id>/next', methods=['GET'])
+def get_next_problem(student_id):
+    """
+    Get the student's next problem from the precomputed recommendation.
+    
+    The learning worker refreshes the recommendation after every mastery
+    change; a stale one (state or catalog version changed, or older than
+    RECOMMENDATION_TTL_SECONDS) is recomputed synchronously and stored.
+    
+    Returns:
+        JSON: {
+            "student_id", "next_problem": {"problem_id", "title", "difficulty",
+                                           "primary_skill", "skills", "energy"} or null,
+            "flow_metrics", "cached": bool, "computed_at"
+        }
+    """
+    try:
+        recommendation, cached = RecommendationService.get_next(student_id)
+        
+        if recommendation is None:
+            return jsonify({'error': f'Student {student_id} not found'}), 404
+        
+        best = recommendation['recommendations'][:1]
+        next_problem = None
+        if best:
+            problem = best[0]['problem']
+            next_problem = {
+                'problem_id': problem['_id'],
+                **{key: value for key, value in problem.items() if key != '_id'},
+                'energy': best[0]['energy']
+            }
+        
+        return jsonify({
+            'student_id': student_id,
+            'next_problem': next_problem,
+            'flow_metrics': recommendation['flow_metrics'],
+            'cached': cached,
+            'computed_at': recommendation['computed_at'].isoformat()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal error: {str(e)}'}), 500
+
+def _sse_message(event, data):
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@student_bp.route('/<student_id>/events', methods=['GET'])
+def stream_student_events(student_id):
+    """
+    Stream a student's event completions as Server-Sent Events.
+    
+    Pushed by the in-process notification hub as soon as the worker
+    finishes, replacing client polling of GET /event/<event_id>. The
+    current learner state is sent first; comment heartbeats are sent
+    every SSE_HEARTBEAT_SECONDS to keep proxies from closing the stream.
+    
+    SSE events:
+        event_completed: {"event_id": "..."}
+        learner_state: {"student_id", "weak_skills", "learning_state", "updated_at"}
+    
+    Returns:
+        text/event-stream response, or JSON 404 if the student is unknown
+    """
+    try:
+        if not StudentModel.get_student(student_id):
+            return jsonify({'error': f'Student {student_id} not found'}), 404
+        
+        # Subscribe before the initial read so no update is missed
+        subscription = NotificationHub.subscribe_student(student_id)
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal error: {str(e)}'}), 500
+    
+    def generate():
+        try:
+            state = Database.get_db().learner_state.find_one(
+                {'student_id': student_id}, {'_id': 0}, sort=[('updated_at', -1)]
+            )
+            if state:
+                yield _sse_message('learner_state', state)
+            
+            while True:
+                try:
+                    message = subscription.get(timeout=Config.SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ': heartbeat\n\n'
+                    continue
+                
+                if message['type'] == 'learner_state':
+                    yield _sse_message('learner_state', message['state'])
+                else:
+                    yield _sse_message(message['type'], {'event_id': message['event_id']})
+        finally:
+            NotificationHub.unsubscribe_student(student_id, subscription)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype=SSE_MIMETYPE,
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
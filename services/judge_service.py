@@ -62,4 +62,16 @@ class JudgeService:
             'total_tests': len(test_cases),
             'failures': failures,
             'solve_time': time.time() - start_time
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def redact_result(result: dict) -> dict:
+        """
+        Copy of an execute_code result that is safe to send to the client:
+        expected outputs of (hidden) test cases are removed.
+        """
+        failures = [
+            {key: value for key, value in failure.items() if key != 'expected'}
+            for failure in result.get('failures', [])
+        ]
+        return {**result, 'failures': failures}
\ No newline at end of file
@@ -1,7 +1,12 @@
 import math
-from models.problem_model import ProblemModel
+import numpy as np
+from models.problem_catalog import ProblemCatalog
+from models.problem_similarity import ProblemSimilarity
 from models.sequence_log_model import SequenceLogModel
 
+# Energy bonus for a topic the student failed recently
+REDEMPTION_BONUS = 0.4
+
 class KFFSequencer:
     def __init__(self, gamma=0.25, alpha=1.0, beta=0.6):
         self.gamma = gamma
@@ -20,42 +25,126 @@ class KFFSequencer:
 
     def get_next_problem(self, student_id: str, current_problem_id: str, weak_skills: list,
                          bkt_mastery: float) -> tuple:
+        recommendations, metrics = self.get_recommendations(
+            student_id, current_problem_id, weak_skills, bkt_mastery, k=1
+        )
+        best_problem = recommendations[0]['problem'] if recommendations else None
+        return best_problem, metrics
+
+    def get_recommendations(self, student_id: str, current_problem_id: str, weak_skills: list,
+                            bkt_mastery: float, k: int = 5, failed_problem_id: str = None) -> tuple:
+        """
+        Rank the k lowest-energy candidate problems.
+
+        When failed_problem_id is given, the problem most similar to it (from
+        the ProblemSimilarity index) within the difficulty window is added as
+        a redemption candidate.
+
+        Returns:
+            tuple: ([{"problem": catalog entry, "energy": float}], flow metrics)
+        """
         # 1. Calculate Target Challenge First
-        recent_results = SequenceLogModel.get_recent_results(student_id)
-        v = self.calculate_momentum(recent_results)
+        # One small session_state read for momentum, stagnation and redemption
+        context = SequenceLogModel.get_session_state(student_id)
+        v = context['momentum']
+        if v is None:
+            v = self.calculate_momentum(context['recent_results'])
         target_challenge = max(0.0, min(1.0, bkt_mastery + (self.gamma * v)))
+        metrics = {"mastery": bkt_mastery, "momentum": v, "target_challenge": target_challenge}
 
-        # 2. Use your optimized MongoDB query instead of get_all_problems!
-        candidate_problems = ProblemModel.get_candidate_problems(
-            weak_skills=weak_skills,
-            current_problem_id=current_problem_id,
-            target_challenge=target_challenge
+        # 2. Candidate lookup from the in-memory problem catalog (no Mongo query)
+        catalog = ProblemCatalog.snapshot()
+        positions = ProblemCatalog.get_candidate_indices(
+            catalog, weak_skills, current_problem_id, target_challenge
         )
 
-        best_problem = None
-        lowest_energy = float('inf')
+        # 3. Stagnation and Redemption inputs (from the same session_state read),
+        #    plus a problem like the one just failed
+        retry_position = self.similar_candidate(
+            catalog, failed_problem_id, current_problem_id, target_challenge
+        )
+        if retry_position is not None:
+            positions = np.append(positions[positions != retry_position], retry_position)
 
-        # 3. Fetch logs for Stagnation and Redemption
-        recent_skills = SequenceLogModel.get_recent_skills(student_id, limit=2)
-        failed_skills = SequenceLogModel.get_recently_failed_skills(student_id, limit=10)
+        # 4. Score all candidates at once and keep the k best
+        energies = self.score_candidates(
+            catalog, positions, target_challenge,
+            context['recent_skills'], context['failed_skills'], retry_position
+        )
+        best = self.top_k(energies, k, positions)
 
-        # 4. Evaluate only the highly relevant candidates
-        for prob in candidate_problems:
-            difficulty = prob.get('difficulty', 0.5)
-            primary_skill = prob.get('primary_skill')
+        recommendations = [
+            {"problem": dict(catalog.entries[positions[i]]), "energy": float(energies[i])}
+            for i in best
+        ]
+        return recommendations, metrics
 
-            # Stagnation: Penalize if seen in the last 2 turns
-            stagnation = 1.0 if primary_skill in recent_skills else 0.0
+    @staticmethod
+    def similar_candidate(catalog, failed_problem_id, current_problem_id=None,
+                          target_challenge=None, margin=0.2):
+        """
+        Bank position of the problem most similar to a failed one, or None.
 
-            # Redemption: Bonus if they failed this topic recently (but not on the immediate last turn)
-            redemption = -0.4 if primary_skill in failed_skills and primary_skill not in recent_skills else 0.0
+        Only neighbours inside the same difficulty window as the other
+        candidates (target_challenge +/- margin) qualify.
+        """
+        if failed_problem_id is None:
+            return None
+        for neighbour_id, _ in ProblemSimilarity.get_similar(failed_problem_id):
+            position = catalog.index_of.get(neighbour_id)
+            if position is None or neighbour_id == str(current_problem_id):
+                continue
+            if target_challenge is not None:
+                difficulty = catalog.difficulty[position]
+                if np.isnan(difficulty) or abs(difficulty - target_challenge) > margin:
+                    continue
+            return position
+        return None
 
-            # Flow Divergence Energy with Redemption Arc
-            energy = (self.alpha * (difficulty - target_challenge) ** 2) + (self.beta * stagnation) + redemption
+    def score_candidates(self, catalog, positions, target_challenge: float,
+                         recent_skills: list, failed_skills: list, retry_position=None):
+        """
+        Flow-divergence energy of each candidate, vectorized over the catalog arrays.
 
-            if energy < lowest_energy:
-                lowest_energy = energy
-                best_problem = prob
+        energy = alpha * (difficulty - target)^2 + beta * stagnation + redemption
 
-        metrics = {"mastery": bkt_mastery, "momentum": v, "target_challenge": target_challenge}
-        return best_problem, metrics
\ No newline at end of file
+        The candidate at retry_position (similar to the problem just failed)
+        gets the redemption bonus; its difficulty and stagnation terms are
+        the same as any other candidate's.
+        """
+        difficulty = catalog.score_difficulty[positions]
+        primary = catalog.primary_code[positions]
+
+        # Stagnation: Penalize if seen in the last 2 turns
+        stagnation = catalog.skill_table(recent_skills)[primary]
+
+        # Redemption: Bonus if they failed this topic recently (but not on the immediate last turn)
+        redemption = catalog.skill_table(failed_skills)[primary] & ~stagnation
+
+        if retry_position is not None:
+            redemption = redemption | (positions == retry_position)
+
+        # Flow Divergence Energy with Redemption Arc
+        return (self.alpha * (difficulty - target_challenge) ** 2
+                + self.beta * stagnation
+                - REDEMPTION_BONUS * redemption)
+
+    @staticmethod
+    def top_k(energies, k: int, positions=None):
+        """
+        Indices of the k lowest energies; ties keep bank order (first seen wins).
+
+        positions gives each energy's bank position when candidates are not
+        in bank order.
+        """
+        if k <= 0 or not energies.size:
+            return np.empty(0, dtype=np.int64)
+        if k < energies.size:
+            # Keep everything tied with the k-th value so bank order breaks ties
+            kth = np.partition(energies, k - 1)[k - 1]
+            subset = np.flatnonzero(energies <= kth)
+        else:
+            subset = np.arange(energies.size)
+        tie_break = subset if positions is None else positions[subset]
+        order = np.lexsort((tie_break, energies[subset]))
+        return subset[order][:k]
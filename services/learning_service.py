@@ -65,30 +65,45 @@ class LearningService:
         
         # Build mastery update response
         mastery_update = {}
-        for skill_id in skills:
+        for skill_id, new_mastery in updated_masteries.items():
             mastery_update[skill_id] = {
                 'old': old_masteries.get(skill_id, 0.2),
-                'new': updated_masteries[skill_id]
+                'new': new_mastery
             }
         
         # Get all current masteries for analysis
         all_masteries = StudentModel.get_student_skills(student_id)
+        summary = LearningService.summarize_masteries(all_masteries)
         
-        # Compute weak skills (mastery < 0.4)
+        return {
+            'status': 'updated',
+            'mastery_update': mastery_update,
+            'weak_skills': summary['weak_skills'],
+            'learning_state': summary['learning_state']
+        }
+    
+    @staticmethod
+    def summarize_masteries(all_masteries):
+        """
+        Derive weak skills, average and learning state from masteries.
+        
+        Args:
+            all_masteries: Dict of skill_id -> mastery
+            
+        Returns:
+            dict: {weak_skills: [skill_ids with mastery < 0.4],
+                   average: float, learning_state: str}
+        """
         weak_skills = [
             skill_id for skill_id, mastery in all_masteries.items()
             if mastery < 0.4
         ]
-        
-        # Determine learning state based on average mastery
-        avg_mastery = sum(all_masteries.values()) / len(all_masteries)
-        learning_state = LearningService._compute_learning_state(avg_mastery)
+        avg_mastery = sum(all_masteries.values()) / max(len(all_masteries), 1)
         
         return {
-            'status': 'updated',
-            'mastery_update': mastery_update,
             'weak_skills': weak_skills,
-            'learning_state': learning_state
+            'average': avg_mastery,
+            'learning_state': LearningService._compute_learning_state(avg_mastery)
         }
     
     @staticmethod
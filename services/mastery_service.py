@@ -1,9 +1,10 @@
 """Mastery service for handling skill updates and logging."""
 from datetime import datetime
+from pymongo import UpdateOne
 from db import Database
 from models.bkt_model import BKTModel
 from models.student_model import StudentModel
-from utils.skill_loader import SkillLoader
+from utils.skill_ontology import SkillOntology
 
 class MasteryService:
     """Service for mastery updates and performance tracking."""
@@ -17,7 +18,7 @@ class MasteryService:
         Args:
             student_id: Student identifier
             problem_id: Problem identifier
-            skills: List of skill IDs involved
+            skills: List of skill IDs involved (any SkillOntology label)
             correct: Whether attempt was correct
             error_type: Type of error (if incorrect)
             attempts: Number of attempts
@@ -29,89 +30,213 @@ class MasteryService:
         Raises:
             ValueError: If student or skills are invalid
         """
+        results, error = MasteryService.apply_attempts(student_id, [{
+            'problem_id': problem_id,
+            'skills': skills,
+            'correct': correct,
+            'error_type': error_type,
+            'attempts': attempts,
+            'solve_time': solve_time
+        }])
+        
+        if error:
+            raise ValueError(error[1])
+        
+        return results[0]
+    
+    @staticmethod
+    def apply_attempts(student_id, attempt_list):
+        """
+        Fold a student's attempts through BKT in memory and commit once.
+        
+        Attempts are applied in order against an in-memory copy of the
+        student's skills, then the final masteries, all skill_history rows
+        and all performance_history rows are written with one bulk write
+        per collection. Folding stops at the first invalid attempt; only
+        the attempts before it are committed.
+        
+        Args:
+            student_id: Student identifier
+            attempt_list: List of dicts with {problem_id, skills, correct,
+                error_type, attempts, solve_time}, oldest first
+                
+        Returns:
+            tuple: (results, error) where results is a list of updated
+                   mastery dicts for the applied prefix and error is
+                   (index, message) for the first rejected attempt or None
+                   
+        Raises:
+            ValueError: If the student does not exist
+        """
         db = Database.get_db()
         
         if not db.students.find_one({'student_id': student_id}):
             raise ValueError(f"Student {student_id} not found")
         
-        SkillLoader.validate_skill_ids(skills)
+        skill_states = {
+            doc['skill_id']: doc
+            for doc in db.student_skills.find({'student_id': student_id})
+        }
         
-        timestamp = datetime.utcnow()
-        updated_masteries = {}
+        # Effective masteries for prerequisite boosting, kept current as we fold
+        now = datetime.utcnow()
+        student_skills = {
+            skill_id: BKTModel.apply_forgetting(
+                doc['mastery'], doc.get('last_updated'), skill_id, now
+            )
+            for skill_id, doc in skill_states.items()
+        }
         
-        # Get all student skills for prerequisite boosting
-        student_skills = StudentModel.get_student_skills(student_id)
+        results = []
+        error = None
+        history_rows = []
+        performance_rows = []
+        touched = {}
         
-        for skill_id in skills:
-            skill_doc = db.student_skills.find_one({
-                'student_id': student_id,
-                'skill_id': skill_id
-            })
+        for index, attempt in enumerate(attempt_list):
+            try:
+                # Problem tags and subskill names map onto skills.json IDs
+                skills = SkillOntology.normalize(attempt['skills'], strict=True)
+                missing = [s for s in skills if s not in skill_states]
+                if missing:
+                    raise ValueError(
+                        f"Skill {missing[0]} not initialized for student {student_id}"
+                    )
+            except ValueError as e:
+                error = (index, str(e))
+                break
             
-            if not skill_doc:
-                raise ValueError(f"Skill {skill_id} not initialized for student {student_id}")
+            timestamp = datetime.utcnow()
+            updated_masteries = {}
+            prior_masteries = []
             
-            old_mastery = skill_doc['mastery']
-            attempt_count = skill_doc.get('attempt_count', 0)
-            
-            # Apply BKT update
-            new_mastery, posterior, confidence, bkt_params = BKTModel.update_mastery(
-                old_mastery, correct, skill_id, error_type, attempts, solve_time
-            )
-            
-            # Apply prerequisite boost if applicable
-            if attempt_count == 0:  # First attempt
-                boost = BKTModel.get_prerequisite_boost(skill_id, student_skills)
-                new_mastery = min(0.9, new_mastery + boost)
-            
-            # Re-estimate mastery after first 3 problems
-            if attempt_count == 2:  # After 3rd attempt (0, 1, 2)
-                new_mastery = MasteryService._recalibrate_mastery(
-                    student_id, skill_id, new_mastery
+            for skill_id in skills:
+                state = skill_states[skill_id]
+                
+                # Forgetting since the last update is persisted with this write
+                old_mastery = BKTModel.apply_forgetting(
+                    state['mastery'], state.get('last_updated'), skill_id, timestamp
                 )
+                attempt_count = state.get('attempt_count', 0)
+                prior_masteries.append(old_mastery)
+                
+                # Apply BKT update
+                new_mastery, posterior, confidence, bkt_params = BKTModel.update_mastery(
+                    old_mastery, attempt['correct'], skill_id, attempt['error_type'],
+                    attempt['attempts'], attempt['solve_time']
+                )
+                
+                # Apply prerequisite boost if applicable
+                if attempt_count == 0:  # First attempt
+                    boost = BKTModel.get_prerequisite_boost(skill_id, student_skills)
+                    new_mastery = min(0.9, new_mastery + boost)
+                
+                # Re-estimate mastery after first 3 problems
+                if attempt_count == 2:  # After 3rd attempt (0, 1, 2)
+                    pending = [
+                        row for row in reversed(history_rows)
+                        if row['skill_id'] == skill_id
+                    ]
+                    new_mastery = MasteryService._recalibrate_mastery(
+                        student_id, skill_id, new_mastery, pending
+                    )
+                
+                state['mastery'] = new_mastery
+                state['last_updated'] = timestamp
+                state['attempt_count'] = attempt_count + 1
+                student_skills[skill_id] = new_mastery
+                touched[skill_id] = touched.get(skill_id, 0) + 1
+                
+                history_rows.append({
+                    'student_id': student_id,
+                    'skill_id': skill_id,
+                    'old_mastery': old_mastery,
+                    'new_mastery': new_mastery,
+                    'problem_id': attempt['problem_id'],
+                    'error_type': attempt['error_type'],
+                    'timestamp': timestamp,
+                    'posterior': posterior,
+                    'confidence': confidence,
+                    'evidence_type': 'correct' if attempt['correct'] else (
+                        attempt['error_type'] or 'incorrect'
+                    ),
+                    'bkt_params_used': bkt_params
+                })
+                
+                updated_masteries[skill_id] = new_mastery
             
-            db.student_skills.update_one(
-                {'student_id': student_id, 'skill_id': skill_id},
-                {
-                    '$set': {
-                        'mastery': new_mastery,
-                        'last_updated': timestamp
-                    },
-                    '$inc': {'attempt_count': 1}
-                }
-            )
-            
-            db.skill_history.insert_one({
+            performance_rows.append({
                 'student_id': student_id,
-                'skill_id': skill_id,
-                'old_mastery': old_mastery,
-                'new_mastery': new_mastery,
-                'problem_id': problem_id,
-                'error_type': error_type,
-                'timestamp': timestamp,
-                'posterior': posterior,
-                'confidence': confidence,
-                'evidence_type': 'correct' if correct else (error_type or 'incorrect'),
-                'bkt_params_used': bkt_params
+                'problem_id': attempt['problem_id'],
+                'skills': skills,
+                'correct': attempt['correct'],
+                'attempts': attempt['attempts'],
+                'solve_time': attempt['solve_time'],
+                'error_type': attempt['error_type'],
+                # Mean effective mastery before the update (difficulty calibration)
+                'mastery_at_attempt': (
+                    sum(prior_masteries) / len(prior_masteries) if prior_masteries else None
+                ),
+                'timestamp': timestamp
             })
-            
-            updated_masteries[skill_id] = new_mastery
+            results.append(updated_masteries)
         
-        db.performance_history.insert_one({
-            'student_id': student_id,
-            'problem_id': problem_id,
-            'skills': skills,
-            'correct': correct,
-            'attempts': attempts,
-            'solve_time': solve_time,
-            'error_type': error_type,
-            'timestamp': timestamp
-        })
+        # Attempts whose skills are all unknown still belong in performance_history
+        if performance_rows:
+            MasteryService._commit(
+                student_id, skill_states, touched, history_rows, performance_rows
+            )
         
-        return updated_masteries
+        return results, error
     
     @staticmethod
-    def _recalibrate_mastery(student_id, skill_id, current_mastery):
+    def _commit(student_id, skill_states, touched, history_rows, performance_rows):
+        """
+        Persist a folded update with one bulk write per collection.
+        
+        Collections with nothing to write are skipped; a fold can carry
+        performance rows without any skill update.
+        
+        Args:
+            student_id: Student identifier
+            skill_states: skill_id -> in-memory skill document after folding
+            touched: skill_id -> number of updates applied to it
+            history_rows: skill_history documents to insert
+            performance_rows: performance_history documents to insert
+        """
+        db = Database.get_db()
+        
+        if touched:
+            db.student_skills.bulk_write([
+                UpdateOne(
+                    {'student_id': student_id, 'skill_id': skill_id},
+                    {
+                        '$set': {
+                            'mastery': skill_states[skill_id]['mastery'],
+                            'last_updated': skill_states[skill_id]['last_updated']
+                        },
+                        '$inc': {'attempt_count': count}
+                    }
+                )
+                for skill_id, count in touched.items()
+            ], ordered=False)
+        
+        if history_rows:
+            db.skill_history.insert_many(history_rows, ordered=False)
+        db.performance_history.insert_many(performance_rows, ordered=False)
+        
+        if touched:
+            # Write-through to the mastery cache and invalidate other processes.
+            # Skills touched in one fold share the last attempt's timestamp.
+            last_updated = performance_rows[-1]['timestamp']
+            StudentModel.apply_mastery_update(
+                student_id,
+                {skill_id: skill_states[skill_id]['mastery'] for skill_id in touched},
+                last_updated
+            )
+    
+    @staticmethod
+    def _recalibrate_mastery(student_id, skill_id, current_mastery, pending_history=None):
         """
         Re-estimate mastery after first 3 problems using mean posterior.
         
@@ -119,17 +244,22 @@ class MasteryService:
             student_id: Student identifier
             skill_id: Skill identifier
             current_mastery: Current mastery value
-            
+            pending_history: Not yet committed history rows for this skill,
+                newest first, which take precedence over stored rows
+                
         Returns:
             float: Recalibrated mastery
         """
-        db = Database.get_db()
+        history = list(pending_history or [])[:3]
         
-        # Get last 3 skill history entries
-        history = list(db.skill_history.find({
-            'student_id': student_id,
-            'skill_id': skill_id
-        }).sort('timestamp', -1).limit(3))
+        if len(history) < 3:
+            db = Database.get_db()
+            
+            # Get last 3 skill history entries
+            history.extend(db.skill_history.find({
+                'student_id': student_id,
+                'skill_id': skill_id
+            }).sort('timestamp', -1).limit(3 - len(history)))
         
         if len(history) < 3:
             return current_mastery
@@ -0,0 +1,276 @@
+"""
+Notification Hub - In-process fan-out of learning event completions.
+
+Long-poll and SSE clients register here instead of polling MongoDB:
+1. One background thread per process, started with the app, watches
+   learning_events for completions (change stream) and wakes the
+   registered waiters; a reopened stream resumes after the last change seen
+2. On a standalone server without change streams it falls back to one
+   shared poller that only queries the events and students being waited on,
+   over an overlapping completed_at window deduplicated by event id
+3. Student subscribers also receive the learner state written by the
+   worker just before the events were marked complete
+"""
+
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from config import Config
+from db import Database
+from pymongo.errors import OperationFailure, PyMongoError
+
+class NotificationHub:
+    """Routes learning event completions to waiting requests."""
+    
+    _lock = threading.Lock()
+    _thread = None
+    _resume_token = None
+    _event_waiters = {}  # event_id (str) -> set of threading.Event
+    _student_queues = {}  # student_id -> set of queue.Queue
+    
+    @classmethod
+    def register_event(cls, event_id):
+        """
+        Register interest in an event's completion.
+        
+        Register before reading the event from the database so that a
+        completion landing between the read and the wait is not missed.
+        
+        Args:
+            event_id: Event id as a string
+            
+        Returns:
+            threading.Event: Set when the event completes
+        """
+        waiter = threading.Event()
+        with cls._lock:
+            cls._event_waiters.setdefault(event_id, set()).add(waiter)
+        cls.start()
+        return waiter
+    
+    @classmethod
+    def unregister_event(cls, event_id, waiter):
+        """Remove a waiter registered with register_event."""
+        with cls._lock:
+            waiters = cls._event_waiters.get(event_id)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del cls._event_waiters[event_id]
+    
+    @classmethod
+    def subscribe_student(cls, student_id):
+        """
+        Subscribe to a student's completions and learner state updates.
+        
+        Args:
+            student_id: Student identifier
+            
+        Returns:
+            queue.Queue: Receives {type, ...} notification dicts
+        """
+        subscription = queue.Queue(maxsize=Config.NOTIFY_QUEUE_SIZE)
+        with cls._lock:
+            cls._student_queues.setdefault(student_id, set()).add(subscription)
+        cls.start()
+        return subscription
+    
+    @classmethod
+    def unsubscribe_student(cls, student_id, subscription):
+        """Remove a queue returned by subscribe_student."""
+        with cls._lock:
+            subscriptions = cls._student_queues.get(student_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del cls._student_queues[student_id]
+    
+    @classmethod
+    def publish_completions(cls, completions):
+        """
+        Notify waiters that events completed.
+        
+        Args:
+            completions: List of (event_id, student_id) pairs; student_id
+                may be None to wake event waiters only
+        """
+        students = set()
+        with cls._lock:
+            for event_id, student_id in completions:
+                for waiter in cls._event_waiters.get(str(event_id), ()):
+                    waiter.set()
+                if student_id in cls._student_queues:
+                    students.add(student_id)
+                    cls._push(student_id, {
+                        'type': 'event_completed',
+                        'event_id': str(event_id)
+                    })
+        
+        # One learner_state read per student, shared by all its subscribers.
+        # Oldest first so the newest of any legacy duplicates wins.
+        if students:
+            db = Database.get_db()
+            latest = {}
+            for state in db.learner_state.find(
+                {'student_id': {'$in': list(students)}}, {'_id': 0}
+            ).sort('updated_at', 1):
+                latest[state['student_id']] = state
+            for student_id, state in latest.items():
+                if 'updated_at' in state:
+                    state['updated_at'] = state['updated_at'].isoformat()
+                with cls._lock:
+                    cls._push(student_id, {'type': 'learner_state', 'state': state})
+    
+    @classmethod
+    def _push(cls, student_id, message):
+        """Queue a message for a student's subscribers (caller holds the lock)."""
+        for subscription in cls._student_queues.get(student_id, ()):
+            try:
+                subscription.put_nowait(message)
+            except queue.Full:
+                pass  # Slow client; it re-reads state on reconnect
+    
+    @classmethod
+    def start(cls):
+        """
+        Start the shared listener thread if it is not running.
+        
+        Called by initialize_app so the change stream is open before the
+        first request; registering a waiter also calls it as a fallback.
+        """
+        with cls._lock:
+            if cls._thread is None or not cls._thread.is_alive():
+                cls._thread = threading.Thread(
+                    target=cls._run, name='notification-hub', daemon=True
+                )
+                cls._thread.start()
+    
+    @classmethod
+    def _has_listeners(cls):
+        """Check whether any request is waiting on a notification."""
+        with cls._lock:
+            return bool(cls._event_waiters or cls._student_queues)
+    
+    @classmethod
+    def _run(cls):
+        """Listener loop: change stream when available, else shared polling."""
+        while True:
+            try:
+                cls._watch_change_stream()
+            except OperationFailure as e:
+                if cls._resume_token is not None:
+                    # Resume point no longer in the oplog; start from now
+                    print(f"Notification hub: cannot resume change stream ({e}); reopening")
+                    cls._resume_token = None
+                    continue
+                print(f"Notification hub: change streams unavailable ({e}); polling")
+                cls._poll()
+            except PyMongoError as e:
+                print(f"Notification hub: change stream error ({e}); reopening")
+                time.sleep(Config.NOTIFY_POLL_INTERVAL)
+    
+    @classmethod
+    def _watch_change_stream(cls):
+        """
+        Publish completions from a change stream on learning_events.
+        
+        The stream's resume token is kept after every batch so a stream
+        reopened after an error picks up exactly where this one stopped.
+        """
+        db = Database.get_db()
+        pipeline = [
+            {'$match': {
+                'operationType': 'update',
+                'updateDescription.updatedFields.completed': True
+            }},
+            {'$project': {'documentKey': 1, 'fullDocument.student_id': 1}}
+        ]
+        
+        with db.learning_events.watch(
+            pipeline, full_document='updateLookup', max_await_time_ms=1000,
+            resume_after=cls._resume_token
+        ) as stream:
+            while True:
+                # Drain whatever is buffered so one batch is published together
+                completions = []
+                change = stream.try_next()
+                while change is not None:
+                    full_document = change.get('fullDocument') or {}
+                    completions.append(
+                        (change['documentKey']['_id'], full_document.get('student_id'))
+                    )
+                    if len(completions) >= 500:
+                        break
+                    change = stream.try_next()
+                if completions:
+                    cls.publish_completions(completions)
+                if stream.resume_token is not None:
+                    cls._resume_token = stream.resume_token
+    
+    @classmethod
+    def _poll(cls):
+        """
+        Shared poller: one query per interval for everything waited on.
+        
+        completed_at is stamped by the workers' clocks, not this process's,
+        and a completion can be written after a poll with an earlier
+        completed_at. Student completions are therefore read from a window
+        reaching NOTIFY_POLL_OVERLAP seconds before the previous poll and
+        deduplicated by event id, so skew or late writes within the
+        overlap are still delivered exactly once.
+        """
+        db = Database.get_db()
+        overlap = timedelta(seconds=Config.NOTIFY_POLL_OVERLAP)
+        watermark = datetime.utcnow()
+        notified = {}  # event _id -> completed_at, already sent to subscribers
+        
+        while True:
+            time.sleep(Config.NOTIFY_POLL_INTERVAL)
+            if not cls._has_listeners():
+                watermark = datetime.utcnow()
+                continue
+            
+            with cls._lock:
+                event_ids = list(cls._event_waiters)
+                student_ids = list(cls._student_queues)
+            
+            since = watermark - overlap
+            conditions = []
+            if event_ids:
+                conditions.append({'_id': {'$in': [ObjectId(e) for e in event_ids]}})
+            if student_ids:
+                conditions.append({
+                    'student_id': {'$in': student_ids},
+                    'completed_at': {'$gt': since}
+                })
+            
+            polled_at = datetime.utcnow()
+            completions = []
+            for event in db.learning_events.find(
+                {'completed': True, '$or': conditions},
+                {'student_id': 1, 'completed_at': 1}
+            ):
+                # Student subscribers hear about each completion in the window once
+                completed_at = event.get('completed_at')
+                is_new = (
+                    completed_at is not None and completed_at > since
+                    and event['_id'] not in notified
+                )
+                if is_new:
+                    notified[event['_id']] = completed_at
+                completions.append(
+                    (event['_id'], event['student_id'] if is_new else None)
+                )
+            watermark = polled_at
+            
+            # Completions older than the next window can no longer be read again
+            cutoff = watermark - overlap
+            notified = {
+                event_id: completed_at for event_id, completed_at in notified.items()
+                if completed_at > cutoff
+            }
+            
+            if completions:
+                cls.publish_completions(completions)
@@ -0,0 +1,176 @@
+"""
+Recommendation Service - Precomputed next-problem recommendations.
+
+Keeps one document per student in the recommendations collection:
+1. The learning worker refreshes it after every mastery change
+2. /api/submit runs the sequencer once after its own mastery write and
+   stores the result; GET /students/<id>/next serves it with a key lookup
+3. A document is fresh while the student's state_version and the problem
+   catalog version still match and it is younger than
+   RECOMMENDATION_TTL_SECONDS (masteries decay with time); otherwise the
+   KFFSequencer runs synchronously and the result is written back
+4. After a failed attempt the failed problem is passed along so the
+   sequencer can offer a similar problem (redemption candidate)
+"""
+
+from datetime import datetime
+from config import Config
+from db import Database
+from models.problem_catalog import ProblemCatalog
+from models.sequence_log_model import SequenceLogModel
+from models.student_model import StudentModel
+from services.kff_sequencer import KFFSequencer
+from services.learning_service import LearningService
+from pymongo.errors import DuplicateKeyError
+
+class RecommendationService:
+    """Computes, stores and serves each student's next problems."""
+    
+    @staticmethod
+    def compute(student_id, current_problem_id=None, k=None, failed_problem_id=None):
+        """
+        Run the sequencer for a student and store the result.
+        
+        Args:
+            student_id: Student identifier
+            current_problem_id: Problem the student just worked on (excluded
+                from the candidates); defaults to the session's current problem
+            k: Number of problems kept (default RECOMMENDATION_CACHE_K)
+            failed_problem_id: Problem the student just failed, if any
+            
+        Returns:
+            dict: Recommendation document, or None if the student does not exist
+        """
+        # Read the version before the masteries so a concurrent write can
+        # only make the stored document look stale, never fresh
+        state_version = StudentModel.get_state_version(student_id)
+        if state_version is None:
+            return None
+        
+        catalog_version = ProblemCatalog.snapshot().version
+        all_masteries = StudentModel.get_student_skills(student_id)
+        summary = LearningService.summarize_masteries(all_masteries)
+        
+        if current_problem_id is None:
+            current_problem_id = SequenceLogModel.get_session_state(student_id)['current_problem_id']
+        
+        recommendations, flow_metrics = KFFSequencer().get_recommendations(
+            student_id=student_id,
+            current_problem_id=current_problem_id,
+            weak_skills=summary['weak_skills'],
+            bkt_mastery=summary['average'],
+            k=k or Config.RECOMMENDATION_CACHE_K,
+            failed_problem_id=failed_problem_id
+        )
+        
+        doc = {
+            '_id': student_id,
+            'state_version': state_version,
+            'catalog_version': catalog_version,
+            'current_problem_id': current_problem_id,
+            'failed_problem_id': failed_problem_id,
+            'recommendations': recommendations,
+            'flow_metrics': flow_metrics,
+            'computed_at': datetime.utcnow()
+        }
+        RecommendationService._store(doc)
+        return doc
+    
+    @staticmethod
+    def _store(doc):
+        """
+        Upsert a recommendation unless a newer state version is stored.
+        
+        Args:
+            doc: Recommendation document from compute
+        """
+        db = Database.get_db()
+        try:
+            db.recommendations.update_one(
+                {'_id': doc['_id'], 'state_version': {'$lte': doc['state_version']}},
+                {'$set': {key: value for key, value in doc.items() if key != '_id'}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            pass  # A writer with a newer state version got there first
+    
+    @staticmethod
+    def refresh(student_id, current_problem_id=None, failed_problem_id=None):
+        """
+        Recompute a student's recommendation after a mastery change.
+        
+        Used by the learning worker; failures are logged and never fail
+        the events being processed.
+        
+        Args:
+            student_id: Student identifier
+            current_problem_id: Problem of the last processed event
+            failed_problem_id: That problem, if the event was a failed attempt
+            
+        Returns:
+            bool: True if a recommendation was stored
+        """
+        try:
+            return RecommendationService.compute(
+                student_id, current_problem_id, failed_problem_id=failed_problem_id
+            ) is not None
+        except Exception as e:
+            print(f"Error precomputing recommendation for {student_id}: {e}")
+            return False
+    
+    @staticmethod
+    def is_fresh(doc, state_version):
+        """
+        Check whether a stored recommendation can still be served.
+        
+        Args:
+            doc: Stored recommendation document
+            state_version: Student's current state_version
+            
+        Returns:
+            bool: True if versions match and the document is within the TTL
+        """
+        age = (datetime.utcnow() - doc['computed_at']).total_seconds()
+        return (
+            doc.get('state_version') == state_version
+            and doc.get('catalog_version') == ProblemCatalog.snapshot().version
+            and age <= Config.RECOMMENDATION_TTL_SECONDS
+        )
+    
+    @staticmethod
+    def get_next(student_id, current_problem_id=None, failed_problem_id=None):
+        """
+        Get a student's recommendation, computing it only when stale.
+        
+        Args:
+            student_id: Student identifier
+            current_problem_id: Problem just submitted; a stored document
+                computed for a different problem is stale. None accepts
+                whatever problem the stored document was computed for.
+            failed_problem_id: Problem just failed (None after a success);
+                only checked together with current_problem_id
+            
+        Returns:
+            tuple: (recommendation document or None if the student does
+                    not exist, bool served from the cache)
+        """
+        db = Database.get_db()
+        doc = db.recommendations.find_one({'_id': student_id})
+        state_version = StudentModel.get_state_version(student_id)
+        if state_version is None:
+            return None, False
+        
+        if doc is not None:
+            same_problem = current_problem_id is None or (
+                doc.get('current_problem_id') == current_problem_id
+                and doc.get('failed_problem_id') == failed_problem_id
+            )
+            if same_problem and RecommendationService.is_fresh(doc, state_version):
+                return doc, True
+            if current_problem_id is None:
+                current_problem_id = doc.get('current_problem_id')
+                failed_problem_id = doc.get('failed_problem_id')
+        
+        return RecommendationService.compute(
+            student_id, current_problem_id, failed_problem_id=failed_problem_id
+        ), False
@@ -1,21 +1,25 @@
 from services.judge_service import JudgeService
-from services.kff_sequencer import KFFSequencer
 from services.learning_service import LearningService
+from services.recommendation_service import RecommendationService
 from error_mining_interface import analyze_learner_submission
 from models.problem_model import ProblemModel
 from models.sequence_log_model import SequenceLogModel
-from models.student_model import StudentModel
+from utils.skill_ontology import SkillOntology
 
 
 class SubmissionOrchestrator:
     @staticmethod
     def process_submission(student_id: str, problem_id: str, code: str, attempts: int):
-        # 1. Fetch Problem Data
-        problem = ProblemModel.get_problem_by_id(problem_id)
+        # 1. Fetch Problem Data (test cases and skills only)
+        problem = ProblemModel.get_judge_view(problem_id)
         if not problem:
             return {"error": "Problem not found"}
 
         problem_skills = problem.get('skills', [])
+        # Canonical skills.json IDs for BKT (written by the seeder)
+        skill_ids = problem.get('skill_ids')
+        if skill_ids is None:
+            skill_ids = SkillOntology.problem_skills(problem)['skill_ids']
 
         # 2. Execute Code (Judge)
         test_results = JudgeService.execute_code(code, problem.get('test_cases', []))
@@ -35,7 +39,7 @@ class SubmissionOrchestrator:
             "solve_time": test_results['solve_time']
         }
         diagnosis_payload = {
-            "skills": problem_skills,
+            "skills": skill_ids,
             "error_type": error_type,
         }
 
@@ -44,18 +48,24 @@ class SubmissionOrchestrator:
             student_id, problem_id, result_payload, diagnosis_payload
         )
 
-        # Calculate overall mastery for KFF from Member 2's updated data
-        all_masteries = StudentModel.get_student_skills(student_id)
-        overall_mastery = sum(all_masteries.values()) / max(len(all_masteries), 1)
-
         # 5. Adaptive Sequencing (Member 4 - KFF)
-        sequencer = KFFSequencer()
-        next_problem, flow_metrics = sequencer.get_next_problem(
-            student_id=student_id,
-            current_problem_id=problem_id,
-            weak_skills=m2_state.get('weak_skills', []),
-            bkt_mastery=overall_mastery
+        # The mastery write above always makes a precomputed recommendation
+        # stale, so KFF runs once here and the result is stored for
+        # GET /students/<id>/next
+        recommendation = RecommendationService.compute(
+            student_id, current_problem_id=problem_id,
+            failed_problem_id=None if is_correct else problem_id
         )
+        recommendations = recommendation['recommendations'] if recommendation else []
+        flow_metrics = recommendation['flow_metrics'] if recommendation else {}
+
+        # Candidates are compact catalog entries; load the statement first and
+        # fall back to the next candidate if the problem was deleted meanwhile
+        next_problem = None
+        for candidate in recommendations:
+            next_problem = ProblemModel.get_statement(candidate['problem']['_id'])
+            if next_problem:
+                break
 
         # 6. Log Sequence Decision for Member 6 Metrics
         if next_problem:
@@ -66,12 +76,12 @@ class SubmissionOrchestrator:
                 mastery=flow_metrics['mastery'],
                 momentum=flow_metrics['momentum'],
                 target_challenge=flow_metrics['target_challenge'],
-                was_correct=is_correct
+                was_correct=is_correct,
+                next_primary_skill=candidate['problem'].get('primary_skill')
             )
-            next_problem['_id'] = str(next_problem['_id'])
 
         return {
-            "submission_result": test_results,
+            "submission_result": JudgeService.redact_result(test_results),
             "error_analysis": {
                 "detected_errors": [e.error_id for e in analysis['detected_errors']],
                 "severity": analysis.get('overall_severity')
@@ -0,0 +1,16 @@
+"""Shared fixtures: an in-memory database for model and worker tests"""
+
+import pytest
+
+from db import Database
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Point Database at a fresh mongomock client with the app's indexes"""
+    mongomock = pytest.importorskip('mongomock')
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(Database, '_client', client)
+    monkeypatch.setattr(Database, '_db', client['dsagame_test'])
+    Database._create_indexes()
+    return Database.get_db()
@@ -0,0 +1,64 @@
+"""KFFSequencer candidate selection over an in-memory problem catalog"""
+
+import pytest
+
+from models.problem_catalog import ProblemCatalog
+from models.problem_similarity import ProblemSimilarity
+from models.sequence_log_model import SequenceLogModel
+from services.kff_sequencer import KFFSequencer
+
+PROBLEMS = [
+    {'_id': 'p_failed', 'title': 'Two Sum', 'difficulty': 0.2,
+     'primary_skill': 'arrays', 'skills': ['arrays']},
+    {'_id': 'p_hard', 'title': 'Equal Frequency Split Index', 'difficulty': 0.9,
+     'primary_skill': 'arrays', 'skills': ['arrays']},
+    {'_id': 'p_near', 'title': 'Pair Sum Count', 'difficulty': 0.25,
+     'primary_skill': 'arrays', 'skills': ['arrays']},
+    {'_id': 'p_hash', 'title': 'First Unique Character', 'difficulty': 0.2,
+     'primary_skill': 'hash_map', 'skills': ['hash_map']},
+    {'_id': 'p_hash_hard', 'title': 'Group Anagrams', 'difficulty': 0.35,
+     'primary_skill': 'hash_map', 'skills': ['hash_map']},
+]
+
+
+@pytest.fixture
+def sequencer(monkeypatch):
+    monkeypatch.setattr(ProblemCatalog, '_snapshot', None)
+    ProblemCatalog.load_documents(PROBLEMS)
+    # The student just failed p_failed (arrays)
+    monkeypatch.setattr(SequenceLogModel, 'get_session_state', staticmethod(lambda student_id: {
+        'current_problem_id': 'p_failed',
+        'recent_results': [{'correct': False}],
+        'recent_skills': ['arrays'],
+        'failed_skills': ['arrays'],
+        'momentum': 0.0
+    }))
+    neighbours = {'p_failed': [['p_hard', 0.9], ['p_near', 0.7]]}
+    monkeypatch.setattr(ProblemSimilarity, 'get_similar', classmethod(
+        lambda cls, problem_id, k=None: neighbours.get(problem_id, [])
+    ))
+    return KFFSequencer()
+
+
+def test_similar_problem_outside_the_difficulty_window_is_skipped(sequencer):
+    catalog = ProblemCatalog.snapshot()
+    position = sequencer.similar_candidate(catalog, 'p_failed', 'p_failed', target_challenge=0.2)
+    assert catalog.entries[position]['_id'] == 'p_near'
+
+    recommendations, metrics = sequencer.get_recommendations(
+        's1', 'p_failed', ['hashmaps'], 0.2, k=5, failed_problem_id='p_failed'
+    )
+    served = [item['problem']['_id'] for item in recommendations]
+    assert metrics['target_challenge'] == pytest.approx(0.2)
+    assert 'p_hard' not in served
+    assert 'p_near' in served
+
+
+def test_similar_problem_keeps_the_stagnation_penalty(sequencer):
+    recommendations, _ = sequencer.get_recommendations(
+        's1', 'p_failed', ['hashmaps'], 0.2, k=5, failed_problem_id='p_failed'
+    )
+    energies = {item['problem']['_id']: item['energy'] for item in recommendations}
+    # Same skill as the problem just failed: penalty 0.6, bonus 0.4
+    assert energies['p_near'] == pytest.approx(0.05 ** 2 + 0.6 - 0.4)
+    assert recommendations[0]['problem']['_id'] == 'p_hash'
@@ -0,0 +1,50 @@
+"""LearningWorker claims against an in-memory learning_events collection"""
+
+from datetime import datetime, timedelta
+
+from workers.learning_worker import LearningWorker
+
+
+def add_events(db, student_id, count):
+    start = datetime(2024, 1, 1)
+    db.learning_events.insert_many([
+        {
+            'submission_id': f'{student_id}_sub{index}',
+            'student_id': student_id,
+            'problem_id': f'p{index}',
+            'result': {'correct': True, 'attempts': 1, 'solve_time': 10},
+            'diagnosis': {'skills': ['arrays'], 'error_type': None},
+            'timestamp': start + timedelta(seconds=index),
+            'processing': {'bkt': False}
+        }
+        for index in range(count)
+    ])
+
+
+def submission_ids(events):
+    return [event['submission_id'] for event in events]
+
+
+def test_second_worker_waits_for_the_students_earlier_claim(db):
+    add_events(db, 's1', 4)
+    worker_a = LearningWorker(claim_batch_size=2)
+    worker_b = LearningWorker(claim_batch_size=2)
+
+    claimed_a = worker_a.claim_events_batch('s1')
+    claimed_b = worker_b.claim_events_batch('s1')
+
+    assert submission_ids(claimed_a) == ['s1_sub0', 's1_sub1']
+    assert claimed_b == []
+
+    worker_a.mark_events_complete([event['_id'] for event in claimed_a])
+    assert submission_ids(worker_b.claim_events_batch('s1')) == ['s1_sub2', 's1_sub3']
+
+
+def test_claims_for_other_students_are_independent(db):
+    add_events(db, 's1', 2)
+    add_events(db, 's2', 2)
+    worker_a = LearningWorker(claim_batch_size=2)
+    worker_b = LearningWorker(claim_batch_size=2)
+
+    assert submission_ids(worker_a.claim_events_batch('s1')) == ['s1_sub0', 's1_sub1']
+    assert submission_ids(worker_b.claim_events_batch('s2')) == ['s2_sub0', 's2_sub1']
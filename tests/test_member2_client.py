@@ -0,0 +1,114 @@
+"""Member2Client against a stand-in Flask /learn/batch endpoint"""
+
+import json
+import threading
+
+from flask import Flask, jsonify, redirect, request
+from werkzeug.serving import make_server
+
+from member2_bridge import Member2Client
+
+
+class StandInMember2:
+    """Serves /learn/batch on a local port and records every batch it accepts"""
+
+    def __init__(self, failures_before_success=0):
+        self.batches = []
+        self.failures = failures_before_success
+        self.lock = threading.Lock()
+
+        app = Flask(__name__)
+
+        @app.route('/learn/batch', methods=['POST'])
+        def learn_batch():
+            with self.lock:
+                if self.failures > 0:
+                    self.failures -= 1
+                    return jsonify({'error': 'unavailable'}), 503
+                events = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line]
+                self.batches.append(events)
+            return jsonify({'accepted': len(events), 'duplicate': 0, 'invalid': 0}), 200
+
+        @app.route('/loop/learn/batch', methods=['POST'])
+        def redirect_loop():
+            # 307 keeps the POST, so requests follows it until TooManyRedirects
+            return redirect('/loop/learn/batch', code=307)
+
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.server.shutdown()
+        self.thread.join()
+
+
+def flush_within(client, seconds=10.0):
+    """flush() on a helper thread so a dead flush thread fails the test instead of hanging it"""
+    flusher = threading.Thread(target=client.flush, daemon=True)
+    flusher.start()
+    flusher.join(seconds)
+    assert not flusher.is_alive(), "flush() did not return"
+
+
+def payload(index):
+    return {
+        'submission_id': f'sub_{index}',
+        'student_id': 's1',
+        'problem_id': 'p1',
+        'result': {'correct': True, 'attempts': 1, 'solve_time': 10},
+        'diagnosis': {'skills': ['arrays'], 'error_type': None}
+    }
+
+
+def test_batches_are_posted_in_order():
+    with StandInMember2() as member2:
+        with Member2Client(member2.url, batch_size=10, flush_interval=0.05) as client:
+            for index in range(25):
+                assert client.submit(payload(index))
+            flush_within(client)
+            stats = client.stats()
+
+    sent = [event['submission_id'] for batch in member2.batches for event in batch]
+    assert sent == [f'sub_{index}' for index in range(25)]
+    assert all(len(batch) <= 10 for batch in member2.batches)
+    assert stats['sent'] == 25
+    assert stats['failed'] == 0
+
+
+def test_server_errors_are_retried():
+    with StandInMember2(failures_before_success=2) as member2:
+        with Member2Client(member2.url, batch_size=5, flush_interval=0.05,
+                           max_retries=3, retry_base=0.01) as client:
+            for index in range(5):
+                client.submit(payload(index))
+            flush_within(client)
+            stats = client.stats()
+
+    assert len(member2.batches) == 1
+    assert stats['retries'] == 2
+    assert stats['sent'] == 5
+
+
+def test_other_request_errors_keep_the_flush_thread_alive():
+    with StandInMember2() as member2:
+        with Member2Client(f"{member2.url}/loop", batch_size=5, flush_interval=0.05,
+                           max_retries=1, retry_base=0.01) as client:
+            for index in range(5):
+                client.submit(payload(index))
+            flush_within(client)  # Blocks forever if TooManyRedirects killed the thread
+            assert client._thread.is_alive()
+
+            # The client keeps working after the failed batch
+            client.member2_url = member2.url
+            for index in range(5, 8):
+                client.submit(payload(index))
+            flush_within(client)
+            stats = client.stats()
+
+    assert stats['failed'] == 5
+    assert stats['sent'] == 3
@@ -0,0 +1,49 @@
+"""session_state maintenance in SequenceLogModel"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.sequence_log_model import SequenceLogModel
+from services.kff_sequencer import KFFSequencer
+
+
+@pytest.fixture
+def ring_only_momentum(monkeypatch):
+    # mongomock has no $reduce; without a stored momentum the sequencer
+    # derives it from the recent ring, exactly as for log-derived contexts
+    monkeypatch.setattr(SequenceLogModel, 'momentum_expression',
+                        staticmethod(lambda recent_field: {'$literal': None}))
+
+
+def add_logs(db, student_id, outcomes):
+    start = datetime(2024, 1, 1)
+    db.sequence_logs.insert_many([
+        {
+            'student_id': student_id,
+            'prev_problem_id': f'p{index - 1}',
+            'next_problem_id': f'p{index}',
+            'next_primary_skill': 'arrays',
+            'was_correct': correct,
+            'state_snapshot': {'mastery': 0.3, 'momentum': 0.0, 'target_challenge': 0.3},
+            'timestamp': start + timedelta(minutes=index)
+        }
+        for index, correct in enumerate(outcomes)
+    ])
+
+
+def test_first_decision_keeps_history_from_existing_logs(db, ring_only_momentum):
+    add_logs(db, 's1', [False, False, False, False])
+    sequencer = KFFSequencer()
+    before = SequenceLogModel.get_session_state('s1')
+    assert before['momentum'] is None  # Derived from the logs
+
+    SequenceLogModel.log_decision('s1', 'p3', 'p4', 0.3, 0.0, 0.3, True, next_primary_skill='graphs')
+    after = SequenceLogModel.get_session_state('s1')
+
+    assert [item['correct'] for item in after['recent_results']] == [True, False, False, False, False]
+    assert after['failed_skills'] == ['arrays'] * 4
+    assert sequencer.calculate_momentum(after['recent_results']) == pytest.approx(
+        sequencer.calculate_momentum([{'correct': True}] + before['recent_results'])
+    )
+
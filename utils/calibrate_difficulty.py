@@ -0,0 +1,289 @@
+"""
+Calibrate problem difficulty from submission outcomes.
+
+Authored difficulties in problems.json are estimates, but KFFSequencer
+matches them against target_challenge, which is on the mastery scale.
+This job fits a Rasch-style logistic model to performance_history:
+
+    P(correct) = sigmoid(SLOPE * (logit(mastery_at_attempt) - logit(difficulty)))
+
+so a problem's calibrated difficulty is the mastery at which students
+solve it half of the time. Each problem's logit difficulty has a Gaussian
+prior centred on its authored value (CALIBRATION_PRIOR_SD wide), so
+problems with few attempts stay close to it. Problems are independent
+given the masteries, so one bincount pass per Newton step fits all of
+them at once; per-problem models or a process pool to run problems in
+parallel would only add overhead (5M attempts fit in about a second).
+
+Attempts recorded before performance_history stored mastery_at_attempt
+are rebuilt from skill_history (mean old_mastery of the attempt's skills).
+
+Results go to the problem_calibration collection, one document per
+problem tagged with the calibration version, so reseeding the bank keeps
+them. The catalog version is then bumped and running servers switch to
+the calibrated difficulties within CATALOG_CHECK_INTERVAL seconds.
+
+Usage:
+    python utils/calibrate_difficulty.py [--min-attempts N] [--prior-sd SD] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+from array import array
+from datetime import datetime
+
+import numpy as np
+
+# Ensure db.py can be imported from the root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+from db import Database
+from models.problem_catalog import DEFAULT_DIFFICULTY, ProblemCatalog
+from pymongo import ReplaceOne, ReturnDocument
+
+# catalog_meta document holding the calibration version and last run summary
+CALIBRATION_META_ID = 'difficulty_calibration'
+
+# Discrimination shared by all problems (Rasch model)
+SLOPE = 1.0
+
+# Masteries and difficulties are kept inside [EPSILON, 1 - EPSILON] before logit
+EPSILON = 0.01
+
+# Largest Newton step in logits (damping for extreme success rates)
+MAX_STEP = 1.0
+
+
+def logit(p):
+    """Log-odds of probabilities clipped to [EPSILON, 1 - EPSILON]."""
+    p = np.clip(p, EPSILON, 1 - EPSILON)
+    return np.log(p / (1 - p))
+
+
+def sigmoid(x):
+    """Inverse of logit."""
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def load_bank(db):
+    """
+    Read the authored difficulties.
+    
+    Returns:
+        tuple: (problem IDs in bank order, authored difficulty array with
+                NaN where a problem has none)
+    """
+    problem_ids = []
+    authored = []
+    for doc in db.problems.find({}, {'difficulty': 1}):
+        problem_ids.append(str(doc['_id']))
+        difficulty = doc.get('difficulty')
+        authored.append(difficulty if isinstance(difficulty, (int, float)) else np.nan)
+    return problem_ids, np.asarray(authored, dtype=np.float64)
+
+
+def load_attempts(db, index_of, batch_size=10000):
+    """
+    Read (problem, mastery at attempt time, correct) triples.
+    
+    Uses mastery_at_attempt from performance_history and, for attempts
+    older than the first row carrying it, rebuilds it from skill_history.
+    Attempts on problems no longer in the bank are skipped.
+    
+    Args:
+        db: Database handle
+        index_of: problem_id -> bank position
+        batch_size: Cursor batch size
+        
+    Returns:
+        tuple: (bank position int64 array, mastery float64 array,
+                correct float64 array)
+    """
+    codes = array('q')
+    mastery = array('d')
+    correct = array('d')
+    
+    def add(problem_id, value, solved):
+        code = index_of.get(str(problem_id))
+        if code is not None and value is not None:
+            codes.append(code)
+            mastery.append(value)
+            correct.append(1.0 if solved else 0.0)
+    
+    query = {'mastery_at_attempt': {'$type': 'number'}}
+    first = db.performance_history.find_one(query, {'timestamp': 1}, sort=[('timestamp', 1)])
+    cursor = db.performance_history.find(
+        query, {'_id': 0, 'problem_id': 1, 'mastery_at_attempt': 1, 'correct': 1},
+        batch_size=batch_size
+    )
+    for row in cursor:
+        add(row['problem_id'], row['mastery_at_attempt'], row['correct'])
+    
+    # One skill_history row per (attempt, skill); the rows of one attempt
+    # share the student, problem and timestamp
+    legacy_match = {'timestamp': {'$lt': first['timestamp']}} if first else {}
+    legacy = db.skill_history.aggregate([
+        {'$match': legacy_match},
+        {'$group': {
+            '_id': {'student_id': '$student_id', 'problem_id': '$problem_id',
+                    'timestamp': '$timestamp'},
+            'mastery': {'$avg': '$old_mastery'},
+            'evidence_type': {'$first': '$evidence_type'}
+        }}
+    ], allowDiskUse=True, batchSize=batch_size)
+    for row in legacy:
+        add(row['_id']['problem_id'], row['mastery'], row['evidence_type'] == 'correct')
+    
+    return (
+        np.frombuffer(codes, dtype=np.int64),
+        np.frombuffer(mastery, dtype=np.float64),
+        np.frombuffer(correct, dtype=np.float64)
+    )
+
+
+def fit_difficulty(codes, mastery, correct, prior, prior_sd, max_iter=50, tol=1e-6):
+    """
+    MAP estimate of every problem's logit difficulty.
+    
+    Maximizes the Bernoulli log-likelihood plus a Gaussian prior per
+    problem. Problems are independent given the masteries, so one
+    vectorized Newton step updates all of them; the objective is concave
+    and converges in a few steps.
+    
+    Args:
+        codes: Bank position of each attempt
+        mastery: Mastery at attempt time of each attempt
+        correct: 1.0 for solved attempts, else 0.0
+        prior: Prior mean difficulty per problem (probability scale)
+        prior_sd: Prior standard deviation in logits
+        max_iter: Newton step limit
+        tol: Stop once no problem moves more than this (logits)
+        
+    Returns:
+        tuple: (difficulty array, standard error array in logits)
+    """
+    n = len(prior)
+    theta = logit(mastery)
+    prior_logit = logit(prior)
+    precision = 1.0 / prior_sd ** 2
+    beta = prior_logit.copy()
+    
+    for _ in range(max_iter):
+        p = sigmoid(SLOPE * (theta - beta[codes]))
+        residual = np.bincount(codes, weights=correct - p, minlength=n)
+        information = np.bincount(codes, weights=p * (1 - p), minlength=n)
+        
+        gradient = -SLOPE * residual - precision * (beta - prior_logit)
+        curvature = SLOPE ** 2 * information + precision
+        step = np.clip(gradient / curvature, -MAX_STEP, MAX_STEP)
+        beta += step
+        if np.max(np.abs(step), initial=0.0) < tol:
+            break
+    
+    p = sigmoid(SLOPE * (theta - beta[codes]))
+    information = np.bincount(codes, weights=p * (1 - p), minlength=n)
+    standard_error = 1.0 / np.sqrt(SLOPE ** 2 * information + precision)
+    difficulty = sigmoid(np.clip(beta, logit(0.0), logit(1.0)))
+    return difficulty, standard_error
+
+
+def calibrate_difficulty(min_attempts=None, prior_sd=None, dry_run=False, batch_size=500):
+    """
+    Fit difficulties from submission outcomes and publish them.
+    
+    Args:
+        min_attempts: Attempts a problem needs to be calibrated
+                      (default CALIBRATION_MIN_ATTEMPTS)
+        prior_sd: Prior standard deviation in logits (default
+                  CALIBRATION_PRIOR_SD)
+        dry_run: Print the largest changes without writing anything
+        batch_size: Documents per bulk write
+        
+    Returns:
+        dict: {version, problems, calibrated, attempts}; version is None
+              on a dry run
+    """
+    Database.initialize()
+    db = Database.get_db()
+    min_attempts = Config.CALIBRATION_MIN_ATTEMPTS if min_attempts is None else min_attempts
+    prior_sd = Config.CALIBRATION_PRIOR_SD if prior_sd is None else prior_sd
+    
+    problem_ids, authored = load_bank(db)
+    index_of = {problem_id: order for order, problem_id in enumerate(problem_ids)}
+    codes, mastery, correct = load_attempts(db, index_of)
+    print(f"Loaded {len(codes)} attempts on {len(problem_ids)} problems.")
+    
+    prior = np.where(np.isnan(authored), DEFAULT_DIFFICULTY, authored)
+    difficulty, standard_error = fit_difficulty(codes, mastery, correct, prior, prior_sd)
+    attempts = np.bincount(codes, minlength=len(problem_ids))
+    solved = np.bincount(codes, weights=correct, minlength=len(problem_ids))
+    selected = np.flatnonzero(attempts >= min_attempts)
+    
+    shift = np.abs(difficulty - prior)
+    for order in selected[np.argsort(-shift[selected], kind='stable')][:10]:
+        print(f"  {problem_ids[order]}: {prior[order]:.2f} -> {difficulty[order]:.2f} "
+              f"({attempts[order]} attempts, {solved[order] / attempts[order]:.0%} solved)")
+    
+    summary = {
+        'version': None,
+        'problems': len(problem_ids),
+        'calibrated': int(selected.size),
+        'attempts': int(len(codes))
+    }
+    if dry_run:
+        print(f"Dry run: {selected.size} problems would be calibrated.")
+        return summary
+    
+    calibrated_at = datetime.utcnow()
+    meta = db.catalog_meta.find_one_and_update(
+        {'_id': CALIBRATION_META_ID},
+        {'$inc': {'version': 1}, '$set': {
+            'calibrated_at': calibrated_at,
+            'problems': summary['calibrated'],
+            'attempts': summary['attempts'],
+            'min_attempts': min_attempts,
+            'prior_sd': prior_sd
+        }},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    version = meta['version']
+    
+    ops = []
+    for order in selected:
+        problem_id = problem_ids[order]
+        ops.append(ReplaceOne({'_id': problem_id}, {
+            '_id': problem_id,
+            'difficulty': float(difficulty[order]),
+            'authored_difficulty': None if np.isnan(authored[order]) else float(authored[order]),
+            'attempts': int(attempts[order]),
+            'success_rate': float(solved[order] / attempts[order]),
+            'standard_error': float(standard_error[order]),
+            'version': version,
+            'calibrated_at': calibrated_at
+        }, upsert=True))
+        if len(ops) >= batch_size:
+            db.problem_calibration.bulk_write(ops, ordered=False)
+            ops.clear()
+    if ops:
+        db.problem_calibration.bulk_write(ops, ordered=False)
+    
+    # Problems no longer calibrated (or deleted) fall back to authored values
+    db.problem_calibration.delete_many({'version': {'$ne': version}})
+    
+    catalog_version = ProblemCatalog.bump_version(db)
+    print(f"Calibration {version}: {selected.size} of {len(problem_ids)} problems calibrated; "
+          f"problem catalog version is now {catalog_version}.")
+    summary['version'] = version
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate problem difficulty from submissions")
+    parser.add_argument('--min-attempts', type=int, default=None)
+    parser.add_argument('--prior-sd', type=float, default=None)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+    
+    calibrate_difficulty(args.min_attempts, args.prior_sd, args.dry_run)
@@ -0,0 +1,84 @@
+"""
+One-time compaction of the legacy append-only learner_state collection.
+
+Before learner_state became one upserted document per student, the worker
+inserted a new document for every processed event. This keeps the newest
+document per student, copies the older ones into learner_state_history
+(unless --drop-history is given) and then creates the unique index on
+learner_state.student_id.
+
+Usage:
+    python utils/compact_learner_state.py [--drop-history]
+"""
+
+import os
+import sys
+
+# Ensure db.py can be imported from the root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import Database
+from pymongo import DeleteMany, InsertOne
+
+
+def compact_learner_state(keep_history=True, batch_size=500):
+    """
+    Collapse learner_state to the newest document per student.
+    
+    Args:
+        keep_history: Copy superseded documents into learner_state_history
+        batch_size: Students handled per bulk write
+        
+    Returns:
+        int: Number of documents removed from learner_state
+    """
+    Database.initialize()
+    db = Database.get_db()
+    
+    # Only students with more than one document need compacting
+    duplicates = db.learner_state.aggregate([
+        {'$sort': {'student_id': 1, 'updated_at': -1}},
+        {'$group': {
+            '_id': '$student_id',
+            'ids': {'$push': '$_id'},
+            'count': {'$sum': 1}
+        }},
+        {'$match': {'count': {'$gt': 1}}}
+    ], allowDiskUse=True)
+    
+    removed = 0
+    history_ops = []
+    delete_ops = []
+    
+    def flush():
+        if history_ops:
+            db.learner_state_history.bulk_write(history_ops, ordered=False)
+        if delete_ops:
+            db.learner_state.bulk_write(delete_ops, ordered=False)
+        history_ops.clear()
+        delete_ops.clear()
+    
+    for group in duplicates:
+        stale_ids = group['ids'][1:]
+        
+        if keep_history:
+            for doc in db.learner_state.find({'_id': {'$in': stale_ids}}):
+                doc.pop('_id')
+                history_ops.append(InsertOne(doc))
+        
+        delete_ops.append(DeleteMany({'_id': {'$in': stale_ids}}))
+        removed += len(stale_ids)
+        
+        if len(delete_ops) >= batch_size:
+            flush()
+    
+    flush()
+    print(f"Removed {removed} superseded learner_state documents.")
+    
+    db.learner_state.create_index('student_id', unique=True)
+    print("Created unique index on learner_state.student_id.")
+    
+    return removed
+
+
+if __name__ == "__main__":
+    compact_learner_state(keep_history='--drop-history' not in sys.argv[1:])
@@ -0,0 +1,91 @@
+"""Thread-safe bounded LRU cache used for in-process read caches."""
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    """Bounded least-recently-used mapping with hit/miss counters."""
+    
+    def __init__(self, capacity):
+        self.capacity = max(1, int(capacity))
+        self._data = OrderedDict()
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key, count=True):
+        """
+        Get a cached value and mark it most recently used.
+        
+        Args:
+            key: Cache key
+            count: Update the hit/miss counters; callers that may still
+                   reject the value pass False and call record() themselves
+            
+        Returns:
+            Cached value or None
+        """
+        with self.lock:
+            value = self._data.get(key)
+            if value is None:
+                if count:
+                    self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            if count:
+                self.hits += 1
+            return value
+    
+    def record(self, hit):
+        """Count one lookup made with get(key, count=False)."""
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+    
+    def put(self, key, value):
+        """
+        Insert or replace a value, evicting the least recently used entry.
+        
+        Args:
+            key: Cache key
+            value: Value to store (must not be None)
+        """
+        with self.lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+                self.evictions += 1
+    
+    def pop(self, key):
+        """Remove a key if present and return its value."""
+        with self.lock:
+            return self._data.pop(key, None)
+    
+    def clear(self):
+        """Drop all entries (counters are kept)."""
+        with self.lock:
+            self._data.clear()
+    
+    def __len__(self):
+        return len(self._data)
+    
+    def stats(self):
+        """
+        Get cache counters.
+        
+        Returns:
+            dict: {size, capacity, hits, misses, evictions, hit_ratio}
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'capacity': self.capacity,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,62 @@
+"""Helpers for JSON-array and NDJSON request/response bodies."""
+import json
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def iter_ndjson(stream):
+    """
+    Yield one decoded JSON value per non-empty line of a byte stream.
+    
+    Args:
+        stream: File-like object yielding bytes lines
+        
+    Raises:
+        ValueError: If a line is not valid JSON
+    """
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            raise ValueError(f"Invalid JSON on line {line_number}")
+
+def read_request_items(req, key, max_items):
+    """
+    Read a list of items from a JSON array, {key: [...]} or NDJSON body.
+    
+    NDJSON is used when the request Content-Type is application/x-ndjson
+    and is consumed line by line from the request stream.
+    
+    Args:
+        req: Flask request
+        key: Object key holding the list in JSON bodies
+        max_items: Maximum number of items accepted
+        
+    Returns:
+        list: Decoded items
+        
+    Raises:
+        ValueError: If the body is missing, malformed or too large
+    """
+    if req.mimetype == NDJSON_MIMETYPE:
+        items = []
+        for item in iter_ndjson(req.stream):
+            items.append(item)
+            if len(items) > max_items:
+                raise ValueError(f"At most {max_items} items are accepted per request")
+        return items
+    
+    data = req.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get(key)
+    if not isinstance(data, list):
+        raise ValueError(f"Request body must be a JSON array, {{\"{key}\": [...]}} or NDJSON")
+    if len(data) > max_items:
+        raise ValueError(f"At most {max_items} items are accepted per request")
+    return data
+
+def to_ndjson_line(obj):
+    """Serialize one object as an NDJSON line."""
+    return json.dumps(obj, default=str) + '\n'
@@ -0,0 +1,133 @@
+"""
+Change the number of learning worker shards without breaking ordering.
+
+Every learning event carries a fixed student_shard bucket; a worker owns
+the buckets with bucket % shard_count == shard_index. Ownership must not
+change while a worker still holds claims, or two workers could process
+one student's events concurrently. This command therefore:
+
+1. Pauses all workers (worker_config.paused); they stop claiming
+2. Waits for in-flight claims to finish (or their leases to be reaped)
+3. Backfills student_shard on events ingested before sharding existed
+4. Stores the new shard count and unpauses
+
+Workers pick up the new shard count on their next pass; start or stop
+worker processes (WORKER_SHARD_INDEX 0..N-1) to match.
+
+Usage:
+    python utils/rebalance_shards.py <shard_count> [--drain-timeout SECONDS]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+# Ensure db.py can be imported from the root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+from db import Database
+from utils.sharding import SHARDING_CONFIG_ID, backfill_student_shards, get_sharding_config
+
+# Longer than a worker's config refresh interval (1s) plus one claim
+PAUSE_GRACE_SECONDS = 3.0
+
+
+def wait_for_drain(db, timeout):
+    """
+    Wait until no learning event is claimed by a worker.
+    
+    Args:
+        db: Database handle
+        timeout: Seconds to wait before giving up
+        
+    Returns:
+        bool: True if drained
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        in_flight = db.learning_events.count_documents({'processing.bkt': 'processing'})
+        if in_flight == 0:
+            return True
+        if time.monotonic() >= deadline:
+            print(f"✗ {in_flight} events still in flight")
+            return False
+        print(f"Waiting for {in_flight} in-flight events...")
+        time.sleep(1.0)
+
+
+def rebalance_shards(shard_count, drain_timeout=None):
+    """
+    Pause workers, drain, backfill and switch to a new shard count.
+    
+    Args:
+        shard_count: New number of worker shards
+        drain_timeout: Seconds to wait for in-flight claims
+            (default: two worker lease periods)
+            
+    Returns:
+        bool: True if the new shard count is active
+    """
+    if shard_count < 1 or shard_count > Config.SHARD_BUCKETS:
+        raise ValueError(f"shard_count must be between 1 and {Config.SHARD_BUCKETS}")
+    
+    if drain_timeout is None:
+        drain_timeout = 2 * Config.WORKER_LEASE_SECONDS
+    
+    Database.initialize()
+    db = Database.get_db()
+    
+    previous = get_sharding_config(db) or {
+        'shard_count': Config.WORKER_SHARD_COUNT, 'generation': 0
+    }
+    print(f"Rebalancing worker shards: {previous['shard_count']} -> {shard_count}")
+    
+    db.worker_config.update_one(
+        {'_id': SHARDING_CONFIG_ID},
+        {'$set': {
+            'shard_count': previous['shard_count'],
+            'paused': True,
+            'updated_at': datetime.utcnow()
+        }},
+        upsert=True
+    )
+    print("Paused workers.")
+    
+    # Let workers that read the config just before the pause finish their claim
+    time.sleep(PAUSE_GRACE_SECONDS)
+    
+    if not wait_for_drain(db, drain_timeout):
+        db.worker_config.update_one(
+            {'_id': SHARDING_CONFIG_ID},
+            {'$set': {'paused': False, 'updated_at': datetime.utcnow()}}
+        )
+        print("Aborted; workers resumed with the previous shard count.")
+        return False
+    
+    updated = backfill_student_shards(db)
+    print(f"Backfilled student_shard on {updated} events.")
+    
+    db.worker_config.update_one(
+        {'_id': SHARDING_CONFIG_ID},
+        {
+            '$set': {
+                'shard_count': shard_count,
+                'paused': False,
+                'updated_at': datetime.utcnow()
+            },
+            '$inc': {'generation': 1}
+        }
+    )
+    print(f"✓ Workers resumed with {shard_count} shard(s).")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Change the learning worker shard count")
+    parser.add_argument('shard_count', type=int)
+    parser.add_argument('--drain-timeout', type=float, default=None)
+    args = parser.parse_args()
+    
+    if not rebalance_shards(args.shard_count, args.drain_timeout):
+        sys.exit(1)
@@ -0,0 +1,82 @@
+"""
+Rebuild per-student session_state documents from sequence_logs.
+
+session_state holds the sequencer's rolling window (recent decisions,
+recent failures and momentum) and is normally maintained by
+SequenceLogModel.log_decision. Run this once after upgrading, or to
+repair a student's state; sequence_logs remains the source of truth.
+
+Usage:
+    python utils/rebuild_session_state.py [student_id ...]
+"""
+
+import os
+import sys
+from datetime import datetime
+
+# Ensure db.py can be imported from the root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import Database
+from pymongo import ReplaceOne
+from models.sequence_log_model import SequenceLogModel
+from services.kff_sequencer import KFFSequencer
+
+
+def build_session_state(student_id, sequencer):
+    """
+    Compute a student's session_state document from their logs.
+    
+    Args:
+        student_id: Student identifier
+        sequencer: KFFSequencer used for the momentum calculation
+        
+    Returns:
+        dict: session_state document
+    """
+    recent, failed = SequenceLogModel.session_rings(student_id)
+    
+    return {
+        "_id": student_id,
+        "recent": recent,
+        "failed": failed,
+        "momentum": sequencer.calculate_momentum(
+            [{"correct": item["correct"]} for item in recent]
+        ),
+        "updated_at": datetime.utcnow()
+    }
+
+
+def rebuild_session_state(student_ids=None, batch_size=500):
+    """
+    Rebuild session_state for the given students (default: everyone with logs).
+    
+    Returns:
+        int: Number of documents written
+    """
+    Database.initialize()
+    db = Database.get_db()
+    sequencer = KFFSequencer()
+    
+    if not student_ids:
+        student_ids = db.sequence_logs.distinct("student_id")
+    
+    written = 0
+    ops = []
+    for student_id in student_ids:
+        state = build_session_state(student_id, sequencer)
+        ops.append(ReplaceOne({"_id": student_id}, state, upsert=True))
+        if len(ops) >= batch_size:
+            db.session_state.bulk_write(ops, ordered=False)
+            written += len(ops)
+            ops = []
+    
+    if ops:
+        db.session_state.bulk_write(ops, ordered=False)
+        written += len(ops)
+    
+    print(f"Rebuilt session_state for {written} students.")
+    return written
+
+
+if __name__ == "__main__":
+    rebuild_session_state(sys.argv[1:])
@@ -1,52 +1,232 @@
+import hashlib
 import json
 import os
+import re
 import sys
 
 # Ensure db.py can be imported from the root
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from db import Database
+from models.problem_catalog import ProblemCatalog
+from models.problem_similarity import ProblemSimilarity
+from pymongo import DeleteMany, ReplaceOne
+from utils.skill_ontology import SkillOntology
 
+# IDs assigned by the old delete-and-insert seeder
+LEGACY_ID = re.compile(r'^prob_(\d+)$')
 
-def seed_database(json_file_path="problems.json"):
+# Characters between problem objects in a JSON array (or array of arrays)
+SEPARATORS = ' \t\r\n,[]'
+
+# Fields the similar-problem index is built from
+SIMILARITY_FIELDS = ('title', 'description', 'primary_skill', 'skills', 'skill_ids')
+
+
+def iter_problems(json_file_path, chunk_size=1 << 16):
+    """
+    Stream problem objects from a JSON array, or an array of arrays,
+    without loading the whole file.
+
+    Raises:
+        ValueError: If the file holds anything other than problem objects
+    """
+    decoder = json.JSONDecoder()
+    with open(json_file_path, 'r', encoding='utf-8') as file:
+        buffer = ''
+        position = 0
+        eof = False
+        while True:
+            while position < len(buffer) and buffer[position] in SEPARATORS:
+                position += 1
+            if position == len(buffer):
+                if eof:
+                    return
+                buffer = file.read(chunk_size)
+                position = 0
+                eof = not buffer
+                continue
+
+            if buffer[position] != '{':
+                raise ValueError(f"Expected a problem object, found {buffer[position]!r}")
+
+            try:
+                problem, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Object continues past the buffer; read more and retry
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+
+            yield problem
+            position = end
+
+
+def title_key(title):
+    """Case- and spacing-insensitive title used to identify a problem."""
+    return ' '.join(str(title or '').lower().split())
+
+
+def stable_problem_id(source_key):
+    """Problem ID derived from the source key, independent of bank order."""
+    return f"prob_{hashlib.sha1(source_key.encode('utf-8')).hexdigest()[:12]}"
+
+
+def content_hash(problem):
+    """Hash of everything stored for a problem except its _id."""
+    payload = json.dumps(
+        {k: v for k, v in problem.items() if k not in ('_id', 'content_hash')},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def existing_problem_ids(db):
+    """
+    Map source keys to the IDs already in the bank.
+
+    Problems seeded by the old prob_<index> seeder have no source_key; they
+    are matched by title in index order so their IDs (and everything keyed
+    on them) survive the first incremental seed.
+
+    Returns:
+        tuple: ({source_key: _id}, {_id: content_hash or None})
+    """
+    key_to_id = {}
+    hashes = {}
+    legacy = []
+    for doc in db.problems.find({}, {'title': 1, 'source_key': 1, 'content_hash': 1}):
+        hashes[doc['_id']] = doc.get('content_hash')
+        if 'source_key' in doc:
+            key_to_id[doc['source_key']] = doc['_id']
+        else:
+            legacy.append(doc)
+
+    def legacy_order(doc):
+        match = LEGACY_ID.match(str(doc['_id']))
+        return (0, int(match.group(1))) if match else (1, str(doc['_id']))
+
+    occurrences = {}
+    for doc in sorted(legacy, key=legacy_order):
+        key = title_key(doc.get('title'))
+        occurrences[key] = occurrences.get(key, 0) + 1
+        source_key = key if occurrences[key] == 1 else f"{key}#{occurrences[key]}"
+        key_to_id.setdefault(source_key, doc['_id'])
+
+    return key_to_id, hashes
+
+
+def build_similarity_index(db, version=None):
+    """
+    Rebuild the similar-problem index from the whole bank.
+
+    Returns:
+        int: Number of problems indexed
+    """
+    problems = db.problems.find({}, {field: 1 for field in SIMILARITY_FIELDS})
+    table = ProblemSimilarity.build(problems)
+    ProblemSimilarity.save(table, version)
+    print(f"Similar-problem index: {len(table)} problems -> {ProblemSimilarity.index_path()}")
+    return len(table)
+
+
+def seed_database(json_file_path="problems.json", batch_size=500):
+    """
+    Incrementally sync the problem bank with a JSON file.
+
+    Each problem keeps a stable ID (from its title, numbered when titles
+    repeat) and a content hash; only new or changed problems are written,
+    problems missing from the file are deleted, and the catalog version is
+    bumped when anything changed. The bank is never empty mid-seed. The
+    similar-problem index is rebuilt when the bank changed or has none.
+
+    Returns:
+        dict: {inserted, updated, unchanged, deleted, version}, or None if
+              the file could not be fully read (nothing is deleted then)
+              or held no problems
+    """
     Database.initialize()
     db = Database.get_db()
 
-    print("Clearing existing problem bank...")
-    db.problems.delete_many({})
+    key_to_id, hashes = existing_problem_ids(db)
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+    seen = set()
+    occurrences = {}
+    ops = []
 
+    def flush():
+        if ops:
+            db.problems.bulk_write(ops, ordered=False)
+            ops.clear()
+
+    complete = True
     try:
-        with open(json_file_path, 'r', encoding='utf-8') as file:
-            problems_data = json.load(file)
-    except Exception as e:
-        print(f"Error loading JSON: {e}")
-        return
+        for prob in iter_problems(json_file_path):
+            # The file's problem_id restarts per section; IDs come from the title
+            prob.pop('problem_id', None)
+            prob.pop('_id', None)
+
+            key = title_key(prob.get('title'))
+            occurrences[key] = occurrences.get(key, 0) + 1
+            source_key = key if occurrences[key] == 1 else f"{key}#{occurrences[key]}"
+            problem_id = key_to_id.get(source_key) or stable_problem_id(source_key)
 
-    formatted_problems = []
-    # Flatten if it's a list of arrays
-    if isinstance(problems_data, list) and isinstance(problems_data[0], list):
-        problems_data = [item for sublist in problems_data for item in sublist]
+            # Canonical skills.json IDs next to the authored labels
+            prob.update(SkillOntology.problem_skills(prob))
+            prob['source_key'] = source_key
+            prob['content_hash'] = content_hash(prob)
+            seen.add(problem_id)
 
-    # Assign a guaranteed unique ID to every problem
-    for index, prob in enumerate(problems_data):
-        # Create a unique string ID like "prob_1", "prob_2", etc.
-        prob['_id'] = f"prob_{index + 1}"
+            if problem_id not in hashes:
+                counts['inserted'] += 1
+            elif hashes[problem_id] != prob['content_hash']:
+                counts['updated'] += 1
+            else:
+                counts['unchanged'] += 1
+                continue
+
+            ops.append(ReplaceOne({'_id': problem_id}, {'_id': problem_id, **prob}, upsert=True))
+            if len(ops) >= batch_size:
+                flush()
+    except (OSError, ValueError) as e:
+        # Keep what was read so far but delete nothing
+        print(f"Error loading JSON: {e}")
+        complete = False
 
-        # Remove the old overlapping problem_id so it doesn't cause confusion
-        if 'problem_id' in prob:
-            del prob['problem_id']
+    flush()
 
-        formatted_problems.append(prob)
+    if complete and not seen:
+        print("No problems found; leaving the problem bank unchanged.")
+        return None
 
-    if formatted_problems:
-        result = db.problems.insert_many(formatted_problems)
-        print(f"Successfully seeded {len(result.inserted_ids)} problems.")
+    if complete:
+        removed = [problem_id for problem_id in hashes if problem_id not in seen]
+        for start in range(0, len(removed), batch_size):
+            db.problems.bulk_write([DeleteMany({'_id': {'$in': removed[start:start + batch_size]}})])
+        counts['deleted'] = len(removed)
 
         # Recreate the index for the KFF algorithm
-        db.problems.create_index([("skills", 1), ("difficulty", 1)])
-        print("Created index for skills and difficulty.")
-    else:
-        print("No problems found to insert.")
+        db.problems.create_index([("skill_ids", 1), ("difficulty", 1)])
+
+    print(f"Problems: {counts['inserted']} inserted, {counts['updated']} updated, "
+          f"{counts['unchanged']} unchanged, {counts['deleted']} deleted.")
+
+    # Tell running servers to reload their in-memory catalog
+    version = None
+    changed = counts['inserted'] or counts['updated'] or counts['deleted']
+    if changed:
+        version = ProblemCatalog.bump_version(db)
+        print(f"Problem catalog version is now {version}.")
+
+    if not complete:
+        return None
+
+    if changed or not os.path.exists(ProblemSimilarity.index_path()):
+        build_similarity_index(db, version)
+    return {**counts, 'version': version}
 
 
 if __name__ == "__main__":
-    seed_database()
\ No newline at end of file
+    seed_database(sys.argv[1] if len(sys.argv) > 1 else "problems.json")
@@ -0,0 +1,79 @@
+"""Student sharding of learning_events across worker nodes."""
+import zlib
+from pymongo import UpdateMany
+from config import Config
+
+# worker_config document holding the cluster-wide shard count
+SHARDING_CONFIG_ID = 'sharding'
+
+def student_shard(student_id):
+    """
+    Map a student to one of Config.SHARD_BUCKETS fixed buckets.
+    
+    The bucket is stored on each learning event at ingestion and never
+    changes; changing the number of workers only changes which worker
+    owns a bucket.
+    
+    Args:
+        student_id: Student identifier
+        
+    Returns:
+        int: Bucket in [0, SHARD_BUCKETS)
+    """
+    return zlib.crc32(str(student_id).encode('utf-8')) % Config.SHARD_BUCKETS
+
+def owned_buckets(shard_index, shard_count):
+    """
+    Get the buckets owned by a worker shard.
+    
+    Args:
+        shard_index: This worker's shard in [0, shard_count)
+        shard_count: Number of worker shards
+        
+    Returns:
+        list: Buckets b with b % shard_count == shard_index
+    """
+    return list(range(shard_index, Config.SHARD_BUCKETS, shard_count))
+
+def get_sharding_config(db):
+    """
+    Read the cluster-wide sharding config written by rebalance_shards.
+    
+    Args:
+        db: Database handle
+        
+    Returns:
+        dict: {shard_count, paused, generation} or None if never rebalanced
+    """
+    return db.worker_config.find_one({'_id': SHARDING_CONFIG_ID})
+
+def backfill_student_shards(db, batch_size=500):
+    """
+    Set student_shard on events that predate sharding.
+    
+    New events get their bucket at insert; this only touches legacy
+    rows. Run by rebalance_shards and once when a sharded worker starts.
+    
+    Args:
+        db: Database handle
+        batch_size: Students per bulk write
+        
+    Returns:
+        int: Number of events updated
+    """
+    student_ids = db.learning_events.distinct(
+        'student_id', {'student_shard': {'$exists': False}}
+    )
+    
+    updated = 0
+    for start in range(0, len(student_ids), batch_size):
+        result = db.learning_events.bulk_write([
+            UpdateMany(
+                {'student_id': student_id, 'student_shard': {'$exists': False}},
+                {'$set': {'student_shard': student_shard(student_id)}}
+            )
+            for student_id in student_ids[start:start + batch_size]
+        ], ordered=False)
+        updated += result.modified_count
+    
+    return updated
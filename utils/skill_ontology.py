@@ -0,0 +1,252 @@
+"""
+Skill ontology - one skill vocabulary for problems, BKT and error mining.
+
+problems.json tags problems with free-form labels ("Prefix Sum",
+"Linear DP"), BKT tracks the skill IDs in skills.json and the error
+taxonomy uses DSASubskill values. skill_ontology.json maps every known
+label to a skills.json ID (or marks it untracked), and each skill ID is
+interned to its position in skills.json so skill sets can be held as
+integer bitmasks.
+
+Usage (report problem labels missing from the ontology):
+    python utils/skill_ontology.py [problems.json]
+"""
+import json
+import os
+import re
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.skill_loader import SkillLoader
+
+# Skill sets are stored as uint64 bitmasks by the problem catalog
+MAX_SKILLS = 64
+
+# "Prefix Sum + Hashing", "DFS / BFS": compound labels resolved part by part
+COMPOUND_SEPARATOR = re.compile(r'\s+[+/]\s+')
+
+class SkillOntology:
+    """Resolves skill labels from any vocabulary to interned skill IDs."""
+    
+    _skill_ids = None
+    _index = None
+    _aliases = None
+    _resolved = {}
+    
+    @classmethod
+    def load(cls):
+        """Load skills.json and skill_ontology.json (once per process)."""
+        if cls._aliases is not None:
+            return
+        
+        skills = SkillLoader.load_skills()
+        if len(skills) > MAX_SKILLS:
+            raise ValueError(f"Skill bitmasks hold at most {MAX_SKILLS} skills, got {len(skills)}")
+        
+        ontology_path = os.path.join(os.path.dirname(__file__), '..', 'skill_ontology.json')
+        with open(ontology_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        skill_ids = [skill['id'] for skill in skills]
+        aliases = {}
+        for skill in skills:
+            aliases[cls._key(skill['id'])] = skill['id']
+            aliases[cls._key(skill['name'])] = skill['id']
+        for skill_id, labels in data.get('aliases', {}).items():
+            if skill_id not in aliases.values():
+                raise ValueError(f"skill_ontology.json maps to unknown skill ID: {skill_id}")
+            for label in labels:
+                aliases[cls._key(label)] = skill_id
+        for label in data.get('untracked', []):
+            aliases.setdefault(cls._key(label), None)
+        
+        cls._skill_ids = skill_ids
+        cls._index = {skill_id: index for index, skill_id in enumerate(skill_ids)}
+        cls._resolved = {}
+        cls._aliases = aliases
+    
+    @staticmethod
+    def _key(label):
+        """Case-, underscore- and spacing-insensitive lookup key."""
+        return ' '.join(str(label).replace('_', ' ').lower().split())
+    
+    @classmethod
+    def get_skill_ids(cls):
+        """
+        Get the canonical skill IDs in interned order.
+        
+        Returns:
+            list: Skill IDs; a skill's position is its integer ID
+        """
+        cls.load()
+        return list(cls._skill_ids)
+    
+    @classmethod
+    def resolve(cls, label):
+        """
+        Resolve one label to canonical skill IDs.
+        
+        Args:
+            label: Skill ID, display name, problem tag or DSASubskill value
+            
+        Returns:
+            tuple: Canonical skill IDs (empty for untracked labels), or
+                   None if the label is unknown
+        """
+        cls.load()
+        if label in cls._resolved:
+            return cls._resolved[label]
+        
+        key = cls._key(label)
+        if key in cls._aliases:
+            skill_id = cls._aliases[key]
+            resolved = (skill_id,) if skill_id is not None else ()
+        else:
+            parts = COMPOUND_SEPARATOR.split(key)
+            resolved = None
+            if len(parts) > 1 and all(cls._key(part) in cls._aliases for part in parts):
+                resolved = tuple(dict.fromkeys(
+                    cls._aliases[cls._key(part)] for part in parts
+                    if cls._aliases[cls._key(part)] is not None
+                ))
+        
+        cls._resolved[label] = resolved
+        return resolved
+    
+    @classmethod
+    def normalize(cls, labels, strict=False):
+        """
+        Map labels to canonical skill IDs, keeping first-seen order.
+        
+        Args:
+            labels: Skill labels from any vocabulary
+            strict: Raise on unknown labels instead of dropping them
+            
+        Returns:
+            list: Unique canonical skill IDs
+            
+        Raises:
+            ValueError: If strict and a label is unknown
+        """
+        skill_ids = []
+        unknown = []
+        for label in labels or []:
+            resolved = cls.resolve(label)
+            if resolved is None:
+                unknown.append(label)
+                continue
+            skill_ids.extend(skill_id for skill_id in resolved if skill_id not in skill_ids)
+        
+        if strict and unknown:
+            raise ValueError(f"Invalid skill IDs: {unknown}")
+        return skill_ids
+    
+    @classmethod
+    def primary(cls, label):
+        """
+        Get the first canonical skill ID of a label.
+        
+        Returns:
+            str: Skill ID, or None if the label is unknown or untracked
+        """
+        resolved = cls.resolve(label) if label is not None else None
+        return resolved[0] if resolved else None
+    
+    @classmethod
+    def problem_skills(cls, problem):
+        """
+        Canonical skills of a problem document.
+        
+        Args:
+            problem: Document with authored primary_skill and skills labels
+            
+        Returns:
+            dict: {skill_ids: [primary first], primary_skill_id: str or None}
+        """
+        labels = [problem.get('primary_skill')] + list(problem.get('skills') or [])
+        skill_ids = cls.normalize([label for label in labels if label is not None])
+        primary_skill_id = cls.primary(problem.get('primary_skill'))
+        if primary_skill_id is None and skill_ids:
+            primary_skill_id = skill_ids[0]
+        return {'skill_ids': skill_ids, 'primary_skill_id': primary_skill_id}
+    
+    @classmethod
+    def index_of(cls, skill_id):
+        """Get the interned integer ID of a canonical skill ID (None if unknown)."""
+        cls.load()
+        return cls._index.get(skill_id)
+    
+    @classmethod
+    def indices(cls, labels):
+        """
+        Get interned integer IDs for labels from any vocabulary.
+        
+        Returns:
+            list: Integer skill IDs, unknown and untracked labels dropped
+        """
+        cls.load()
+        return [cls._index[skill_id] for skill_id in cls.normalize(labels)]
+    
+    @classmethod
+    def to_mask(cls, labels):
+        """
+        Get the bitmask of a set of skills.
+        
+        Args:
+            labels: Skill labels from any vocabulary
+            
+        Returns:
+            int: Bit i set when skill i is present
+        """
+        mask = 0
+        for index in cls.indices(labels):
+            mask |= 1 << index
+        return mask
+    
+    @classmethod
+    def from_mask(cls, mask):
+        """
+        Get the canonical skill IDs of a bitmask.
+        
+        Returns:
+            list: Skill IDs in interned order
+        """
+        cls.load()
+        return [skill_id for index, skill_id in enumerate(cls._skill_ids) if mask >> index & 1]
+
+
+def report_unmapped(json_file_path="problems.json"):
+    """
+    Print problem labels that skill_ontology.json does not cover.
+    
+    Args:
+        json_file_path: Problem bank in the seed_problems.py format
+        
+    Returns:
+        list: Unknown labels, most frequent first
+    """
+    with open(json_file_path, 'r', encoding='utf-8') as file:
+        problems = json.load(file)
+    if problems and isinstance(problems[0], list):
+        problems = [item for sublist in problems for item in sublist]
+    
+    counts = {}
+    untracked_only = 0
+    for prob in problems:
+        labels = list(prob.get('skills', [])) + [prob.get('primary_skill')]
+        for label in labels:
+            if label is not None and SkillOntology.resolve(label) is None:
+                counts[label] = counts.get(label, 0) + 1
+        if not SkillOntology.normalize(labels):
+            untracked_only += 1
+    
+    unknown = sorted(counts, key=lambda label: (-counts[label], label))
+    for label in unknown:
+        print(f"{counts[label]:>4}  {label}")
+    print(f"{len(unknown)} unknown labels; {untracked_only} of {len(problems)} problems "
+          f"have no tracked skill.")
+    return unknown
+
+
+if __name__ == "__main__":
+    report_unmapped(sys.argv[1] if len(sys.argv) > 1 else "problems.json")
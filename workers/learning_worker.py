@@ -6,90 +6,229 @@ Features:
 2. Per-student ordering (temporal correctness)
 3. Event completion tracking
 4. Safe for multiple workers
+5. Event-driven wake-up via a change stream on learning_events inserts,
+   falling back to polling with exponential back-off on standalone mongod
+6. Students hashed onto worker threads; each thread drains its students'
+   events in timestamp order, claiming them in leased batches
+7. Each claimed batch is coalesced into one in-memory BKT fold, one bulk
+   commit and one learner-state update
+8. Expired leases are reaped, failed events retried with exponential
+   back-off and copied to learning_events_dead after WORKER_MAX_ATTEMPTS
+   (a processing.bkt 'dead' tombstone stays in learning_events)
+9. Optional sharding across nodes: a worker only handles students whose
+   student_shard bucket it owns (bucket % shard_count == shard_index);
+   /learn and /learn/batch set the bucket at insert, and legacy events
+   without one are backfilled once at startup
+10. Each mastery change refreshes the student's precomputed next-problem
+    recommendation (services/recommendation_service.py) once its events
+    are marked complete
 """
 
 import time
 import os
+import random
+import socket
 import sys
-from datetime import datetime
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
+from config import Config
 from db import Database
 from services.mastery_service import MasteryService
+from services.recommendation_service import RecommendationService
 from models.student_model import StudentModel
+from utils.sharding import backfill_student_shards, get_sharding_config, owned_buckets
 from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure, PyMongoError
+
+# Lease fields removed whenever an event goes back to the queue
+LEASE_FIELDS = {
+    'processing.worker_id': '',
+    'processing.claim_id': '',
+    'processing.lease_expires_at': ''
+}
 
 class LearningWorker:
     """Concurrency-safe background worker."""
     
-    def __init__(self, poll_interval=1.0):
+    def __init__(self, poll_interval=1.0, use_change_stream=True, min_poll_interval=0.05,
+                 num_threads=1, claim_batch_size=20, lease_seconds=60.0,
+                 max_attempts=5, retry_base_seconds=2.0, retry_max_seconds=300.0,
+                 shard_index=0, shard_count=1, precompute_recommendations=True):
+        """
+        Args:
+            poll_interval: Maximum idle wait between passes in seconds
+            use_change_stream: Wake on learning_events inserts when the
+                server supports change streams (replica set / Atlas)
+            min_poll_interval: First back-off step when polling
+            num_threads: Number of student partitions processed in parallel
+            claim_batch_size: Maximum events claimed per student per claim
+            lease_seconds: How long a claim is held before it may be reclaimed
+            max_attempts: Failures after which an event is dead-lettered
+            retry_base_seconds: First retry delay (doubles per failure)
+            retry_max_seconds: Upper bound on the retry delay
+            shard_index: Shard owned by this worker in [0, shard_count)
+            shard_count: Number of worker shards; overridden by the
+                worker_config document written by utils/rebalance_shards.py
+            precompute_recommendations: Refresh the student's stored
+                next-problem recommendation after each mastery change
+        """
         self.poll_interval = poll_interval
+        self.min_poll_interval = min(min_poll_interval, poll_interval)
+        self.use_change_stream = use_change_stream
+        self.num_threads = max(1, num_threads)
+        self.claim_batch_size = max(1, claim_batch_size)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._last_reap = 0.0
+        self.shard_index = shard_index
+        self.shard_count = max(1, shard_count)
+        self.precompute_recommendations = precompute_recommendations
+        self._paused = False
+        self._config_checked = 0.0
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
         self.running = False
+        self._change_stream = None
+        self._backoff = self.min_poll_interval
+        self._executor = (
+            ThreadPoolExecutor(max_workers=self.num_threads, thread_name_prefix='learning-worker')
+            if self.num_threads > 1 else None
+        )
     
-    def claim_event_atomic(self, student_id):
+    def claim_events_batch(self, student_id):
         """
-        Atomically claim the earliest unprocessed event for a student.
+        Claim a student's earliest unprocessed events under a lease.
+        
+        The queue head is read including events already claimed, so
+        nothing is claimed while another worker holds the student's
+        earlier events (an expired lease waits for the reaper). Only the
+        contiguous run of events claimed from the front of the queue is
+        kept; anything claimed after an event taken by another worker is
+        released, so events are never processed ahead of an earlier one.
+        Likewise nothing is claimed past an event that is still waiting
+        out its retry back-off.
         
         Args:
             student_id: Student identifier
             
         Returns:
-            event document or None
+            list: Claimed event documents in (timestamp, _id) order
         """
         db = Database.get_db()
+        now = datetime.utcnow()
         
-        # Atomic find and update
-        event = db.learning_events.find_one_and_update(
-            {
-                'student_id': student_id,
-                'processing.bkt': False
-            },
-            {
-                '$set': {'processing.bkt': 'processing'}
-            },
-            sort=[('timestamp', 1)],  # Earliest first (temporal order)
-            return_document=ReturnDocument.AFTER
+        queue = db.learning_events.find(
+            {'student_id': student_id, 'processing.bkt': {'$in': [False, 'processing']}},
+            {'_id': 1, 'processing.bkt': 1, 'processing.next_attempt_at': 1}
+        ).sort([('timestamp', 1), ('_id', 1)]).limit(self.claim_batch_size)
+        
+        pending_ids = []
+        for event in queue:
+            processing = event.get('processing', {})
+            if processing.get('bkt') is not False:
+                break  # Held by another claim
+            next_attempt_at = processing.get('next_attempt_at')
+            if next_attempt_at is not None and next_attempt_at > now:
+                break
+            pending_ids.append(event['_id'])
+        
+        if not pending_ids:
+            return []
+        
+        claim_id = uuid.uuid4().hex
+        
+        db.learning_events.update_many(
+            {'_id': {'$in': pending_ids}, 'processing.bkt': False},
+            {'$set': {
+                'processing.bkt': 'processing',
+                'processing.worker_id': self.worker_id,
+                'processing.claim_id': claim_id,
+                'processing.lease_expires_at': now + timedelta(seconds=self.lease_seconds)
+            }}
         )
         
-        return event
+        claimed = {
+            event['_id']: event
+            for event in db.learning_events.find(
+                {'_id': {'$in': pending_ids}, 'processing.claim_id': claim_id}
+            )
+        }
+        
+        batch = []
+        for event_id in pending_ids:
+            if event_id not in claimed:
+                break
+            batch.append(claimed.pop(event_id))
+        
+        if claimed:
+            self.release_events(list(claimed))
+        
+        return batch
     
-    def process_bkt_update(self, event):
+    def release_events(self, event_ids):
         """
-        Process BKT update for an event.
+        Return claimed events to the queue without counting a failure.
         
         Args:
-            event: Learning event document
+            event_ids: Event ObjectIds claimed by this worker
+        """
+        db = Database.get_db()
+        db.learning_events.update_many(
+            {'_id': {'$in': event_ids}, 'processing.worker_id': self.worker_id},
+            {'$set': {'processing.bkt': False}, '$unset': LEASE_FIELDS}
+        )
+    
+    def process_bkt_batch(self, student_id, events):
+        """
+        Coalesce a student's claimed events into one BKT update.
+        
+        Events are folded through the BKT model in memory in timestamp
+        order and committed with one bulk write per collection.
+        
+        Args:
+            student_id: Student identifier
+            events: Claimed learning event documents, oldest first
             
         Returns:
-            bool: True if successful
+            tuple: (applied_count, error) where error describes the first
+                   event that could not be applied, or None
         """
         try:
-            student_id = event['student_id']
-            problem_id = event['problem_id']
-            result = event['result']
-            diagnosis = event['diagnosis']
+            attempts = [
+                {
+                    'problem_id': event['problem_id'],
+                    'skills': event['diagnosis']['skills'],
+                    'correct': event['result']['correct'],
+                    'error_type': event['diagnosis'].get('error_type'),
+                    'attempts': event['result']['attempts'],
+                    'solve_time': event['result']['solve_time']
+                }
+                for event in events
+            ]
             
             # Update mastery using existing service
-            MasteryService.update_student_performance(
-                student_id=student_id,
-                problem_id=problem_id,
-                skills=diagnosis['skills'],
-                correct=result['correct'],
-                error_type=diagnosis.get('error_type'),
-                attempts=result['attempts'],
-                solve_time=result['solve_time']
-            )
+            results, error = MasteryService.apply_attempts(student_id, attempts)
             
-            return True
+            if error:
+                index, message = error
+                print(f"Error processing BKT for event {events[index]['_id']}: {message}")
+                return len(results), message
+            
+            return len(results), None
             
         except Exception as e:
-            print(f"Error processing BKT for event {event['_id']}: {e}")
-            return False
+            print(f"Error processing BKT for event {events[0]['_id']}: {e}")
+            return 0, str(e)
     
     def compute_learner_state(self, student_id):
         """
-        Compute and store learner state.
+        Compute and upsert the student's learner state.
         
         Args:
             student_id: Student identifier
@@ -119,7 +258,7 @@ class LearningWorker:
             else:
                 learning_state = "mastered"
             
-            # Store in learner_state collection
+            # One learner_state document per student, overwritten in place
             db = Database.get_db()
             state_doc = {
                 'student_id': student_id,
@@ -128,7 +267,15 @@ class LearningWorker:
                 'updated_at': datetime.utcnow()
             }
             
-            db.learner_state.insert_one(state_doc)
+            db.learner_state.update_one(
+                {'student_id': student_id},
+                {'$set': state_doc},
+                upsert=True
+            )
+            
+            # Audit trail, expired by the TTL index (disabled when TTL is 0)
+            if Config.LEARNER_STATE_HISTORY_TTL_DAYS > 0:
+                db.learner_state_history.insert_one(state_doc)
             
             return True
             
@@ -136,37 +283,163 @@ class LearningWorker:
             print(f"Error computing learner state for {student_id}: {e}")
             return False
     
-    def mark_event_complete(self, event_id):
+    def mark_events_complete(self, event_ids):
         """
-        Mark event as fully completed.
+        Mark events as fully completed with one write.
         
         Args:
-            event_id: Event ObjectId
+            event_ids: Event ObjectIds
         """
         db = Database.get_db()
-        db.learning_events.update_one(
-            {'_id': event_id},
+        db.learning_events.update_many(
+            {'_id': {'$in': event_ids}},
             {
                 '$set': {
                     'processing.bkt': True,
                     'processing.learner_state': True,
-                    'completed': True
+                    'completed': True,
+                    'completed_at': datetime.utcnow()
                 }
             }
         )
     
-    def mark_event_failed(self, event_id):
+    def mark_event_failed(self, event_id, error=None):
         """
-        Mark event as failed (reset for retry).
+        Record a failed attempt and schedule a retry or dead-letter it.
+        
+        The retry delay doubles with each failure (with jitter) up to
+        retry_max_seconds; after max_attempts failures the event is
+        dead-lettered (see dead_letter_event).
         
         Args:
             event_id: Event ObjectId
+            error: Failure description stored on the event
         """
         db = Database.get_db()
+        event = db.learning_events.find_one_and_update(
+            {'_id': event_id},
+            {
+                '$inc': {'processing.attempts': 1},
+                '$set': {'processing.last_error': error}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        if event is None:
+            return
+        
+        attempts = event['processing']['attempts']
+        if attempts >= self.max_attempts:
+            self.dead_letter_event(event)
+            return
+        
+        delay = min(self.retry_base_seconds * 2 ** (attempts - 1), self.retry_max_seconds)
+        delay *= random.uniform(0.5, 1.0)
+        
         db.learning_events.update_one(
             {'_id': event_id},
-            {'$set': {'processing.bkt': False}}
+            {
+                '$set': {
+                    'processing.bkt': False,
+                    'processing.next_attempt_at': datetime.utcnow() + timedelta(seconds=delay)
+                },
+                '$unset': LEASE_FIELDS
+            }
+        )
+    
+    def dead_letter_event(self, event):
+        """
+        Dead-letter an event that keeps failing.
+        
+        A copy goes to learning_events_dead for inspection; the original
+        stays in learning_events as a tombstone (processing.bkt 'dead',
+        never claimed) so its unique submission_id keeps rejecting client
+        retries and GET /event/<event_id> can still report it.
+        
+        Args:
+            event: Learning event document
+        """
+        db = Database.get_db()
+        dead_event = dict(event)
+        dead_event['processing'] = {
+            key: value for key, value in event['processing'].items()
+            if f'processing.{key}' not in LEASE_FIELDS
+        }
+        dead_event['processing']['bkt'] = 'dead'
+        dead_event['dead_lettered_at'] = datetime.utcnow()
+        dead_event['dead_lettered_by'] = self.worker_id
+        
+        try:
+            db.learning_events_dead.insert_one(dead_event)
+        except DuplicateKeyError:
+            pass  # Moved already by an interrupted earlier attempt
+        
+        db.learning_events.update_one(
+            {'_id': event['_id']},
+            {
+                '$set': {
+                    'processing.bkt': 'dead',
+                    'dead_lettered_at': dead_event['dead_lettered_at']
+                },
+                '$unset': LEASE_FIELDS
+            }
         )
+        print(f"Event {event['_id']} dead-lettered after "
+              f"{event['processing']['attempts']} attempts: "
+              f"{event['processing'].get('last_error')}")
+    
+    def reap_expired_leases(self):
+        """
+        Return events whose claim lease expired to the queue.
+        
+        Recovers events held by workers that crashed mid-batch. A reaped
+        claim counts as a failed attempt so that an event which crashes
+        its worker is eventually dead-lettered. Events claimed before
+        leases existed are reaped once older than one lease period.
+        
+        Returns:
+            int: Number of events reaped
+        """
+        db = Database.get_db()
+        now = datetime.utcnow()
+        
+        result = db.learning_events.update_many(
+            {
+                'processing.bkt': 'processing',
+                '$or': [
+                    {'processing.lease_expires_at': {'$lt': now}},
+                    {
+                        'processing.lease_expires_at': {'$exists': False},
+                        'timestamp': {'$lt': now - timedelta(seconds=self.lease_seconds)}
+                    }
+                ]
+            },
+            {
+                '$set': {
+                    'processing.bkt': False,
+                    'processing.last_error': 'lease expired'
+                },
+                '$inc': {'processing.attempts': 1},
+                '$unset': LEASE_FIELDS
+            }
+        )
+        
+        if result.modified_count:
+            print(f"[{now.isoformat()}] Reaped {result.modified_count} expired leases")
+        
+        # Dead-letter reaped events that exhausted their attempts
+        for event in db.learning_events.find({
+            'processing.bkt': False,
+            'processing.attempts': {'$gte': self.max_attempts}
+        }):
+            self.dead_letter_event(event)
+        
+        return result.modified_count
+    
+    def maybe_reap_expired_leases(self):
+        """Run the lease reaper at most once per half lease period."""
+        if time.monotonic() - self._last_reap >= self.lease_seconds / 2:
+            self._last_reap = time.monotonic()
+            self.reap_expired_leases()
     
     def get_students_with_pending_events(self):
         """
@@ -176,66 +449,222 @@ class LearningWorker:
             list: Student IDs with pending events
         """
         db = Database.get_db()
+        query = {'processing.bkt': False}
+        
+        # Sharded: only the buckets this worker owns
+        if self.shard_count > 1:
+            if self.shard_index >= self.shard_count:
+                return []
+            query['student_shard'] = {
+                '$in': owned_buckets(self.shard_index, self.shard_count)
+            }
         
         # Get distinct student_ids with unprocessed events
-        student_ids = db.learning_events.distinct(
-            'student_id',
-            {'processing.bkt': False}
-        )
+        student_ids = db.learning_events.distinct('student_id', query)
         
         return student_ids
     
+    def refresh_shard_config(self):
+        """
+        Re-read the cluster-wide sharding config.
+        
+        Returns:
+            bool: True if processing is paused for a rebalance
+        """
+        config = get_sharding_config(Database.get_db())
+        self._config_checked = time.monotonic()
+        
+        if config:
+            shard_count = max(1, config['shard_count'])
+            if shard_count != self.shard_count:
+                print(f"Worker {self.worker_id}: shard count {self.shard_count} -> "
+                      f"{shard_count} (shard {self.shard_index})")
+                if self.shard_index >= shard_count:
+                    print(f"⚠ Shard index {self.shard_index} is outside the new "
+                          f"shard count; this worker will idle")
+                self.shard_count = shard_count
+            self._paused = config.get('paused', False)
+        
+        return self._paused
+    
+    def is_paused(self):
+        """Check for a rebalance pause, re-reading the config at most once a second."""
+        if time.monotonic() - self._config_checked >= 1.0:
+            return self.refresh_shard_config()
+        return self._paused
+    
+    def get_partition(self, student_id):
+        """
+        Map a student to a worker thread.
+        
+        Uses a stable hash so a student's events are always handled by the
+        same thread within this worker.
+        
+        Args:
+            student_id: Student identifier
+            
+        Returns:
+            int: Partition index in [0, num_threads)
+        """
+        return zlib.crc32(str(student_id).encode('utf-8')) % self.num_threads
+    
+    def process_student(self, student_id):
+        """
+        Drain all pending events of one student in timestamp order.
+        
+        Each claimed batch is applied as one coalesced BKT update and the
+        learner state is recomputed once per batch. Stops at the first
+        failed event so that later events are not applied before it.
+        
+        Args:
+            student_id: Student identifier
+            
+        Returns:
+            int: Number of events processed
+        """
+        processed_count = 0
+        
+        while True:
+            batch = self.claim_events_batch(student_id)
+            if not batch:
+                break
+            
+            applied, error = self.process_bkt_batch(student_id, batch)
+            applied_ids = [event['_id'] for event in batch[:applied]]
+            
+            if applied_ids:
+                if self.compute_learner_state(student_id):
+                    self.mark_events_complete(applied_ids)
+                    # After completion so KFF does not delay /event/<id>/wait and SSE;
+                    # GET /students/<id>/next recomputes if it asks first
+                    if self.precompute_recommendations:
+                        last = batch[applied - 1]
+                        RecommendationService.refresh(
+                            student_id, last.get('problem_id'),
+                            None if last['result']['correct'] else last.get('problem_id')
+                        )
+                else:
+                    # BKT succeeded but state failed - mark BKT done
+                    db = Database.get_db()
+                    db.learning_events.update_many(
+                        {'_id': {'$in': applied_ids}},
+                        {'$set': {'processing.bkt': True}}
+                    )
+                processed_count += applied
+            
+            if error:
+                # Schedule the failed event for retry; later ones wait behind it
+                self.mark_event_failed(batch[applied]['_id'], error)
+                remaining = [event['_id'] for event in batch[applied + 1:]]
+                if remaining:
+                    self.release_events(remaining)
+                break
+            
+            if len(batch) < self.claim_batch_size:
+                break
+        
+        return processed_count
+    
+    def process_partition(self, student_ids):
+        """
+        Process the students of one partition sequentially.
+        
+        Stops early when a rebalance pauses processing, so in-flight
+        claims drain before shard ownership changes.
+        """
+        processed = 0
+        for student_id in student_ids:
+            if self.is_paused():
+                break
+            processed += self.process_student(student_id)
+        return processed
+    
     def process_events(self):
         """
         Process events with per-student ordering.
         
+        Students are hashed onto num_threads partitions which run in
+        parallel; each student's events are only ever handled by one
+        thread, in timestamp order.
+        
         Returns:
             int: Number of events processed
         """
+        # Shard ownership is only re-read between passes
+        if self.refresh_shard_config():
+            return 0
+        
+        self.maybe_reap_expired_leases()
+        
         # Get students with pending events
         students = self.get_students_with_pending_events()
         
         if not students:
             return 0
         
-        processed_count = 0
+        if self._executor is None:
+            return self.process_partition(students)
         
-        # Process one event per student (maintains temporal order)
+        partitions = [[] for _ in range(self.num_threads)]
         for student_id in students:
-            # Atomically claim earliest event for this student
-            event = self.claim_event_atomic(student_id)
-            
-            if not event:
-                # Another worker claimed it
-                continue
-            
-            event_id = event['_id']
-            
+            partitions[self.get_partition(student_id)].append(student_id)
+        
+        return sum(self._executor.map(
+            self.process_partition, [p for p in partitions if p]
+        ))
+    
+    def open_change_stream(self):
+        """
+        Open a change stream on learning_events inserts.
+        
+        Returns:
+            bool: True if the stream is open, False if the server does not
+                  support change streams (polling is used instead)
+        """
+        if not self.use_change_stream:
+            return False
+        
+        db = Database.get_db()
+        try:
+            self._change_stream = db.learning_events.watch(
+                [{'$match': {'operationType': 'insert'}}],
+                max_await_time_ms=int(self.poll_interval * 1000)
+            )
+            return True
+        except OperationFailure as e:
+            print(f"Change streams unavailable ({e}); falling back to polling")
+            self.use_change_stream = False
+            self._change_stream = None
+            return False
+    
+    def close_change_stream(self):
+        """Close the change stream if open."""
+        if self._change_stream is not None:
+            self._change_stream.close()
+            self._change_stream = None
+    
+    def wait_for_events(self):
+        """
+        Block until new events may be pending.
+        
+        With a change stream this returns as soon as an event is inserted,
+        or after poll_interval so retried events are still picked up.
+        Otherwise it sleeps with exponential back-off from
+        min_poll_interval up to poll_interval.
+        """
+        if self._change_stream is None and self.use_change_stream:
+            self.open_change_stream()
+        
+        if self._change_stream is not None:
             try:
-                # Process BKT update
-                if self.process_bkt_update(event):
-                    # Compute learner state
-                    if self.compute_learner_state(student_id):
-                        # Mark as fully completed
-                        self.mark_event_complete(event_id)
-                        processed_count += 1
-                    else:
-                        # BKT succeeded but state failed - mark BKT done
-                        db = Database.get_db()
-                        db.learning_events.update_one(
-                            {'_id': event_id},
-                            {'$set': {'processing.bkt': True}}
-                        )
-                else:
-                    # BKT failed - reset for retry
-                    self.mark_event_failed(event_id)
-                    
-            except Exception as e:
-                print(f"Error processing event {event_id}: {e}")
-                # Reset for retry
-                self.mark_event_failed(event_id)
+                self._change_stream.try_next()
+                return
+            except PyMongoError as e:
+                print(f"Change stream error ({e}); reopening")
+                self.close_change_stream()
         
-        return processed_count
+        time.sleep(self._backoff)
+        self._backoff = min(self._backoff * 2, self.poll_interval)
     
     def run(self):
         """Run worker loop."""
@@ -243,7 +672,24 @@ class LearningWorker:
         print("=" * 60)
         print("Learning Worker Started (Concurrency-Safe)")
         print("=" * 60)
-        print(f"Poll interval: {self.poll_interval}s")
+        
+        # Open the stream before the first pass so no insert is missed
+        streaming = self.open_change_stream()
+        if streaming:
+            print("Wake-up: change stream on learning_events inserts")
+        else:
+            print(f"Wake-up: polling {self.min_poll_interval}s-{self.poll_interval}s (back-off)")
+        print(f"Worker {self.worker_id}: {self.num_threads} thread(s), "
+              f"claim batch {self.claim_batch_size}, lease {self.lease_seconds}s")
+        print(f"Retries: up to {self.max_attempts} attempts, back-off "
+              f"{self.retry_base_seconds}s-{self.retry_max_seconds}s, then learning_events_dead")
+        self.refresh_shard_config()
+        if self.shard_count > 1:
+            print(f"Shard: {self.shard_index} of {self.shard_count}")
+            # Legacy events without a bucket match no shard; new ones get it at insert
+            backfilled = backfill_student_shards(Database.get_db())
+            if backfilled:
+                print(f"Backfilled student_shard on {backfilled} legacy events")
         print("Features:")
         print("  - Atomic event claiming")
         print("  - Per-student ordering")
@@ -259,12 +705,19 @@ class LearningWorker:
                 
                 if processed > 0:
                     print(f"[{datetime.utcnow().isoformat()}] Processed {processed} events")
+                    # More may be queued behind this pass; drain before waiting
+                    self._backoff = self.min_poll_interval
+                    continue
                 
-                time.sleep(self.poll_interval)
+                self.wait_for_events()
                 
         except KeyboardInterrupt:
             print("\nShutting down worker...")
             self.running = False
+        finally:
+            self.close_change_stream()
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
     
     def stop(self):
         """Stop worker."""
@@ -273,26 +726,24 @@ class LearningWorker:
 
 def main():
     """Main entry point."""
-    # Initialize database
+    # Initialize database (also creates the learning_events indexes)
     Database.initialize()
     
-    # Create indexes for concurrency safety
-    db = Database.get_db()
-    
-    # Unique index on submission_id (idempotency)
-    db.learning_events.create_index('submission_id', unique=True)
-    
-    # Compound index for atomic claiming
-    db.learning_events.create_index([
-        ('student_id', 1),
-        ('processing.bkt', 1),
-        ('timestamp', 1)
-    ])
-    
-    print("✓ Database indexes created")
-    
     # Create and run worker
-    worker = LearningWorker(poll_interval=1.0)
+    worker = LearningWorker(
+        poll_interval=Config.WORKER_POLL_INTERVAL,
+        use_change_stream=Config.WORKER_USE_CHANGE_STREAM,
+        min_poll_interval=Config.WORKER_MIN_POLL_INTERVAL,
+        num_threads=Config.WORKER_THREADS,
+        claim_batch_size=Config.WORKER_CLAIM_BATCH,
+        lease_seconds=Config.WORKER_LEASE_SECONDS,
+        max_attempts=Config.WORKER_MAX_ATTEMPTS,
+        retry_base_seconds=Config.WORKER_RETRY_BASE_SECONDS,
+        retry_max_seconds=Config.WORKER_RETRY_MAX_SECONDS,
+        shard_index=Config.WORKER_SHARD_INDEX,
+        shard_count=Config.WORKER_SHARD_COUNT,
+        precompute_recommendations=Config.RECOMMENDATION_PRECOMPUTE
+    )
     
     try:
         worker.run()